@@ -1,30 +1,64 @@
 # alembic/env.py
+from logging.config import fileConfig
+
+from sqlalchemy import create_engine, pool
+
+from alembic import context
 
-# ... diğer importlar ...
 from app.core.config import settings # .env'den DATABASE_URL'i almak için
-from app.db.session import Base # <<< Base'i buradan alıyoruz
+from app.db.base import Base # Tüm modeller Base.metadata'ya kayıtlı olarak gelir
+
+config = context.config
 
-# ...
-# Bu satırı bulun:
-# target_metadata = None
-# Ve şu şekilde değiştirin veya ekleyin:
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Autogenerate (`alembic revision --autogenerate`) modelleri bu metadata ile karşılaştırır
 target_metadata = Base.metadata
-# ...
 
-# `configure` fonksiyonu içinde `context.configure` çağrısını bulun:
-#         context.configure(
-#             connection=connection, target_metadata=target_metadata
-#         )
-# URL'yi .env dosyasından almak için:
-def run_migrations_online() -> None:
-    """Run migrations in 'online' mode.
-    # ...
-    """
-    configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = settings.DATABASE_URL # <<< EKLENDİ/GÜNCELLENDİ
-    connectable = engine_from_config(
-        configuration, # <<< DEĞİŞTİRİLDİ
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
+
+def _database_url() -> str:
+    # `alembic -x url=...` ile farklı bir veritabanı hedeflenebilir (ör. replika kurulumu, CI)
+    return context.get_x_argument(as_dictionary=True).get("url") or settings.DATABASE_URL
+
+
+def _configure_options(url: str) -> dict:
+    # SQLite ALTER TABLE'ı sınırlı destekler; değişiklikler tabloyu yeniden oluşturan batch modunda uygulanır
+    return {
+        "target_metadata": target_metadata,
+        "render_as_batch": url.startswith("sqlite"),
+        "compare_type": True,
+    }
+
+
+def run_migrations_offline() -> None:
+    """Veritabanına bağlanmadan SQL betiği üretir (`alembic upgrade head --sql`)."""
+    url = _database_url()
+    context.configure(
+        url=url,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        **_configure_options(url),
     )
-# ...
\ No newline at end of file
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Migration'ları doğrudan veritabanına uygular."""
+    url = _database_url()
+    # Uygulamanın havuzlu engine'i yerine tek seferlik bağlantı
+    connectable = create_engine(url, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(connection=connection, **_configure_options(url))
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,29 @@
+"""product listing index
+
+products (price, id, stock_quantity): fiyat aralığı filtresi ve fiyat sıralaması için.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_price_id_stock_quantity', 'products', ['price', 'id', 'stock_quantity'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_price_id_stock_quantity', table_name='products')
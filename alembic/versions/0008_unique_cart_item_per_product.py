@@ -0,0 +1,66 @@
+"""unique cart item per product
+
+cart_items (cart_id, product_id) tekil: sepete ekleme tek bir upsert ile yapılır. Önceden oluşmuş
+yinelenen satırlar en küçük id'li satırda miktarları toplanarak birleştirilir.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 12:45:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicate_items() -> None:
+    if op.get_context().as_sql:
+        return # Offline (--sql) çıktıda veri okunamaz; yinelenen satırlar varsa kısıt eklenmeden önce elle birleştirilmelidir
+    bind = op.get_bind()
+    cart_items = sa.table(
+        'cart_items',
+        sa.column('id', sa.Integer),
+        sa.column('cart_id', sa.Integer),
+        sa.column('product_id', sa.Integer),
+        sa.column('quantity', sa.Integer),
+    )
+    duplicates = bind.execute(
+        sa.select(
+            cart_items.c.cart_id,
+            cart_items.c.product_id,
+            sa.func.min(cart_items.c.id),
+            sa.func.sum(cart_items.c.quantity),
+        )
+        .group_by(cart_items.c.cart_id, cart_items.c.product_id)
+        .having(sa.func.count() > 1)
+    ).all()
+    for cart_id, product_id, keep_id, total_quantity in duplicates:
+        bind.execute(cart_items.update().where(cart_items.c.id == keep_id).values(quantity=total_quantity))
+        bind.execute(
+            cart_items.delete().where(
+                cart_items.c.cart_id == cart_id,
+                cart_items.c.product_id == product_id,
+                cart_items.c.id != keep_id,
+            )
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicate_items()
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_cart_items_cart_id_product_id', ['cart_id', 'product_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_cart_items_cart_id_product_id', type_='unique')
@@ -0,0 +1,29 @@
+"""product stock index
+
+products (stock_quantity, id): in_stock=false filtresi için seek ve ID sıralaması.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 12:50:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_stock_quantity_id', 'products', ['stock_quantity', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_stock_quantity_id', table_name='products')
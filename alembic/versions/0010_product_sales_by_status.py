@@ -0,0 +1,79 @@
+"""product sales by status
+
+daily_product_sales anahtarına sipariş durumu eklenir (day, product_id, status): iptal edilen/başarısız
+siparişlerin ürün satışları raporlardan çıkarılabilsin. Rollup tablosu türetilmiş veri olduğu için yeniden
+oluşturulur ve sipariş geçmişinden (INSERT ... SELECT) doldurulur.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 12:55:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_orders = sa.table('orders', sa.column('id'), sa.column('created_at'), sa.column('status'))
+_order_items = sa.table('order_items', sa.column('order_id'), sa.column('product_id'), sa.column('quantity'), sa.column('price_at_purchase'))
+
+
+def _create_daily_product_sales(with_status: bool) -> None:
+    status_columns = [
+        sa.Column('status', sa.Enum('PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'FAILED', name='orderstatus'), nullable=False)
+    ] if with_status else []
+    key = ['day', 'product_id', 'status'] if with_status else ['day', 'product_id']
+    op.create_table('daily_product_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    *status_columns,
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint(*key)
+    )
+    op.create_index(op.f('ix_daily_product_sales_product_id'), 'daily_product_sales', ['product_id'], unique=False)
+
+
+def _fill_daily_product_sales(with_status: bool) -> None:
+    # crud_analytics.rebuild_rollups ile aynı hesaplama
+    order_day = sa.func.date(_orders.c.created_at)
+    group_columns = [order_day, _order_items.c.product_id] + ([_orders.c.status] if with_status else [])
+    select = (
+        sa.select(
+            *group_columns,
+            sa.func.sum(_order_items.c.quantity),
+            sa.func.sum(_order_items.c.quantity * _order_items.c.price_at_purchase),
+            sa.func.count(sa.distinct(_order_items.c.order_id)),
+        )
+        .select_from(_order_items.join(_orders, _orders.c.id == _order_items.c.order_id))
+        .group_by(*group_columns)
+    )
+    columns = ['day', 'product_id'] + (['status'] if with_status else []) + ['units', 'revenue', 'order_count']
+    target = sa.table('daily_product_sales', *(sa.column(name) for name in columns))
+    op.execute(target.insert().from_select(columns, select))
+
+
+def _replace_daily_product_sales(with_status: bool) -> None:
+    # Tablo indeksleriyle birlikte silinir (MySQL'de FK'nin kullandığı indeks tek başına silinemez)
+    op.drop_table('daily_product_sales')
+    _create_daily_product_sales(with_status)
+    _fill_daily_product_sales(with_status)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_daily_product_sales(with_status=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_daily_product_sales(with_status=False)
@@ -0,0 +1,34 @@
+"""idempotency key lease
+
+idempotency_keys.locked_until: IN_PROGRESS kaydının kilit süresi. Çöken veya iptal edilen isteğin bıraktığı
+kayıt bu süreden sonra aynı anahtarla gelen yeniden denemeyle devralınır. Mevcut satırlarda boştur
+(süresi dolmuş sayılır).
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 14:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('locked_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('locked_until')
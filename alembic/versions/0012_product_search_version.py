@@ -0,0 +1,34 @@
+"""product search version
+
+products.search_version: yalnızca aranan alanlar (isim, açıklama) değişince artan sürüm. Arama indeksinin
+diğer worker'ların yazımlarını fark etmesi için kullanılır; stok düşümleri bu sürümü değiştirmez.
+Mevcut satırlar sürüm 1 ile başlar.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 14:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('search_version')
@@ -1,11 +1,13 @@
 # app/api/api_v1/api.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 # Buraya endpoint router'larını import edeceksiniz
 from .endpoints import auth # <<< YENİ EKLEDİK
 from .endpoints import products
 from .endpoints import cart
 from .endpoints import orders
+from .endpoints import admin
+from app.services import auth_service
 # from .endpoints import users, products, cart, orders, admin
 
 api_router = APIRouter()
@@ -14,6 +16,10 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(products.router, prefix="/products", tags=["Products"])
 api_router.include_router(cart.router, prefix="/cart", tags=["Shopping Cart"])
 api_router.include_router(orders.router, prefix="/orders", tags=["Orders"])
+api_router.include_router(
+    admin.router, prefix="/admin", tags=["Admin"],
+    dependencies=[Depends(auth_service.get_current_active_superuser)] # Sadece adminler
+)
                           
 # api_router.include_router(users.router, prefix="/users", tags=["Users"])
 # api_router.include_router(products.router, prefix="/products", tags=["Products"])
@@ -0,0 +1,63 @@
+# app/api/api_v1/endpoints/admin.py
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+
+from app.schemas import analytics_schemas
+from app.crud import crud_analytics
+from app.db.session import get_db
+
+# Bu router api.py'de get_current_active_superuser dependency'si ile eklenir (tüm endpoint'ler sadece adminler için)
+router = APIRouter()
+
+@router.get("/analytics/revenue/daily", response_model=List[analytics_schemas.DailyRevenue])
+def read_daily_revenue(
+    db: Session = Depends(get_db),
+    date_from: Optional[date] = Query(None, description="First day (inclusive, UTC)"),
+    date_to: Optional[date] = Query(None, description="Last day (inclusive, UTC)")
+):
+    """
+    Revenue and order count per day, excluding cancelled and failed orders. Reads the rollup tables only.
+    """
+    return crud_analytics.get_daily_revenue(db, date_from=date_from, date_to=date_to)
+
+@router.get("/analytics/status/daily", response_model=List[analytics_schemas.DailyStatusSales])
+def read_daily_status_sales(
+    db: Session = Depends(get_db),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None)
+):
+    """
+    Order count and revenue per day and current order status. Reads the rollup tables only.
+    """
+    return crud_analytics.get_daily_status_sales(db, date_from=date_from, date_to=date_to)
+
+@router.get("/analytics/products/top", response_model=List[analytics_schemas.TopProduct])
+def read_top_products(
+    db: Session = Depends(get_db),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    by: str = Query("units", pattern="^(units|revenue)$")
+):
+    """
+    Best-selling products in the given period, ranked by units sold or revenue, excluding cancelled and failed orders.
+    Reads the rollup tables only.
+    """
+    return crud_analytics.get_top_products(db, date_from=date_from, date_to=date_to, limit=limit, by_revenue=(by == "revenue"))
+
+@router.post("/analytics/rollups/rebuild", response_model=analytics_schemas.RollupRebuildResult)
+def rebuild_sales_rollups(db: Session = Depends(get_db)):
+    """
+    Rebuild the sales rollup tables from the full order history.
+    """
+    return crud_analytics.rebuild_rollups(db)
+
+@router.get("/analytics/rollups/check", response_model=analytics_schemas.RollupCheckResult)
+def check_sales_rollups(db: Session = Depends(get_db)):
+    """
+    Compare the rollup tables with a full recomputation from orders and order items.
+    """
+    mismatches = crud_analytics.check_rollups(db)
+    return {"consistent": not mismatches, "mismatches": mismatches}
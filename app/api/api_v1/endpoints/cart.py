@@ -1,14 +1,34 @@
 # app/api/api_v1/endpoints/cart.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
+from typing import Optional, Union
 
 from app.schemas import cart_schemas
 from app.services import cart_service, auth_service
 from app.db.session import get_db
 from app.models.user_model import User
+from app.utils.serialization import ResponseSerializer
 
 router = APIRouter()
 
+# Servis katmanı Cart şemasını zaten oluşturuyor; yanıt yeniden doğrulanmadan doğrudan JSON'a yazılır
+cart_serializer = ResponseSerializer(cart_schemas.Cart)
+cart_mutation_serializer = ResponseSerializer(cart_schemas.CartMutationResult)
+
+CartWriteResponse = Union[cart_schemas.Cart, cart_schemas.CartMutationResult]
+
+def _return_mode(
+    response_mode: Optional[cart_schemas.CartReturn] = Query(
+        None, alias="return", description="`minimal`: return only the changed line and the new cart totals."
+    )
+) -> bool:
+    return response_mode == cart_schemas.CartReturn.MINIMAL
+
+def _cart_write_response(result: CartWriteResponse):
+    if isinstance(result, cart_schemas.CartMutationResult):
+        return cart_mutation_serializer.response(result)
+    return cart_serializer.response(result)
+
 @router.get("/", response_model=cart_schemas.Cart)
 def get_current_user_cart(
     db: Session = Depends(get_db),
@@ -17,43 +37,62 @@ def get_current_user_cart(
     """
     Get the current logged-in user's cart.
     """
-    return cart_service.get_user_cart_details(db, current_user=current_user)
+    return cart_serializer.response(cart_service.get_user_cart_details(db, current_user=current_user))
 
-@router.post("/items", response_model=cart_schemas.Cart)
+@router.post("/items", response_model=CartWriteResponse)
 def add_item_to_current_user_cart(
     item_in: cart_schemas.CartItemCreate,
+    minimal: bool = Depends(_return_mode),
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_active_user)
 ):
     """
     Add a product item to the current user's cart.
     If the item already exists, its quantity is increased.
+    With `?return=minimal` only the changed line and the new totals are returned.
+    """
+    return _cart_write_response(cart_service.add_product_to_user_cart(db, current_user=current_user, item_in=item_in, minimal=minimal))
+
+@router.patch("/", response_model=cart_schemas.Cart)
+def batch_update_current_user_cart(
+    batch_in: cart_schemas.CartBatchUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_active_user)
+):
+    """
+    Apply several `set` / `add` / `remove` operations to the current user's cart in one request.
+    Operations are applied in order and written in a single transaction: if any product is
+    missing or out of stock, nothing is changed. Returns the updated cart.
     """
-    return cart_service.add_product_to_user_cart(db, current_user=current_user, item_in=item_in)
+    return cart_serializer.response(cart_service.apply_cart_operations(db, current_user=current_user, operations=batch_in.operations))
 
-@router.put("/items/{cart_item_id}", response_model=cart_schemas.Cart)
+@router.put("/items/{cart_item_id}", response_model=CartWriteResponse)
 def update_cart_item_for_current_user(
     cart_item_id: int,
     item_update: cart_schemas.CartItemUpdate,
+    minimal: bool = Depends(_return_mode),
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_active_user)
 ):
     """
     Update the quantity of an item in the current user's cart.
     If quantity is 0 or less, item is removed.
+    With `?return=minimal` only the changed line and the new totals are returned.
     """
-    return cart_service.update_user_cart_item(db, current_user=current_user, cart_item_id=cart_item_id, item_update_in=item_update)
+    return _cart_write_response(cart_service.update_user_cart_item(db, current_user=current_user, cart_item_id=cart_item_id, item_update_in=item_update, minimal=minimal))
 
-@router.delete("/items/{cart_item_id}", response_model=cart_schemas.Cart)
+@router.delete("/items/{cart_item_id}", response_model=CartWriteResponse)
 def remove_cart_item_for_current_user(
     cart_item_id: int,
+    minimal: bool = Depends(_return_mode),
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_active_user)
 ):
     """
     Remove an item from the current user's cart.
+    With `?return=minimal` only the new totals are returned (`item` is null).
     """
-    return cart_service.remove_product_from_user_cart(db, current_user=current_user, cart_item_id=cart_item_id)
+    return _cart_write_response(cart_service.remove_product_from_user_cart(db, current_user=current_user, cart_item_id=cart_item_id, minimal=minimal))
 
 @router.delete("/", response_model=cart_schemas.Cart, status_code=status.HTTP_200_OK) # Veya 204 No Content ve farklı response
 def clear_current_user_cart(
@@ -63,4 +102,4 @@ def clear_current_user_cart(
     """
     Clear all items from the current user's cart.
     """
-    return cart_service.clear_user_cart_service(db, current_user=current_user)
\ No newline at end of file
+    return cart_serializer.response(cart_service.clear_user_cart_service(db, current_user=current_user))
\ No newline at end of file
@@ -1,30 +1,65 @@
 # app/api/api_v1/endpoints/orders.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
 
 from app.schemas import order_schemas
 from app.crud import crud_order
-from app.db.session import get_db
-from app.services import auth_service
-from app.services.order_service import get_order_service, OrderService # OrderService'i import ediyoruz
+from app.db.session import get_db, get_read_db
+from app.services import auth_service, idempotency_service
+from app.services.order_service import get_order_service, OrderService, iter_order_export # OrderService'i import ediyoruz
 from app.models.user_model import User
-from app.models.order_model import OrderStatus # Admin güncellemesi için
+from app.models.order_model import Order, OrderStatus # Admin güncellemesi için
+from app.utils.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from app.utils.serialization import ResponseSerializer
 
 router = APIRouter()
 
+# Sipariş yanıtları için önceden derlenmiş serileştiriciler (bkz. app/utils/serialization.py)
+order_serializer = ResponseSerializer(order_schemas.Order)
+order_list_serializer = ResponseSerializer(List[order_schemas.Order])
+
+CURSOR_QUERY = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page")
+
+def _parse_order_cursor(cursor: Optional[str], skip: int) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    if skip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'skip' and 'cursor' cannot be used together.")
+    try:
+        values = decode_cursor(cursor)
+        return datetime.fromisoformat(values["created_at"]), int(values["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _next_order_cursor_headers(orders: List[Order], limit: int) -> Dict[str, str]:
+    if len(orders) < limit:
+        return {}
+    last = orders[-1]
+    return {NEXT_CURSOR_HEADER: encode_cursor({"created_at": last.created_at.isoformat(), "id": last.id})}
+
 @router.post("/", response_model=order_schemas.Order, status_code=status.HTTP_201_CREATED)
-def create_new_order_from_cart(
+async def create_new_order_from_cart(
     *,
     # order_in: order_schemas.OrderCreate, # Belki ödeme yöntemi ve detayları buradan alınır
     payment_method: str = Query(..., description="Payment method (e.g., 'credit_card', 'paypal')"),
     payment_details: Dict[str, Any] = Depends(lambda: {}), # Body'den veya query'den alınabilir, şimdilik basit
     current_user: User = Depends(auth_service.get_current_active_user),
-    order_service: OrderService = Depends(get_order_service) # OrderService dependency'si
+    order_service: OrderService = Depends(get_order_service), # OrderService dependency'si
+    request: Request,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(
+        None, alias=idempotency_service.IDEMPOTENCY_KEY_HEADER, max_length=255,
+        description="Client-generated unique key; retries with the same key return the original response"
+    )
 ):
     """
     Create a new order from the current user's cart.
     Payment method and details are required.
+    Send an `Idempotency-Key` header to make retries safe: a repeated key replays the
+    stored response without charging again or creating a duplicate order.
     """
     # payment_details'i daha yapılandırılmış bir Pydantic modeli ile almak daha iyi olurdu.
     # Örnek:
@@ -45,25 +80,42 @@ def create_new_order_from_cart(
             raise HTTPException(status_code=400, detail="Payment details are required for this payment method.")
 
 
-    try:
-        order = order_service.place_order_facade(
-            current_user=current_user,
-            payment_method=payment_method,
-            payment_details=payment_details
-        )
-        return order
-    except HTTPException as e:
-        raise e # Servisten gelen HTTP hatalarını doğrudan yükselt
-    except Exception as e:
-        # Beklenmedik diğer hatalar için
-        print(f"Error during order placement: {str(e)}") # Sunucu loguna yaz
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while placing the order.")
+    async def place_order() -> order_schemas.Order:
+        try:
+            return await order_service.place_order_facade(
+                current_user=current_user,
+                payment_method=payment_method,
+                payment_details=payment_details,
+                # Aynı Idempotency-Key ile yeniden denemeler gateway'e aynı ödeme anahtarını iletir
+                payment_idempotency_key=idempotency_service.downstream_key(current_user.id, idempotency_key) if idempotency_key else None
+            )
+        except HTTPException as e:
+            raise e # Servisten gelen HTTP hatalarını doğrudan yükselt
+        except Exception as e:
+            # Beklenmedik diğer hatalar için
+            print(f"Error during order placement: {str(e)}") # Sunucu loguna yaz
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while placing the order.")
+
+    if not idempotency_key:
+        return order_serializer.response(await place_order(), status_code=status.HTTP_201_CREATED)
+
+    fingerprint = idempotency_service.request_fingerprint(
+        request.method, request.url.path, dict(sorted(request.query_params.multi_items()))
+    )
+    return await idempotency_service.execute_idempotent(
+        db,
+        user_id=current_user.id,
+        key=idempotency_key,
+        fingerprint=fingerprint,
+        operation=place_order,
+        success_status_code=status.HTTP_201_CREATED
+    )
 
 
 @router.get("/{order_id}", response_model=order_schemas.Order)
 def read_user_order_by_id(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(auth_service.get_current_active_user)
 ):
     """
@@ -72,33 +124,58 @@ def read_user_order_by_id(
     db_order = crud_order.get_order_by_id(db, order_id=order_id, user_id=current_user.id)
     if db_order is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found or you do not have permission to view it.")
-    return db_order
+    return order_serializer.response(db_order)
 
 @router.get("/", response_model=List[order_schemas.Order])
 def read_user_orders(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(auth_service.get_current_active_user),
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=200)
+    limit: int = Query(100, ge=1, le=200),
+    cursor: Optional[str] = CURSOR_QUERY
 ):
     """
     Retrieve orders for the current logged-in user with pagination.
+    Supports offset (`skip`) or keyset (`cursor`, see `X-Next-Cursor` response header) pagination.
     """
-    orders = crud_order.get_orders_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-    return orders
+    after = _parse_order_cursor(cursor, skip)
+    orders = crud_order.get_orders_by_user(db, user_id=current_user.id, skip=skip, limit=limit, after=after)
+    return order_list_serializer.response(orders, headers=_next_order_cursor_headers(orders, limit))
 
 # --- Admin Endpoint'leri (Opsiyonel) ---
 @router.get("/admin/all", response_model=List[order_schemas.Order], dependencies=[Depends(auth_service.get_current_active_superuser)])
 def read_all_orders_admin(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=200)
+    limit: int = Query(100, ge=1, le=200),
+    cursor: Optional[str] = CURSOR_QUERY
 ):
     """
     (Admin Only) Retrieve all orders in the system.
+    Supports offset (`skip`) or keyset (`cursor`, see `X-Next-Cursor` response header) pagination.
+    """
+    after = _parse_order_cursor(cursor, skip)
+    orders = crud_order.get_all_orders(db, skip=skip, limit=limit, after=after)
+    return order_list_serializer.response(orders, headers=_next_order_cursor_headers(orders, limit))
+
+@router.get("/admin/export", dependencies=[Depends(auth_service.get_current_active_superuser)])
+def export_orders_admin(
+    format: order_schemas.OrderExportFormat = Query(order_schemas.OrderExportFormat.NDJSON),
+    created_from: Optional[datetime] = Query(None, description="Include orders created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Include orders created before this time"),
+    status_filter: Optional[OrderStatus] = Query(None, alias="status")
+):
+    """
+    (Admin Only) Stream all matching orders with their items as NDJSON (one order per line)
+    or CSV (one item per line). Rows are read with a server-side cursor, so memory use does
+    not grow with the number of orders.
     """
-    orders = crud_order.get_all_orders(db, skip=skip, limit=limit)
-    return orders
+    media_type = "text/csv" if format == order_schemas.OrderExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        iter_order_export(format, created_from=created_from, created_to=created_to, status=status_filter),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format.value}"'}
+    )
 
 @router.patch("/admin/{order_id}/status", response_model=order_schemas.Order, dependencies=[Depends(auth_service.get_current_active_superuser)])
 def update_order_status_admin(
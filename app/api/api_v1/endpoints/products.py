@@ -1,17 +1,25 @@
 # app/api/api_v1/endpoints/products.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.schemas import product_schemas
 from app.crud import crud_product
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.services import auth_service # Admin yetkilendirmesi için
+from app.services import product_service
 from app.models.user_model import User # Tip hinti için
 from app.models.product_model import Product # Tip hinti için (opsiyonel ama iyi pratik)
+from app.utils.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from app.utils.serialization import ResponseSerializer
+from app.utils.http_cache import conditional_response, entity_etag, list_etag
 
 router = APIRouter()
 
+# Sıcak GET endpoint'leri için önceden derlenmiş yanıt serileştiricileri (bkz. app/utils/serialization.py)
+product_serializer = ResponseSerializer(product_schemas.Product)
+product_list_serializer = ResponseSerializer(List[product_schemas.Product])
+
 @router.post(
     "/",
     response_model=product_schemas.Product,
@@ -34,30 +42,106 @@ def create_new_product(
     product = crud_product.create_product(db=db, product_in=product_in)
     return product
 
+@router.post(
+    "/bulk",
+    response_model=product_schemas.ProductImportResult,
+    dependencies=[Depends(auth_service.get_current_active_superuser)] # Sadece adminler
+)
+async def bulk_import_products(
+    request: Request,
+    db: Session = Depends(get_db),
+    format: Optional[product_schemas.ProductImportFormat] = Query(None, description="csv or ndjson; defaults to the Content-Type of the body"),
+    upsert: bool = Query(False, description="Rows with an 'id' update the existing product instead of failing")
+):
+    """
+    Bulk import products from a streamed CSV (with header row) or NDJSON body. (Admin only)
+    Rows are validated like `POST /products/` and written in batches; invalid rows are
+    reported individually and do not stop the import.
+    """
+    import_format = product_service.resolve_import_format(format, request.headers.get("content-type"))
+    return await product_service.import_products(db, request.stream(), import_format, upsert=upsert)
+
+@router.get("/search", response_model=List[product_schemas.Product])
+def search_products(
+    db: Session = Depends(get_read_db),
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms (matched against name and description, prefixes allowed)"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Full-text search over product name and description, ranked by relevance.
+    """
+    return product_list_serializer.response(crud_product.search_products(db, query=q, limit=limit))
+
 @router.get("/{product_id}", response_model=product_schemas.Product)
 def read_product_by_id(
     product_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
     """
     Get a specific product by id.
+    Supports conditional requests: send the `ETag` back in `If-None-Match` (or `Last-Modified`
+    in `If-Modified-Since`) to get `304 Not Modified` when the product has not changed.
     """
-    db_product = crud_product.get_product(db, product_id=product_id)
+    db_product = crud_product.get_product_cached(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    return db_product
+    return conditional_response(
+        request,
+        entity_etag("product", db_product.id, db_product.version),
+        lambda headers: product_serializer.response(db_product, headers=headers),
+        last_modified=db_product.updated_at,
+    )
 
 @router.get("/", response_model=List[product_schemas.Product]) # Veya ProductSimple
 def read_all_products(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     skip: int = Query(0, ge=0), # Sayfalama için
-    limit: int = Query(100, ge=1, le=200) # Sayfalama için
+    limit: int = Query(100, ge=1, le=200), # Sayfalama için
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = Query(None, description="true: only products in stock, false: only sold-out products"),
+    sort: Optional[product_schemas.ProductSort] = Query(None, description="price, -price, name or newest")
 ):
     """
-    Retrieve all products with pagination.
+    Retrieve all products with pagination, optional filtering and sorting.
+    Either offset (`skip`) or keyset (`cursor`) pagination can be used; when a full page
+    is returned, the cursor for the next page is sent in the `X-Next-Cursor` header.
+    The page carries an `ETag`; repeat it in `If-None-Match` to get `304 Not Modified` while
+    the page content is unchanged.
     """
-    products = crud_product.get_products(db, skip=skip, limit=limit)
-    return products
+    after_id, after_value = None, None
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'skip' and 'cursor' cannot be used together.")
+        try:
+            values = decode_cursor(cursor)
+            after_id, after_value = int(values["id"]), values.get("value")
+            if values.get("sort") != (sort.value if sort else None):
+                raise ValueError("Cursor was issued for a different sort order")
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    products = crud_product.get_products(
+        db, skip=skip, limit=limit, after_id=after_id, after_value=after_value,
+        min_price=min_price, max_price=max_price, in_stock=in_stock, sort=sort
+    )
+    cursor_headers = {}
+    if len(products) == limit:
+        last = products[-1]
+        next_cursor = {"id": last.id, "sort": sort.value if sort else None}
+        if sort in (product_schemas.ProductSort.PRICE, product_schemas.ProductSort.PRICE_DESC):
+            next_cursor["value"] = last.price
+        elif sort == product_schemas.ProductSort.NAME:
+            next_cursor["value"] = last.name
+        cursor_headers[NEXT_CURSOR_HEADER] = encode_cursor(next_cursor)
+    return conditional_response(
+        request,
+        list_etag("products", request.url.query, ((product.id, product.version) for product in products)),
+        lambda headers: product_list_serializer.response(products, headers={**cursor_headers, **headers}),
+    )
 
 @router.put(
     "/{product_id}",
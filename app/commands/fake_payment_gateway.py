@@ -0,0 +1,82 @@
+# app/commands/fake_payment_gateway.py
+# Yük testleri için yerel sahte ödeme gateway'i. Uygulamayı PAYMENT_GATEWAY_URL ile buna yönlendirin.
+# Kullanım:
+#   python -m app.commands.fake_payment_gateway --port 9100 --latency-ms 200 --jitter-ms 50 --error-rate 0.05
+#   PAYMENT_GATEWAY_URL=http://127.0.0.1:9100 uvicorn app.main:app
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ChargeRequest(BaseModel):
+    method: str
+    amount: float
+    details: Dict[str, Any] = {}
+
+
+def create_app(
+    latency_ms: float = 100.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    decline_rate: float = 0.0,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    """
+    POST /charges uç noktası sunan sahte gateway.
+    - Her istek latency_ms ± jitter_ms kadar bekletilir.
+    - error_rate olasılıkla 503 (gateway hatası), decline_rate olasılıkla 402 (ödeme reddi) döner.
+    - Idempotency-Key başlığıyla daha önce sonuçlanmış (503 dışı) bir ödeme tekrar gelirse ilk sonuç aynen döner.
+    """
+    rng = random.Random(seed)
+    app = FastAPI(title="Fake Payment Gateway")
+    charges: Dict[str, Tuple[int, Dict[str, Any]]] = {} # Idempotency-Key -> ilk sonuç (durum kodu, gövde)
+
+    @app.post("/charges")
+    async def create_charge(charge: ChargeRequest, idempotency_key: Optional[str] = Header(None)):
+        delay = max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0.0) / 1000
+        await asyncio.sleep(delay)
+        if idempotency_key in charges:
+            status_code, content = charges[idempotency_key]
+            return JSONResponse(status_code=status_code, content=content)
+        roll = rng.random()
+        if roll < error_rate:
+            return JSONResponse(status_code=503, content={"status": "error", "message": "Gateway unavailable (fake)."})
+        if roll < error_rate + decline_rate:
+            status_code, content = 402, {"status": "failed", "message": "Payment declined (fake)."}
+        else:
+            status_code, content = 200, {"status": "success", "transaction_id": f"{charge.method}_txn_{uuid.uuid4().hex[:12]}"}
+        if idempotency_key:
+            charges[idempotency_key] = (status_code, content)
+        return JSONResponse(status_code=status_code, content=content)
+
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local fake payment gateway for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--decline-rate", type=float, default=0.0, help="Fraction of requests declined with 402")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.decline_rate, args.seed),
+        host=args.host, port=args.port, log_level="warning",
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
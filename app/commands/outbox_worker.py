@@ -0,0 +1,37 @@
+# app/commands/outbox_worker.py
+# Outbox olaylarını uygulamadan ayrı bir süreçte işleyen worker (OUTBOX_WORKER_ENABLED=False ile birlikte kullanın).
+# Kullanım:
+#   python -m app.commands.outbox_worker          # Sürekli çalışır
+#   python -m app.commands.outbox_worker --once   # Zamanı gelmiş olayları bir kez işler ve çıkar
+import argparse
+import asyncio
+import sys
+
+from app.db import base as _models # noqa: F401 - Tüm modellerin mapper'ları (ilişkiler) çözülebilsin diye
+from app.services import outbox_service
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Outbox event worker")
+    parser.add_argument("--once", action="store_true", help="Process due events once and exit")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        total = 0
+        while True:
+            processed = outbox_service.run_once()
+            total += processed
+            if not processed:
+                break
+        print(f"Outbox: processed {total} events.")
+        return 0
+
+    try:
+        asyncio.run(outbox_service.run_worker())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# app/commands/rollups.py
+# Satış rollup tablolarını yeniden oluşturma / kontrol etme komutu.
+# Kullanım:
+#   python -m app.commands.rollups backfill   # Rollup'ları sipariş geçmişinden baştan oluşturur
+#   python -m app.commands.rollups check      # Rollup'ları tam yeniden hesaplamayla karşılaştırır
+import argparse
+import sys
+
+from app.db.session import SessionLocal
+from app.db import base as _models # noqa: F401 - Tüm modellerin mapper'ları (ilişkiler) çözülebilsin diye
+from app.crud import crud_analytics
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sales rollup maintenance")
+    parser.add_argument("action", choices=["backfill", "check"])
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        if args.action == "backfill":
+            counts = crud_analytics.rebuild_rollups(db)
+            print(f"Rollups rebuilt: {counts}")
+            return 0
+
+        mismatches = crud_analytics.check_rollups(db)
+        for mismatch in mismatches:
+            print(mismatch)
+        print("Rollups are consistent." if not mismatches else f"{len(mismatches)} mismatches found.")
+        return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
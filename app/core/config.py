@@ -1,12 +1,79 @@
 # app/core/config.py
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
+    # Okuma replikaları (virgülle ayrılmış URL listesi; boşsa tüm okumalar birincil veritabanına gider)
+    DATABASE_READ_URLS: str = ""
+    # Bağlantı havuzu ayarları: birincil (DB_*) ve replikalar (READ_DB_*) için ayrı ayrı
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE_SECONDS: int = -1 # -1 = bağlantılar yenilenmez
+    READ_DB_POOL_SIZE: int = 5
+    READ_DB_MAX_OVERFLOW: int = 10
+    READ_DB_POOL_PRE_PING: bool = True
+    READ_DB_POOL_RECYCLE_SECONDS: int = 3600
+    # Başlangıçta engine başına önceden açılacak bağlantı sayısı (0 = kapalı; bağlantılar ilk istekte açılır)
+    DB_POOL_WARMUP_CONNECTIONS: int = 0
+    # Yazma yapan istemcinin okumaları bu süre boyunca birincile yönlendirilir (replikasyon gecikmesine karşı)
+    READ_YOUR_WRITES_SECONDS: int = 5
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Geliştirme modu: yanıtlara X-DB-Queries / X-DB-Time (ms) başlıkları eklenir
+    DEBUG: bool = False
+    # Tek bir istekte aynı SQL bu sayıdan fazla çalışırsa N+1 uyarısı loglanır (0 = kapalı)
+    SQL_REPEATED_QUERY_WARNING_THRESHOLD: int = 10
+    # bcrypt hashleme/doğrulama için ayrı process havuzu (0 = havuz kullanma, istek thread'inde çalıştır)
+    PASSWORD_HASH_WORKERS: int = 2
+    # Havuzda aynı anda bekleyebilecek en fazla iş; aşılırsa istek 503 ile hemen reddedilir
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Token ile doğrulanan kullanıcıların süreç içi önbelleği (0 = kapalı). TTL, token'ın kalan süresini aşmaz.
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    # Ürün detayları için read-through önbellek (0 = kapalı)
+    PRODUCT_CACHE_TTL_SECONDS: int = 30
+    PRODUCT_CACHE_MAX_SIZE: int = 5000
+    # Arama indeksinin diğer worker'ların yazımlarına karşı kontrol aralığı; yalnızca isim/açıklaması değişen, eklenen ve silinen ürünler indekse uygulanır (0 = kapalı)
+    SEARCH_INDEX_REFRESH_SECONDS: float = 30.0
+    # Toplu ürün içe aktarımı: her transaction'daki satır sayısı ve raporlanacak en fazla hatalı satır
+    PRODUCT_IMPORT_BATCH_SIZE: int = 1000
+    PRODUCT_IMPORT_MAX_ERRORS: int = 1000
+    # İçe aktarımda tek bir satırın en fazla boyutu (byte); aşan satır bellekte biriktirilmez, hatalı sayılır
+    PRODUCT_IMPORT_MAX_LINE_BYTES: int = 65536
+    # POST /orders için Idempotency-Key kayıtlarının ömrü ve eşzamanlı kopyaların ilk isteği bekleme süresi
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: int = 30
+    # Devam eden isteğin anahtar kilidi; süresi dolunca (istek çöktüyse) aynı anahtarla yeniden deneme işi devralır.
+    # Bir checkout'un en uzun süresinden (ödeme zaman aşımı dahil) büyük olmalıdır
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    # Ödeme gateway'i (boşsa ödemeler süreç içinde mock olarak simüle edilir)
+    PAYMENT_GATEWAY_URL: Optional[str] = None
+    # Tek bir ödemenin (kuyrukta bekleme dahil) en uzun süresi ve gateway'e aynı anda giden en fazla istek
+    PAYMENT_TIMEOUT_SECONDS: float = 10.0
+    PAYMENT_MAX_CONCURRENCY: int = 50
+    # Art arda bu kadar gateway hatasında devre açılır; açık devre bu süre sonra tek bir denemeye izin verir
+    PAYMENT_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    PAYMENT_CIRCUIT_RESET_SECONDS: float = 30.0
+    # Outbox worker'ı: uygulama içinde çalıştırılsın mı (False ise `python -m app.commands.outbox_worker` ile ayrı süreçte),
+    # yoklama aralığı, parti boyutu ve yeniden deneme (üstel geri çekilme) ayarları
+    OUTBOX_WORKER_ENABLED: bool = True
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_BASE_SECONDS: float = 2.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 600.0
+    # Alınan (claim) olaylar bu süre boyunca diğer worker'lara görünmez; handler'lar bundan kısa sürmeli.
+    # Worker çökerse olaylar süre dolunca yeniden işlenir.
+    OUTBOX_LEASE_SECONDS: float = 300.0
+    # Teslim edilmiş olayların saklanma süresi
+    OUTBOX_RETENTION_DAYS: int = 7
+    # Bu boyuttan (byte) büyük yanıtlar, istemci kabul ediyorsa gzip ile sıkıştırılır (0 = kapalı)
+    GZIP_MINIMUM_SIZE: int = 1000
+    GZIP_COMPRESS_LEVEL: int = 6 # 1 (hızlı) - 9 (en küçük)
     # FRONTEND_URL: str = "http://localhost:3000" # Eğer CORS için gerekiyorsa
 
     class Config:
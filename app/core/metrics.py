@@ -0,0 +1,59 @@
+# app/core/metrics.py
+# Uygulama metrikleri; GET /metrics ile Prometheus formatında sunulur.
+from typing import List
+
+from app.utils.metrics import Registry, Counter, Gauge
+
+registry = Registry()
+
+# --- HTTP ---
+# Sıcak yolda yalnızca histogram güncellenir; istek sayacı scrape anında histogramdan türetilir
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.", ["method", "route", "status"]
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being processed."
+)
+
+# --- Sipariş ve ödeme ---
+orders_placed_total = registry.counter(
+    "orders_placed_total", "Orders placed successfully.", ["payment_method"]
+)
+orders_failed_total = registry.counter(
+    "orders_failed_total", "Order placements that failed.", ["payment_method", "reason"]
+)
+payment_duration_seconds = registry.histogram(
+    "payment_duration_seconds", "Payment gateway call latency in seconds.", ["payment_method", "outcome"]
+)
+stock_conflicts_total = registry.counter(
+    "stock_conflicts_total", "Checkouts rejected because stock ran out after payment."
+)
+
+
+def _collect_http_request_totals() -> List:
+    requests_total = Counter("http_requests_total", "Total HTTP requests.", ["method", "route", "status"])
+    for labelvalues, count in http_request_duration_seconds.counts().items():
+        requests_total.inc(*labelvalues, amount=count)
+    return [requests_total]
+
+registry.register_collector(_collect_http_request_totals)
+
+
+def _collect_cache_metrics() -> List:
+    # Önbellek sayaçları TTLCache içinde tutulur; scrape anında okunur (sıcak yola ek yük yok)
+    from app.crud.crud_product import product_cache
+    from app.crud.crud_user import principal_cache
+
+    hits = Counter("cache_hits_total", "Cache hits.", ["cache"])
+    misses = Counter("cache_misses_total", "Cache misses.", ["cache"])
+    hit_ratio = Gauge("cache_hit_ratio", "Cache hit ratio since start.", ["cache"])
+    size = Gauge("cache_entries", "Entries currently in the cache.", ["cache"])
+    for name, cache in (("product", product_cache), ("auth_principal", principal_cache)):
+        stats = cache.stats()
+        hits.inc(name, amount=stats["hits"])
+        misses.inc(name, amount=stats["misses"])
+        hit_ratio.set(stats["hit_rate"], name)
+        size.set(stats["size"], name)
+    return [hits, misses, hit_ratio, size]
+
+registry.register_collector(_collect_cache_metrics)
@@ -0,0 +1,110 @@
+# app/core/middleware.py
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.core.config import settings
+from app.core.metrics import http_requests_in_progress, http_request_duration_seconds
+from app.db.session import track_queries
+
+DB_QUERIES_HEADER = "X-DB-Queries"
+DB_TIME_HEADER = "X-DB-Time" # milisaniye
+
+
+class QueryStatsMiddleware:
+    """
+    Her HTTP isteğinin çalıştırdığı SQL sorgularını sayar (saf ASGI middleware; yanıtı tamponlamaz).
+    - DEBUG modunda sorgu sayısı ve toplam DB süresi yanıt başlıklarına eklenir.
+    - Aynı sorgu şekli SQL_REPEATED_QUERY_WARNING_THRESHOLD'dan fazla tekrarlanırsa (muhtemel N+1) uyarı loglanır.
+    Akış (streaming) yanıtlarında başlıklar yalnızca ilk parçadan önceki sorguları içerir.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers.append((DB_QUERIES_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((DB_TIME_HEADER.lower().encode(), f"{stats.total_time * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                threshold = settings.SQL_REPEATED_QUERY_WARNING_THRESHOLD
+                if threshold > 0:
+                    for statement, count in stats.repeated_statements(threshold):
+                        print(
+                            f"WARNING: Possible N+1 in {scope['method']} {scope['path']}: statement ran {count} times: "
+                            f"{' '.join(statement.split())[:300]}"
+                        )
+
+
+class MetricsMiddleware:
+    """İstek sayısı, işlemdeki istek sayısı ve route şablonu + durum kodu bazında gecikme histogramı toplar."""
+
+    in_progress = 0
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500 # Yanıt başlamadan hata olursa
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # Middleware yalnızca event loop thread'inde çalışır; sayaç için kilit gerekmez
+        MetricsMiddleware.in_progress += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            MetricsMiddleware.in_progress -= 1
+            # Ham path yerine route şablonu (ör. /api/v1/products/{product_id}); eşleşmeyenler tek etikette toplanır
+            route = scope.get("route")
+            http_request_duration_seconds.observe(
+                elapsed, scope["method"], route.path if route is not None else "unmatched", str(status_code)
+            )
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Starlette'in GZipMiddleware'i; ek olarak sıkıştırılan yanıtların güçlü ETag'lerini zayıf (W/) yapar.
+    Güçlü ETag byte düzeyinde aynı gövdeyi ifade eder, sıkıştırılmış gövde ise farklıdır. If-None-Match
+    zayıf karşılaştırma kullandığından 304 davranışı değişmez.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_weak_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and etag.startswith('"') and "content-encoding" in headers:
+                    headers["etag"] = "W/" + etag
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_weak_etag)
+
+
+http_requests_in_progress.set_function(lambda: MetricsMiddleware.in_progress)
@@ -1,6 +1,9 @@
 # app/core/security.py
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Callable, Any
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import threading
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -14,12 +17,58 @@ ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# bcrypt işlemleri onlarca ms süren, GIL'i tutan saf CPU işidir. Aynı worker'daki diğer
+# endpoint'leri aç bırakmamak için sınırlı boyutlu ayrı bir process havuzunda çalıştırılırlar.
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(max(settings.PASSWORD_HASH_MAX_PENDING, 1))
+
+class PasswordHashingBusyError(Exception):
+    """Hash havuzu dolu olduğunda fırlatılır (app.main içinde 503'e çevrilir)."""
+    pass
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_pool
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+def _run_in_hash_pool(func: Callable[..., Any], *args: Any) -> Any:
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+    # Kuyruk derinliği sınırı: boş yer yoksa beklemeden reddet
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHashingBusyError("Password hashing capacity exceeded. Please retry shortly.")
+    try:
+        return _get_hash_pool().submit(func, *args).result()
+    except BrokenProcessPool:
+        shutdown_hash_pool() # Bir sonraki çağrıda havuz yeniden oluşturulur
+        raise
+    finally:
+        _hash_slots.release()
+
+# Process havuzunda çalışan fonksiyonlar (pickle edilebilmeleri için modül seviyesinde)
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
+def _get_password_hash_sync(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _run_in_hash_pool(_verify_password_sync, plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+    return _run_in_hash_pool(_get_password_hash_sync, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,221 @@
+# app/crud/crud_analytics.py
+from sqlalchemy import select, func, delete, insert, distinct
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Iterable
+from datetime import date
+
+from app.models.analytics_model import DailyProductSales, DailyOrderStatusSales
+from app.models.order_model import Order, OrderItem, OrderStatus
+from app.models.product_model import Product
+
+# Ciroya sayılmayan sipariş durumları
+NON_REVENUE_STATUSES = (OrderStatus.CANCELLED, OrderStatus.FAILED)
+
+
+def _increment(db: Session, model, key_columns: List[str], counter_columns: List[str], rows: List[Dict[str, Any]]) -> None:
+    # Satır yoksa ekle, varsa sayaçları artır (atomik upsert); commit çağıran tarafa bırakılır
+    if not rows:
+        return
+    table = model.__table__
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in counter_columns})
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns],
+            set_={name: table.c[name] + stmt.excluded[name] for name in counter_columns}
+        )
+    else:
+        raise ValueError(f"Rollup upsert is not supported for database dialect '{dialect_name}'.")
+    db.execute(stmt, rows)
+
+
+_PRODUCT_SALES_KEY = ["day", "product_id", "status"]
+_PRODUCT_SALES_COUNTERS = ["units", "revenue", "order_count"]
+
+
+def record_order_placed(
+    db: Session, day: date, status: OrderStatus, total_amount: float, items_data: Iterable[Dict[str, Any]]
+) -> None:
+    """Yeni siparişi rollup tablolarına ekler (sipariş ile aynı transaction içinde çağrılmalı)."""
+    per_product: Dict[int, Dict[str, Any]] = {}
+    for item in items_data:
+        row = per_product.setdefault(
+            item["product_id"],
+            {"day": day, "product_id": item["product_id"], "status": status, "units": 0, "revenue": 0.0, "order_count": 1}
+        )
+        row["units"] += item["quantity"]
+        row["revenue"] += item["quantity"] * item["price_at_purchase"]
+    _increment(db, DailyProductSales, _PRODUCT_SALES_KEY, _PRODUCT_SALES_COUNTERS, list(per_product.values()))
+    _increment(
+        db, DailyOrderStatusSales, ["day", "status"], ["order_count", "revenue"],
+        [{"day": day, "status": status, "order_count": 1, "revenue": total_amount}]
+    )
+
+
+def record_order_status_change(
+    db: Session, order_id: int, day: date, old_status: OrderStatus, new_status: OrderStatus, total_amount: float
+) -> None:
+    """
+    Siparişi ve ürün satırlarını eski durumun rollup satırlarından yeni durumunkilere taşır
+    (durum güncellemesiyle aynı transaction'da).
+    """
+    if old_status == new_status:
+        return
+    product_rows: List[Dict[str, Any]] = []
+    items = db.execute(
+        select(
+            OrderItem.product_id,
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.quantity * OrderItem.price_at_purchase).label("revenue"),
+        )
+        .where(OrderItem.order_id == order_id)
+        .group_by(OrderItem.product_id)
+    )
+    for item in items:
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            product_rows.append({
+                "day": day, "product_id": item.product_id, "status": status,
+                "units": sign * item.units, "revenue": sign * item.revenue, "order_count": sign,
+            })
+    _increment(db, DailyProductSales, _PRODUCT_SALES_KEY, _PRODUCT_SALES_COUNTERS, product_rows)
+    _increment(
+        db, DailyOrderStatusSales, ["day", "status"], ["order_count", "revenue"],
+        [
+            {"day": day, "status": old_status, "order_count": -1, "revenue": -total_amount},
+            {"day": day, "status": new_status, "order_count": 1, "revenue": total_amount},
+        ]
+    )
+
+
+# --- Tam yeniden hesaplama (backfill) ve tutarlılık kontrolü ---
+
+def _recomputed_product_sales():
+    order_day = func.date(Order.created_at)
+    return (
+        select(
+            order_day.label("day"),
+            OrderItem.product_id,
+            Order.status,
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.quantity * OrderItem.price_at_purchase).label("revenue"),
+            func.count(distinct(OrderItem.order_id)).label("order_count"),
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .group_by(order_day, OrderItem.product_id, Order.status)
+    )
+
+
+def _recomputed_status_sales():
+    order_day = func.date(Order.created_at)
+    return (
+        select(
+            order_day.label("day"),
+            Order.status,
+            func.count(Order.id).label("order_count"),
+            func.sum(Order.total_amount).label("revenue"),
+        )
+        .group_by(order_day, Order.status)
+    )
+
+
+def rebuild_rollups(db: Session) -> Dict[str, int]:
+    """Rollup tablolarını sipariş geçmişinden baştan oluşturur (tek transaction, INSERT ... SELECT)."""
+    try:
+        db.execute(delete(DailyProductSales))
+        db.execute(delete(DailyOrderStatusSales))
+        product_rows = db.execute(
+            insert(DailyProductSales).from_select(
+                ["day", "product_id", "status", "units", "revenue", "order_count"], _recomputed_product_sales()
+            )
+        ).rowcount
+        status_rows = db.execute(
+            insert(DailyOrderStatusSales).from_select(
+                ["day", "status", "order_count", "revenue"], _recomputed_status_sales()
+            )
+        ).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"daily_product_sales": product_rows, "daily_order_status_sales": status_rows}
+
+
+def check_rollups(db: Session, tolerance: float = 0.01) -> List[str]:
+    """Rollup tablolarını tam yeniden hesaplamayla karşılaştırır; farkları açıklayan mesajlar döner (boşsa tutarlı)."""
+    mismatches: List[str] = []
+
+    def compare(name: str, expected: Dict[Any, tuple], actual: Dict[Any, tuple]) -> None:
+        for key in sorted(set(expected) | set(actual), key=str):
+            exp = expected.get(key)
+            act = actual.get(key)
+            # Sıfırlanmış rollup satırları (ör. tüm siparişleri başka duruma geçmiş) yok sayılır
+            if exp is None and act is not None and not any(act):
+                continue
+            if exp is None or act is None or any(abs((e or 0) - (a or 0)) > tolerance for e, a in zip(exp, act)):
+                mismatches.append(f"{name} {key}: expected {exp}, found {act}")
+
+    compare(
+        "daily_product_sales",
+        {(str(r.day)[:10], r.product_id, r.status.value): (r.units, r.revenue, r.order_count) for r in db.execute(_recomputed_product_sales())},
+        {(str(r.day), r.product_id, r.status.value): (r.units, r.revenue, r.order_count) for r in db.query(DailyProductSales)},
+    )
+    compare(
+        "daily_order_status_sales",
+        {(str(r.day)[:10], r.status.value): (r.order_count, r.revenue) for r in db.execute(_recomputed_status_sales())},
+        {(str(r.day), r.status.value): (r.order_count, r.revenue) for r in db.query(DailyOrderStatusSales)},
+    )
+    return mismatches
+
+
+# --- Raporlar (yalnızca rollup tablolarını okur) ---
+
+def _date_range(query, column, date_from: Optional[date], date_to: Optional[date]):
+    if date_from is not None:
+        query = query.filter(column >= date_from)
+    if date_to is not None:
+        query = query.filter(column <= date_to)
+    return query
+
+
+def get_daily_revenue(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    query = db.query(
+        DailyOrderStatusSales.day,
+        func.sum(DailyOrderStatusSales.order_count).label("order_count"),
+        func.sum(DailyOrderStatusSales.revenue).label("revenue"),
+    ).filter(DailyOrderStatusSales.status.notin_(NON_REVENUE_STATUSES))
+    query = _date_range(query, DailyOrderStatusSales.day, date_from, date_to)
+    return query.group_by(DailyOrderStatusSales.day).order_by(DailyOrderStatusSales.day).all()
+
+
+def get_daily_status_sales(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[DailyOrderStatusSales]:
+    query = _date_range(db.query(DailyOrderStatusSales), DailyOrderStatusSales.day, date_from, date_to)
+    return query.filter(DailyOrderStatusSales.order_count != 0).order_by(DailyOrderStatusSales.day, DailyOrderStatusSales.status).all()
+
+
+def get_top_products(
+    db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None, limit: int = 20, by_revenue: bool = False
+):
+    units = func.sum(DailyProductSales.units).label("units")
+    revenue = func.sum(DailyProductSales.revenue).label("revenue")
+    order_count = func.sum(DailyProductSales.order_count).label("order_count")
+    query = db.query(
+        DailyProductSales.product_id,
+        Product.name,
+        units,
+        revenue,
+        order_count,
+    ).outerjoin(Product, Product.id == DailyProductSales.product_id).filter(DailyProductSales.status.notin_(NON_REVENUE_STATUSES))
+    query = _date_range(query, DailyProductSales.day, date_from, date_to)
+    return (
+        query.group_by(DailyProductSales.product_id, Product.name)
+        .having(order_count > 0) # Siparişlerinin hepsi başka duruma geçmiş (sıfırlanmış) satırlar
+        .order_by((revenue if by_revenue else units).desc(), DailyProductSales.product_id)
+        .limit(limit)
+        .all()
+    )
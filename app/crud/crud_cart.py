@@ -1,6 +1,7 @@
 # app/crud/crud_cart.py
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session, selectinload, joinedload
+from typing import List, Optional, Tuple
 
 from app.models.cart_model import Cart, CartItem
 from app.models.user_model import User
@@ -10,6 +11,20 @@ from app.schemas.cart_schemas import CartItemCreate, CartItemUpdate
 def get_cart_by_user_id(db: Session, user_id: int) -> Optional[Cart]:
     return db.query(Cart).filter(Cart.user_id == user_id).first()
 
+def get_cart_with_items(db: Session, user_id: int) -> Optional[Cart]:
+    # Sepet, öğeleri ve öğelerin ürünleri sabit sayıda sorguyla yüklenir (N+1 yok):
+    # 1) carts, 2) cart_items JOIN products
+    return (
+        db.query(Cart)
+        .options(selectinload(Cart.items).joinedload(CartItem.product))
+        .filter(Cart.user_id == user_id)
+        .first()
+    )
+
+def get_cart_items_with_products(db: Session, cart_id: int) -> List[CartItem]:
+    # Sepet öğeleri ürünleriyle birlikte tek sorguda (cart_items JOIN products)
+    return db.query(CartItem).options(joinedload(CartItem.product)).filter(CartItem.cart_id == cart_id).all()
+
 def create_cart(db: Session, user_id: int) -> Cart:
     db_cart = Cart(user_id=user_id)
     db.add(db_cart)
@@ -23,54 +38,88 @@ def get_or_create_cart(db: Session, user_id: int) -> Cart:
         db_cart = create_cart(db, user_id=user_id)
     return db_cart
 
-def add_item_to_cart(db: Session, cart: Cart, product: Product, quantity: int) -> CartItem:
-    # Aynı üründen sepette var mı kontrol et
-    db_cart_item = db.query(CartItem).filter(CartItem.cart_id == cart.id, CartItem.product_id == product.id).first()
-    
-    if db_cart_item:
-        # Varsa miktarını artır
-        db_cart_item.quantity += quantity
-    else:
-        # Yoksa yeni bir öğe olarak ekle
-        db_cart_item = CartItem(
-            cart_id=cart.id,
-            product_id=product.id,
-            quantity=quantity
-            # price_at_addition=product.price # Eğer fiyatı o anki haliyle saklamak isterseniz
-        )
-        db.add(db_cart_item)
-    
-    # Stok kontrolü burada veya serviste yapılabilir
-    if db_cart_item.quantity > product.stock_quantity:
-        # Yeterli stok yoksa hata ver veya maksimum stok kadar ekle
-        # Şimdilik basit tutalım, serviste daha detaylı ele alınabilir
-        raise ValueError(f"Not enough stock for product {product.name}. Available: {product.stock_quantity}, Requested: {db_cart_item.quantity}")
+def get_or_add_cart(db: Session, user_id: int) -> Cart:
+    # get_or_create_cart'tan farkı: yeni sepet commit edilmeden flush edilir, aynı transaction'daki yazımla birlikte kaydedilir
+    db_cart = get_cart_by_user_id(db, user_id=user_id)
+    if not db_cart:
+        db_cart = Cart(user_id=user_id)
+        db.add(db_cart)
+        db.flush()
+    return db_cart
 
-    db.commit()
-    db.refresh(db_cart_item)
-    return db_cart_item
+def get_product_with_cart_item(db: Session, cart_id: int, product_id: int) -> Tuple[Optional[Product], Optional[CartItem]]:
+    # Ürün ve sepetteki mevcut satırı (varsa) tek sorguda: products LEFT OUTER JOIN cart_items
+    row = (
+        db.query(Product, CartItem)
+        .outerjoin(CartItem, and_(CartItem.product_id == Product.id, CartItem.cart_id == cart_id))
+        .filter(Product.id == product_id)
+        .first()
+    )
+    return (row[0], row[1]) if row else (None, None)
 
+def get_cart_item_with_product_for_user(db: Session, user_id: int, cart_item_id: int) -> Optional[CartItem]:
+    # Öğe, kullanıcının sepetine ait olup olmadığı ve ürünü tek sorguda (cart_items JOIN carts JOIN products)
+    return (
+        db.query(CartItem)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .options(joinedload(CartItem.product))
+        .filter(CartItem.id == cart_item_id, Cart.user_id == user_id)
+        .first()
+    )
 
-def update_cart_item_quantity(db: Session, cart_item_id: int, quantity: int, cart_id: int) -> Optional[CartItem]:
-    db_cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id, CartItem.cart_id == cart_id).first()
-    if db_cart_item:
-        # Stok kontrolü
-        product = db.query(Product).filter(Product.id == db_cart_item.product_id).first()
-        if not product or quantity > product.stock_quantity:
-            raise ValueError(f"Not enough stock. Available: {product.stock_quantity if product else 0}, Requested: {quantity}")
-        
-        db_cart_item.quantity = quantity
-        db.commit()
-        db.refresh(db_cart_item)
-    return db_cart_item
+def _upsert_item_statement(db: Session):
+    # (cart_id, product_id) tekil anahtarı üzerinde "varsa miktarı artır, yoksa ekle"; sözdizimi veritabanına özgüdür
+    table = CartItem.__table__
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update(quantity=table.c.quantity + stmt.inserted.quantity)
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.cart_id, table.c.product_id],
+            set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+        )
+    raise ValueError(f"Upsert is not supported for database dialect '{dialect_name}'.")
+
+def upsert_cart_item(db: Session, cart_id: int, product_id: int, quantity: int) -> None:
+    # Okumadan tek bir INSERT ... ON CONFLICT/DUPLICATE KEY; eşzamanlı eklemeler miktarı kaybetmeden toplanır.
+    # Commit çağıran tarafa bırakılır
+    db.execute(_upsert_item_statement(db), {"cart_id": cart_id, "product_id": product_id, "quantity": quantity})
+
+def get_cart_summary(db: Session, cart_id: int, product_id: Optional[int] = None) -> Tuple[int, float, Optional[int], Optional[int]]:
+    """
+    Sepeti yüklemeden tek bir toplama sorgusuyla (öğe sayısı, toplam tutar) döner; product_id verilirse
+    o ürünün satırının (id, miktar) değerleri de aynı sorguda okunur (satır yoksa None).
+    """
+    is_line = CartItem.product_id == product_id
+    row = (
+        db.query(
+            func.count(CartItem.id),
+            func.coalesce(func.sum(CartItem.quantity * Product.price), 0.0),
+            func.max(case((is_line, CartItem.id))),
+            func.max(case((is_line, CartItem.quantity))),
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .filter(CartItem.cart_id == cart_id)
+        .one()
+    )
+    return row[0], float(row[1]), row[2], row[3]
 
 def remove_item_from_cart(db: Session, cart_item_id: int, cart_id: int) -> bool:
-    db_cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id, CartItem.cart_id == cart_id).first()
-    if db_cart_item:
-        db.delete(db_cart_item)
-        db.commit()
-        return True
-    return False
+    # Öğeyi okumadan tek DELETE ile siler; commit çağıran tarafa bırakılır
+    deleted = (
+        db.query(CartItem)
+        .filter(CartItem.id == cart_item_id, CartItem.cart_id == cart_id)
+        .delete(synchronize_session=False)
+    )
+    return deleted > 0
+
+def clear_cart_items(db: Session, cart_id: int) -> None:
+    # Sepet satırını okumadan öğeleri tek DELETE ile siler; commit çağıran tarafa bırakılır
+    db.query(CartItem).filter(CartItem.cart_id == cart_id).delete(synchronize_session=False)
 
 def clear_cart(db: Session, cart_id: int) -> bool:
     cart = db.query(Cart).filter(Cart.id == cart_id).first()
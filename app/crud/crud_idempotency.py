@@ -0,0 +1,66 @@
+# app/crud/crud_idempotency.py
+from sqlalchemy import and_, delete, update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from app.models.idempotency_model import IdempotencyKey
+
+def get_key(db: Session, user_id: int, key: str) -> Optional[IdempotencyKey]:
+    return db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key).first()
+
+def try_create_in_progress(
+    db: Session, user_id: int, key: str, request_fingerprint: str, expires_at: datetime, locked_until: datetime
+) -> Optional[IdempotencyKey]:
+    # Unique kısıt sayesinde aynı anahtarı yalnızca bir istek "sahiplenebilir"; zaten varsa None döner
+    db_key = IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_fingerprint=request_fingerprint,
+        status=IdempotencyKey.IN_PROGRESS,
+        locked_until=locked_until,
+        expires_at=expires_at
+    )
+    db.add(db_key)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return db_key
+
+def complete_key(db: Session, db_key: IdempotencyKey, status_code: int, response_body: str) -> None:
+    db_key.status = IdempotencyKey.COMPLETED
+    db_key.response_status_code = status_code
+    db_key.response_body = response_body
+    db.add(db_key)
+    db.commit()
+
+def mark_outcome_unknown(db: Session, key_id: int) -> None:
+    db.execute(update(IdempotencyKey).where(IdempotencyKey.id == key_id).values(status=IdempotencyKey.OUTCOME_UNKNOWN))
+    db.commit()
+
+def try_take_over(db: Session, key_id: int, now: datetime, locked_until: datetime) -> bool:
+    # Sonucu bilinmeyen ya da kilidi dolmuş (çöken istek) kaydı yeniden IN_PROGRESS yapıp kilitler;
+    # koşullu UPDATE sayesinde yalnızca bir yeniden deneme sahiplenir
+    lock_expired = and_(
+        IdempotencyKey.status == IdempotencyKey.IN_PROGRESS,
+        or_(IdempotencyKey.locked_until.is_(None), IdempotencyKey.locked_until <= now),
+    )
+    result = db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == key_id, or_(IdempotencyKey.status == IdempotencyKey.OUTCOME_UNKNOWN, lock_expired))
+        .values(status=IdempotencyKey.IN_PROGRESS, locked_until=locked_until)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def delete_key(db: Session, key_id: int) -> None:
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == key_id))
+    db.commit()
+
+def delete_expired_keys(db: Session, now: datetime) -> int:
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+    db.commit()
+    return result.rowcount
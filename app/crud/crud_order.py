@@ -1,9 +1,14 @@
 # app/crud/crud_order.py
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import insert, or_, and_, select
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
 
 from app.models.order_model import Order, OrderItem, OrderStatus
 from app.models.user_model import User
+from app.models.product_model import Product
+from app.models import outbox_model
+from app.crud import crud_analytics, crud_outbox
 from app.schemas.order_schemas import OrderCreate # Şimdilik sadece Order'ı oluşturacağız
 # from app.models.cart_model import CartItem as CartItemModel # Sepet öğelerinden veri almak için
 
@@ -43,21 +48,115 @@ def add_item_to_order(
     db.refresh(db_order_item)
     return db_order_item
 
+def create_order_with_items(
+    db: Session,
+    user: User,
+    total_amount: float,
+    items_data: List[Dict[str, Any]], # [{"product_id": int, "quantity": int, "price_at_purchase": float}]
+    status: OrderStatus = OrderStatus.PENDING
+) -> Order:
+    # Sipariş ve tüm kalemleri tek transaction içinde eklenir; commit çağıran tarafa (servise) bırakılır.
+    # Kalemler tek tek db.add/commit/refresh yerine tek bir toplu INSERT (executemany) ile yazılır.
+    db_order = Order(
+        user_id=user.id,
+        total_amount=total_amount,
+        status=status
+    )
+    db.add(db_order)
+    db.flush() # Order ID'sinin oluşması için (commit yok)
+    if items_data:
+        db.execute(
+            insert(OrderItem),
+            [{"order_id": db_order.id, **item_data} for item_data in items_data]
+        )
+    # Satış rollup'ları aynı transaction içinde güncellenir
+    crud_analytics.record_order_placed(
+        db, day=db_order.created_at.date(), status=status, total_amount=total_amount, items_data=items_data
+    )
+    # Sipariş sonrası yan etkiler (onay e-postası vb.) outbox üzerinden arka planda işlenir
+    crud_outbox.add_event(
+        db, outbox_model.ORDER_PLACED, "order", db_order.id,
+        {
+            "order_id": db_order.id, "user_id": user.id, "status": status.value,
+            "total_amount": total_amount, "items": items_data,
+        }
+    )
+    return db_order
+
 def get_order_by_id(db: Session, order_id: int, user_id: Optional[int] = None) -> Optional[Order]:
-    query = db.query(Order).filter(Order.id == order_id)
+    query = db.query(Order).options(
+        selectinload(Order.items).joinedload(OrderItem.product) # Kalemler ve ürünler tek seferde
+    ).filter(Order.id == order_id)
     if user_id: # Eğer kullanıcı ID'si verilmişse, sadece o kullanıcının siparişini getir
         query = query.filter(Order.user_id == user_id)
     return query.first()
 
-def get_orders_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Order]:
-    return db.query(Order).filter(Order.user_id == user_id).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+def _paginate_orders(query, skip: int, limit: int, after: Optional[Tuple[datetime, int]]):
+    # Listeleme yanıtı kalemleri ve ürünleri içerdiği için bunlar sayfa başına sabit sayıda sorguyla yüklenir
+    query = query.options(
+        selectinload(Order.items).joinedload(OrderItem.product)
+    ).order_by(Order.created_at.desc(), Order.id.desc())
+    if after is not None:
+        # Keyset sayfalama: (created_at, id) < son görülen satır; maliyet sayfa derinliğinden bağımsızdır
+        after_created_at, after_id = after
+        query = query.filter(or_(
+            Order.created_at < after_created_at,
+            and_(Order.created_at == after_created_at, Order.id < after_id)
+        ))
+        return query.limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
-def get_all_orders(db: Session, skip: int = 0, limit: int = 100) -> List[Order]: # Admin için
-    return db.query(Order).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+def get_orders_by_user(
+    db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+) -> List[Order]:
+    return _paginate_orders(db.query(Order).filter(Order.user_id == user_id), skip, limit, after)
+
+def get_all_orders(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+) -> List[Order]: # Admin için
+    return _paginate_orders(db.query(Order), skip, limit, after)
+
+def iter_order_export_rows(
+    db: Session,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None,
+    batch_size: int = 1000
+):
+    """
+    Dışa aktarım için sipariş + kalem satırlarını (ORM nesnesi oluşturmadan, sütun olarak) akış halinde döndürür.
+    yield_per sunucu tarafı cursor kullanır; bellekte en fazla batch_size satır tutulur.
+    Aynı siparişin kalemleri ardışık gelir (created_at, order id, item id sıralı).
+    """
+    stmt = (
+        select(
+            Order.id.label("order_id"), Order.user_id, Order.created_at, Order.status, Order.total_amount,
+            OrderItem.product_id, Product.name.label("product_name"), OrderItem.quantity, OrderItem.price_at_purchase
+        )
+        .select_from(Order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .order_by(Order.created_at, Order.id, OrderItem.id)
+    )
+    if created_from is not None:
+        stmt = stmt.where(Order.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Order.created_at < created_to)
+    if status is not None:
+        stmt = stmt.where(Order.status == status)
+    return db.execute(stmt.execution_options(yield_per=batch_size))
 
 def update_order_status(db: Session, order_id: int, status: OrderStatus) -> Optional[Order]:
     db_order = db.query(Order).filter(Order.id == order_id).first()
     if db_order:
+        crud_analytics.record_order_status_change(
+            db, order_id=db_order.id, day=db_order.created_at.date(), old_status=db_order.status, new_status=status, total_amount=db_order.total_amount
+        )
+        if db_order.status != status:
+            crud_outbox.add_event(
+                db, outbox_model.ORDER_STATUS_CHANGED, "order", db_order.id,
+                {"order_id": db_order.id, "user_id": db_order.user_id, "old_status": db_order.status.value, "new_status": status.value}
+            )
         db_order.status = status
         db.commit()
         db.refresh(db_order)
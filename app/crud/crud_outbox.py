@@ -0,0 +1,79 @@
+# app/crud/crud_outbox.py
+import json
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import Session, aliased
+from typing import Any, Dict, List
+from datetime import datetime
+
+from app.models.outbox_model import OutboxEvent
+
+def add_event(db: Session, event_type: str, aggregate_type: str, aggregate_id: int, payload: Dict[str, Any]) -> None:
+    # Olay iş verisiyle aynı transaction'da yazılır; commit çağıran tarafa bırakılır
+    db.add(OutboxEvent(
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload, default=str),
+        status=OutboxEvent.PENDING,
+        next_attempt_at=datetime.utcnow(),
+    ))
+
+def claim_due_events(db: Session, now: datetime, lease_until: datetime, limit: int = 100) -> List[OutboxEvent]:
+    """
+    Zamanı gelmiş bekleyen olayları id sırasıyla alır ve commit eder. Aynı kaynağın daha eski bir bekleyen olayı
+    varsa (ör. yeniden deneme bekliyorsa) sonraki olayları atlanır; böylece kaynak başına sıra korunur.
+    Seçim sırasında satırlar destekleyen veritabanlarında (MySQL) kilitlenir ve diğer worker'lar tarafından
+    atlanır. Alınan olayların next_attempt_at'i lease_until'e ertelenip hemen commit edilir. Böylece kilitler
+    handler'lar çalışırken tutulmaz. Olaylar PENDING kaldığı için aynı kaynağın sonraki olayları beklemeye devam eder.
+    Dönen nesneler session'dan ayrılmıştır (commit sonrası her olay için yeniden yükleme yapılmaz).
+    """
+    earlier = aliased(OutboxEvent)
+    has_earlier_pending = exists().where(
+        earlier.status == OutboxEvent.PENDING,
+        earlier.aggregate_type == OutboxEvent.aggregate_type,
+        earlier.aggregate_id == OutboxEvent.aggregate_id,
+        earlier.id < OutboxEvent.id,
+    )
+    stmt = (
+        select(OutboxEvent)
+        .where(OutboxEvent.status == OutboxEvent.PENDING, OutboxEvent.next_attempt_at <= now, ~has_earlier_pending)
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    try:
+        events = list(db.scalars(stmt))
+        if events:
+            db.execute(
+                update(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events])).values(next_attempt_at=lease_until)
+            )
+        for event in events:
+            db.expunge(event)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return events
+
+# Sonuçlar olay başına ayrı kısa transaction'larda yazılır; commit çağıran tarafa bırakılır
+def mark_delivered(db: Session, event: OutboxEvent, now: datetime) -> None:
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == event.id)
+        .values(status=OutboxEvent.DELIVERED, attempts=OutboxEvent.attempts + 1, processed_at=now, last_error=None)
+    )
+
+def mark_attempt_failed(db: Session, event: OutboxEvent, error: str, next_attempt_at: datetime, give_up: bool) -> None:
+    values: Dict[str, Any] = {"attempts": OutboxEvent.attempts + 1, "last_error": error}
+    if give_up:
+        values["status"] = OutboxEvent.FAILED
+    else:
+        values["next_attempt_at"] = next_attempt_at
+    db.execute(update(OutboxEvent).where(OutboxEvent.id == event.id).values(**values))
+
+def delete_delivered_before(db: Session, cutoff: datetime) -> int:
+    result = db.execute(
+        delete(OutboxEvent).where(OutboxEvent.status == OutboxEvent.DELIVERED, OutboxEvent.processed_at < cutoff)
+    )
+    db.commit()
+    return result.rowcount
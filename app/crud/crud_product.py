@@ -1,15 +1,167 @@
 # app/crud/crud_product.py
+from sqlalchemy import update, insert, bindparam, or_, and_, case, func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Dict, Iterable, Any, Tuple
 
 from app.models.product_model import Product
+from app.schemas import product_schemas
 from app.schemas.product_schemas import ProductCreate, ProductUpdate
+from app.core.config import settings
+from app.db.session import primary_session
+from app.utils.cache import TTLCache
+from app.utils.search import SearchIndex
+
+# Ürün detaylarının (serileştirilmiş şema olarak) read-through önbelleği.
+# create/update/delete ve checkout'taki stok düşümleri commit'ten sonra ilgili kaydı siler.
+# Satın alma kararları (sepete ekleme, checkout) önbelleği değil DB'yi kullanır.
+product_cache = TTLCache(max_size=settings.PRODUCT_CACHE_MAX_SIZE, ttl_seconds=settings.PRODUCT_CACHE_TTL_SECONDS)
+
+# Ürün adı/açıklaması üzerinde tam metin arama için süreç içi indeks.
+# Uygulama açılışında rebuild_search_index ile kurulur, create/update/delete ile artımlı güncellenir.
+# Diğer worker'ların değişiklikleri refresh_search_index_if_stale ile periyodik olarak (yalnızca farklar) yansıtılır.
+# İndeksteki her ürün search_version'ı ile tutulur.
+product_search_index = SearchIndex(field_weights={"name": 2.0, "description": 1.0})
+_indexed_signature: Optional[Tuple[int, Optional[int], int]] = None # Son kurulumdaki ürün tablosu imzası
+
+def invalidate_product_cache(product_ids: Iterable[int]) -> None:
+    for product_id in product_ids:
+        product_cache.delete(product_id)
 
 def get_product(db: Session, product_id: int) -> Optional[Product]:
     return db.query(Product).filter(Product.id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
-    return db.query(Product).offset(skip).limit(limit).all()
+def get_product_cached(db: Session, product_id: int) -> Optional[product_schemas.VersionedProduct]:
+    # Aynı ürün için eşzamanlı ıskalamalar tek bir DB sorgusunda birleştirilir (single-flight).
+    # Iskalamalar birincilden yüklenir: invalidation'dan hemen sonra geride kalan bir replika eski satırı
+    # döndürüp TTL boyunca önbelleğe geri yazabilirdi (read-your-writes yalnızca yazan istemciyi kapsar).
+    def load() -> Optional[product_schemas.VersionedProduct]:
+        with primary_session(db) as session:
+            db_product = get_product(session, product_id=product_id)
+            return product_schemas.VersionedProduct.model_validate(db_product) if db_product else None
+    return product_cache.get_or_load(product_id, load)
+
+def get_products_by_ids(db: Session, product_ids: List[int]) -> List[Product]:
+    # Tek bir IN sorgusu; sonuç verilen ID sırasını korur
+    if not product_ids:
+        return []
+    products_by_id = {p.id: p for p in db.query(Product).filter(Product.id.in_(product_ids)).all()}
+    return [products_by_id[pid] for pid in product_ids if pid in products_by_id]
+
+def search_products(db: Session, query: str, limit: int = 20) -> List[Product]:
+    # Eşleşme ve sıralama indekste yapılır; DB'ye yalnızca PK ile tek sorgu gider
+    ranked_ids = [doc_id for doc_id, _score in product_search_index.search(query, limit=limit)]
+    return get_products_by_ids(db, ranked_ids)
+
+def _search_index_signature(db: Session) -> Tuple[int, Optional[int], int]:
+    # Ürün sayısı, en büyük ID ve arama sürümlerinin toplamı: ekleme, silme ve isim/açıklama değişikliği imzayı
+    # değiştirir; stok düşümleri değiştirmez. Tek toplama sorgusu.
+    # Not: SQLite en büyük ID'yi silinince yeniden kullanabilir; aynı aralıkta silinip aynı ID ile eklenen ürün,
+    # ürünün bir sonraki değişikliğinde yansır (MySQL'in AUTO_INCREMENT sayacı ID'yi yeniden kullanmaz).
+    count, max_id, version_sum = db.query(
+        func.count(Product.id), func.max(Product.id), func.coalesce(func.sum(Product.search_version), 0)
+    ).one()
+    return count, max_id, int(version_sum)
+
+def _iter_in_batches(db: Session, columns: tuple, batch_size: int) -> Iterable[tuple]:
+    # ID üzerinde keyset ile partiler halinde okunur ve her partiden sonra okuma transaction'ı kapatılır:
+    # tüm tabloyu tek transaction'da taramak SQLite'ta yazımları bloklar, MySQL'de uzun bir snapshot tutar
+    last_id = 0
+    while True:
+        rows = db.query(Product.id, *columns).filter(Product.id > last_id).order_by(Product.id).limit(batch_size).all()
+        db.rollback()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+def _iter_search_documents(db: Session, batch_size: int = 1000) -> Iterable[tuple]:
+    for product_id, search_version, name, description in _iter_in_batches(
+        db, (Product.search_version, Product.name, Product.description), batch_size
+    ):
+        yield product_id, search_version, {"name": name, "description": description}
+
+def rebuild_search_index(db: Session) -> int:
+    global _indexed_signature
+    # İmza taramadan önce alınır: tarama sırasında yapılan yazımlar bir sonraki kontrolde fark olarak uygulanır
+    signature = _search_index_signature(db)
+    product_search_index.replace(_iter_search_documents(db))
+    _indexed_signature = signature
+    return len(product_search_index)
+
+def refresh_search_index_if_stale(db: Session, batch_size: int = 1000) -> bool:
+    """
+    İndeks yalnızca bu süreçteki yazımlarla artımlı güncellenir; diğer worker'ların (veya toplu içe aktarmanın)
+    yaptığı değişiklikler burada görünmez. Ürün tablosunun imzası son kontrolden beri değiştiyse ürünlerin
+    (ID, search_version) listesi indekstekiyle karşılaştırılır; silinenler çıkarılır, yalnızca eklenen ve
+    isim/açıklaması değişen ürünler okunup yeniden indekslenir. Bir fark uygulandıysa True döner.
+    """
+    global _indexed_signature
+    # İmza karşılaştırmadan önce alınır: arada yapılan yazımlar bir sonraki kontrolde yakalanır
+    signature = _search_index_signature(db)
+    if signature == _indexed_signature:
+        return False
+    indexed = product_search_index.versions()
+    current = dict(_iter_in_batches(db, (Product.search_version,), batch_size * 10)) # Yalnızca iki tamsayı sütunu
+
+    for product_id in indexed.keys() - current.keys():
+        product_search_index.remove(product_id)
+    changed_ids = [product_id for product_id, search_version in current.items() if indexed.get(product_id) != search_version]
+    for start in range(0, len(changed_ids), batch_size):
+        rows = (
+            db.query(Product.id, Product.search_version, Product.name, Product.description)
+            .filter(Product.id.in_(changed_ids[start:start + batch_size])).all()
+        )
+        db.rollback()
+        for product_id, search_version, name, description in rows:
+            product_search_index.add(product_id, version=search_version, name=name, description=description)
+    _indexed_signature = signature
+    return True
+
+# sıralama -> (sıralama sütunu veya None (yalnızca ID), azalan mı); eşitlikte her zaman ID ile sıralanır
+_PRODUCT_SORTS = {
+    None: (None, False),
+    product_schemas.ProductSort.PRICE: (Product.price, False),
+    product_schemas.ProductSort.PRICE_DESC: (Product.price, True),
+    product_schemas.ProductSort.NAME: (Product.name, False),
+    product_schemas.ProductSort.NEWEST: (None, True),
+}
+
+def get_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    after_value: Any = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    sort: Optional[product_schemas.ProductSort] = None
+) -> List[Product]:
+    # Filtreler ve sıralama SQL'e aktarılır; her filtre/sıralama çiftinin planı için bkz. Product.__table_args__
+    query = db.query(Product)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock is not None:
+        query = query.filter(Product.stock_quantity > 0 if in_stock else Product.stock_quantity == 0)
+
+    sort_column, descending = _PRODUCT_SORTS[sort]
+    if sort_column is not None:
+        query = query.order_by(sort_column.desc() if descending else sort_column, Product.id.desc() if descending else Product.id)
+    else:
+        query = query.order_by(Product.id.desc() if descending else Product.id)
+
+    if after_id is not None:
+        # Keyset sayfalama: önceki satırları tarayıp atmak yerine sıralama anahtarı üzerinde seek yapılır
+        if sort_column is None:
+            query = query.filter(Product.id < after_id if descending else Product.id > after_id)
+        elif descending:
+            query = query.filter(or_(sort_column < after_value, and_(sort_column == after_value, Product.id < after_id)))
+        else:
+            query = query.filter(or_(sort_column > after_value, and_(sort_column == after_value, Product.id > after_id)))
+        return query.limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def create_product(db: Session, product_in: ProductCreate) -> Product:
     db_product = Product(**product_in.model_dump()) # Pydantic v2
@@ -17,18 +169,85 @@ def create_product(db: Session, product_in: ProductCreate) -> Product:
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    invalidate_product_cache([db_product.id])
+    product_search_index.add(
+        db_product.id, version=db_product.search_version, name=db_product.name, description=db_product.description
+    )
     return db_product
 
+def _upsert_statement(db: Session):
+    # ID'ye göre "varsa güncelle, yoksa ekle"; sözdizimi veritabanına özgüdür
+    table = Product.__table__
+    updatable = [column.name for column in table.columns if column.name not in ("id", "version", "search_version")]
+
+    def bump_versions(incoming) -> Dict[str, Any]:
+        # Güncellenen satırın sürümü sıfırlanmaz, artırılır; arama sürümü yalnızca isim/açıklama değiştiyse artar.
+        # Sürümler ilk sırada atanır: MySQL ON DUPLICATE KEY UPDATE'te sonraki atamalar güncellenmiş değerleri görür
+        content_changed = or_(
+            table.c.name.is_distinct_from(incoming.name), table.c.description.is_distinct_from(incoming.description)
+        )
+        return {
+            "version": table.c.version + 1,
+            "search_version": table.c.search_version + case((content_changed, 1), else_=0),
+        }
+
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        # Sıra korunsun diye (sütun sırasına göre yeniden dizilmesin) sözlük yerine (sütun, değer) listesi verilir
+        return stmt.on_duplicate_key_update(
+            list(bump_versions(stmt.inserted).items()) + [(name, stmt.inserted[name]) for name in updatable]
+        )
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.id], set_={**bump_versions(stmt.excluded), **{name: stmt.excluded[name] for name in updatable}}
+        )
+    raise ValueError(f"Upsert is not supported for database dialect '{dialect_name}'.")
+
+def bulk_write_products(db: Session, rows: List[Dict[str, Any]], upsert: bool = False) -> int:
+    """
+    Doğrulanmış ürün satırlarını tek transaction'da toplu (executemany) yazar ve commit eder.
+    upsert=True ise 'id' içeren satırlar ID'ye göre eklenir/güncellenir. Hata olursa transaction geri alınır.
+    Önbellek/arama indeksi güncellemesi çağıran tarafa bırakılır.
+    """
+    new_rows = [row for row in rows if row.get("id") is None]
+    keyed_rows = [row for row in rows if row.get("id") is not None]
+    try:
+        if new_rows:
+            db.execute(insert(Product.__table__), [{k: v for k, v in row.items() if k != "id"} for row in new_rows])
+        if keyed_rows:
+            db.execute(_upsert_statement(db) if upsert else insert(Product.__table__), keyed_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
 def update_product(db: Session, db_product: Product, product_in: ProductUpdate) -> Product:
     product_data = product_in.model_dump(exclude_unset=True) # Pydantic v2
     # product_data = product_in.dict(exclude_unset=True) # Pydantic v1
     
+    # Aranan alanlar değişmediyse arama sürümü ve indeks olduğu gibi kalır
+    search_content_changed = any(
+        field in ("name", "description") and getattr(db_product, field) != value for field, value in product_data.items()
+    )
     for field, value in product_data.items():
         setattr(db_product, field, value)
+    db_product.version = Product.version + 1 # SQL tarafında artırılır (eşzamanlı stok düşümüyle yarışmaz); updated_at onupdate ile
+    if search_content_changed:
+        db_product.search_version = Product.search_version + 1
     
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    invalidate_product_cache([db_product.id])
+    if search_content_changed:
+        product_search_index.add(
+            db_product.id, version=db_product.search_version, name=db_product.name, description=db_product.description
+        )
     return db_product
 
 def delete_product(db: Session, product_id: int) -> Optional[Product]:
@@ -36,4 +255,40 @@ def delete_product(db: Session, product_id: int) -> Optional[Product]:
     if db_product:
         db.delete(db_product)
         db.commit()
-    return db_product # Silinen ürünü veya bulunamadıysa None döner
\ No newline at end of file
+        invalidate_product_cache([product_id])
+        product_search_index.remove(product_id)
+    return db_product # Silinen ürünü veya bulunamadıysa None döner
+
+class InsufficientStockError(ValueError):
+    """Koşullu stok düşümü sırasında yeterli stok kalmadığında fırlatılır."""
+    pass
+
+def decrement_stock(db: Session, quantities: Dict[int, int]) -> None:
+    # {product_id: quantity} için koşullu UPDATE:
+    #   UPDATE products SET stock_quantity = stock_quantity - :q, version = version + 1, updated_at = :now
+    #   WHERE id = :id AND stock_quantity >= :q
+    # Okuma-sonra-yazma yapılmadığı için eşzamanlı siparişlerde stok kaybolmaz / eksiye düşmez.
+    # Etkilenen satır sayısı beklenenden azsa stok yetersizdir; commit/rollback çağıran tarafa bırakılır.
+    # Commit'ten sonra çağıran taraf invalidate_product_cache ile önbelleği temizlemelidir.
+    if not quantities:
+        return
+    table = Product.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("product_id"), table.c.stock_quantity >= bindparam("quantity"))
+        .values(stock_quantity=table.c.stock_quantity - bindparam("quantity"), version=table.c.version + 1) # updated_at: onupdate
+    )
+    # Sabit sıralama, eşzamanlı transaction'ların satır kilitlerini aynı sırayla almasını sağlar (deadlock önlemi)
+    params = [{"product_id": pid, "quantity": qty} for pid, qty in sorted(quantities.items())]
+
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        # Sürücü executemany için toplam rowcount'u doğru veriyorsa tek round trip yeterli
+        result = db.execute(stmt, params)
+        if result.rowcount != len(params):
+            raise InsufficientStockError("Not enough stock for one or more products in the order.")
+        return
+
+    for param in params:
+        result = db.execute(stmt, param)
+        if result.rowcount != 1:
+            raise InsufficientStockError(f"Not enough stock for product with ID {param['product_id']}.")
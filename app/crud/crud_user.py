@@ -3,8 +3,14 @@ from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.models.user_model import User
-from app.schemas.user_schemas import UserCreate, UserUpdate
+from app.schemas.user_schemas import UserCreate, UserUpdate, User as UserSnapshot
 from app.core.security import get_password_hash
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+# Kimliği doğrulanmış kullanıcıların (email -> hafif kullanıcı görüntüsü) önbelleği.
+# Her yetkili istekte users tablosuna gidilmesini önler; update_user/delete_user ile geçersiz kılınır.
+principal_cache = TTLCache(max_size=settings.AUTH_CACHE_MAX_SIZE, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS)
 
 def get_user(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
@@ -12,6 +18,15 @@ def get_user(db: Session, user_id: int) -> Optional[User]:
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
+def get_user_principal(db: Session, email: str, max_age_seconds: Optional[float] = None) -> Optional[UserSnapshot]:
+    # Önce önbelleğe bak, yoksa DB'den yükleyip ORM'den bağımsız bir görüntü (snapshot) olarak sakla.
+    # get_or_load, yükleme sürerken update_user/delete_user invalidation yaparsa okunan (eski) görüntüyü saklamaz;
+    # aksi halde deaktive edilmiş bir kullanıcı TTL boyunca doğrulanmaya devam edebilirdi.
+    def load() -> Optional[UserSnapshot]:
+        db_user = get_user_by_email(db, email=email)
+        return UserSnapshot.model_validate(db_user) if db_user else None
+    return principal_cache.get_or_load(email, load, ttl_seconds=max_age_seconds)
+
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
     return db.query(User).offset(skip).limit(limit).all()
 
@@ -29,6 +44,7 @@ def create_user(db: Session, user_in: UserCreate) -> User:
     return db_user
 
 def update_user(db: Session, db_user: User, user_in: UserUpdate) -> User:
+    old_email = db_user.email
     user_data = user_in.model_dump(exclude_unset=True) # Pydantic v2
     # user_data = user_in.dict(exclude_unset=True) # Pydantic v1
     
@@ -43,6 +59,9 @@ def update_user(db: Session, db_user: User, user_in: UserUpdate) -> User:
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    # Commit'ten sonra önbellekteki eski görüntüyü (email değişmiş olabilir, ikisini de) sil
+    principal_cache.delete(old_email)
+    principal_cache.delete(db_user.email)
     return db_user
 
 def delete_user(db: Session, user_id: int) -> Optional[User]:
@@ -50,4 +69,5 @@ def delete_user(db: Session, user_id: int) -> Optional[User]:
     if db_user:
         db.delete(db_user)
         db.commit()
+        principal_cache.delete(db_user.email)
     return db_user # Silinen kullanıcıyı veya bulunamadıysa None döner
\ No newline at end of file
@@ -1,23 +1,227 @@
 # app/db/session.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+import itertools
+import threading
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 from app.core.config import settings
+from app.utils.cache import TTLCache
 
 # MySQL için bağlantı string'i .env dosyasından alınacak
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL) # pool_pre_ping=True eklenebilir production için
+def _create_engine(url: str, pool_size: int, max_overflow: int, pre_ping: bool, recycle_seconds: int) -> Engine:
+    options = {"pool_pre_ping": pre_ping, "pool_recycle": recycle_seconds}
+    parsed_url = make_url(url)
+    if not (parsed_url.get_backend_name() == "sqlite" and parsed_url.database in (None, "", ":memory:")):
+        options.update(pool_size=pool_size, max_overflow=max_overflow) # Bellek içi SQLite havuz boyutunu desteklemez
+    return create_engine(url, **options)
+
+# Engine'ler ilk kullanımda oluşturulur; modülü import etmek (ör. testler, Alembic, CLI araçları)
+# bağlantı havuzu kurmaz ve veritabanı sürücüsünü yüklemez.
+_engine: Optional[Engine] = None
+_read_engines: Optional[List[Engine]] = None
+_read_sessionmakers: List[sessionmaker] = []
+_next_read_sessionmaker = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """Birincil (yazma) veritabanı engine'i."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine(
+                    SQLALCHEMY_DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW,
+                    settings.DB_POOL_PRE_PING, settings.DB_POOL_RECYCLE_SECONDS
+                )
+    return _engine
+
+def get_read_engines() -> List[Engine]:
+    """Okuma replikaları (DATABASE_READ_URLS boşsa okumalar da birincil veritabanına gider)."""
+    global _read_engines, _read_sessionmakers, _next_read_sessionmaker
+    if _read_engines is None:
+        with _engine_lock:
+            if _read_engines is None:
+                read_engines = [
+                    _create_engine(
+                        url.strip(), settings.READ_DB_POOL_SIZE, settings.READ_DB_MAX_OVERFLOW,
+                        settings.READ_DB_POOL_PRE_PING, settings.READ_DB_POOL_RECYCLE_SECONDS
+                    )
+                    for url in settings.DATABASE_READ_URLS.split(",") if url.strip()
+                ]
+                _read_sessionmakers = [
+                    sessionmaker(autocommit=False, autoflush=False, bind=read_engine) for read_engine in read_engines
+                ]
+                _next_read_sessionmaker = itertools.cycle(_read_sessionmakers) if _read_sessionmakers else None
+                _read_engines = read_engines
+    return _read_engines
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def __getattr__(name: str):
+    # Geriye dönük uyumluluk: `from app.db.session import engine` çalışmaya devam etsin (engine o anda oluşturulur)
+    if name == "engine":
+        return get_engine()
+    if name == "read_engines":
+        return get_read_engines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up_pools(connections_per_engine: int) -> int:
+    """
+    Birincil ve replika havuzlarında bağlantıları önceden açıp havuza geri bırakır; ilk isteklerin bağlantı
+    kurma (TCP + kimlik doğrulama) maliyetini başlangıca taşır. Açılan bağlantı sayısını döner.
+    """
+    opened = 0
+    for pool_engine in [get_engine(), *get_read_engines()]:
+        count = min(connections_per_engine, pool_engine.pool.size()) if hasattr(pool_engine.pool, "size") else 1
+        connections = []
+        try:
+            for _ in range(count):
+                connections.append(pool_engine.connect())
+                opened += 1
+        finally:
+            for connection in connections:
+                connection.close() # Bağlantı kapanmaz, havuza döner
+    return opened
+
+class _LazySessionmaker(sessionmaker):
+    # İlk session açılırken birincil engine'e bağlanır
+    def __call__(self, **local_kw) -> Session:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+# Read-your-writes: yazma yapan istemci (Authorization başlığı) bu süre boyunca okumalarda birincile yönlendirilir.
+# Süreç içidir; birden fazla worker/sunucuda aynı istemcinin istekleri farklı süreçlere düşerse garanti zayıflar.
+_recent_writers = TTLCache(max_size=100000, ttl_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+def _client_key(request: Request) -> Optional[str]:
+    return request.headers.get("authorization")
+
+@event.listens_for(SessionLocal, "after_commit")
+def _pin_writer_to_primary(session: Session):
+    client_key = session.info.get("client_key")
+    if client_key and get_read_engines():
+        _recent_writers.set(client_key, True)
+
+def get_read_session() -> Session:
+    """Round-robin ile bir okuma replikasına session açar (replika yoksa birincile)."""
+    get_read_engines()
+    if _next_read_sessionmaker is None:
+        return SessionLocal()
+    return next(_next_read_sessionmaker)()
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """
+    db birincile bağlıysa onu, replikaya bağlıysa birincilde yeni bir session verir. Süreçler arası paylaşılan
+    sonuçları (ör. önbelleğe yazılacak kayıtlar) gecikmeli bir replikadan okumamak için.
+    """
+    if db.get_bind() is get_engine():
+        yield db
+        return
+    with SessionLocal() as session:
+        yield session
+
 # Dependency olarak kullanılacak veritabanı session'ı
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["client_key"] = _client_key(request) # Commit olursa bu istemcinin okumaları birincile sabitlenir
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Salt okunur endpoint'ler için: replikaya gider, ancak yakın zamanda yazma yapan istemci birincilden okur
+def get_read_db(request: Request):
+    client_key = _client_key(request)
+    if client_key and _recent_writers.get(client_key):
+        db = SessionLocal()
+    else:
+        db = get_read_session()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Sorgu sayımı ve süresi (istek başına) ---
+class QueryStats:
+    """Bir istek (veya track_queries bloğu) boyunca çalışan SQL sorgularının sayısı, toplam süresi ve tekrarları."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0 # saniye
+        self.statements: Counter = Counter() # SQL metni (parametresiz şekli) -> çalışma sayısı
+
+    def repeated_statements(self, threshold: int):
+        """threshold'dan fazla tekrarlanan sorgu şekillerini (muhtemel N+1) döner."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+# Threadpool'da çalışan senkron endpoint'ler de aynı nesneyi görür (context kopyalanır, nesne paylaşılır)
+_current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute") # Birincil ve replika engine'lerin hepsi için
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_query_stats.get() is not None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_query_stats.get()
+    start_times = conn.info.get("query_start_times")
+    if stats is None or not start_times:
+        return
+    stats.total_time += time.perf_counter() - start_times.pop()
+    stats.count += 1
+    stats.statements[statement] += 1
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Blok içinde (bu context'te) çalışan sorguları sayar."""
+    stats = QueryStats()
+    token = _current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_query_stats.reset(token)
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Blok süresince tüm engine'lerde çalışan sorguları sayar. track_queries'ten farkı context'e bağlı olmamasıdır:
+    TestClient istekleri kendi thread'inde çalıştırdığından testler ve benchmark bunu kullanır.
+    """
+    stats = QueryStats()
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        stats.count += 1
+        stats.statements[statement] += 1
+
+    event.listen(Engine, "after_cursor_execute", count_query)
+    try:
+        yield stats
+    finally:
+        event.remove(Engine, "after_cursor_execute", count_query)
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """Testlerde bir endpoint/işlemin en fazla max_queries sorgu çalıştırdığını doğrular (bkz. count_queries)."""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        details = "\n".join(f"  {count}x {statement}" for statement, count in stats.statements.most_common(10))
+        raise AssertionError(f"Expected at most {max_queries} queries, got {stats.count}:\n{details}")
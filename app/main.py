@@ -1,35 +1,67 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.api.api_v1.api import api_router as api_v1_router
-from app.db.session import engine, Base
-import app.models.user_model # User modelinin Base.metadata'ya kaydedilmesi için
-import app.models.product_model
-import app.models.cart_model
-import app.models.order_model
-
-# Eğer Alembic kullanmıyorsanız ve tabloları uygulama başlangıcında oluşturmak isterseniz:
-CREATE_TABLES = True # <<< Kontrolü kolaylaştırmak için bir değişken kullanabilirsiniz
-
-if CREATE_TABLES:
-    print("Checking/Creating database tables...")
-    # Modellerin Base'i app.db.session'dan miras aldığından
-    # ve modellerin uygulamanız tarafından import edildiğinden emin olun.
-    # `import app.models.user_model` satırı User modelinin yüklenmesini ve
-    # Base.metadata'ya kaydedilmesini sağlar.
-    # Diğer modelleriniz için de benzer importlar eklemeniz gerekecektir:
-    # import app.models.product_model # (Eklendiğinde)
-    # import app.models.order_model # (Eklendiğinde)
-    Base.metadata.create_all(bind=engine)
-    print("Database tables checked/created.")
+from app.db.session import SessionLocal, warm_up_pools
+from app.core.config import settings
+from app.crud import crud_product
+from app.core.security import PasswordHashingBusyError, shutdown_hash_pool
+from app.core.middleware import QueryStatsMiddleware, MetricsMiddleware, CompressionMiddleware
+from app.core.metrics import registry as metrics_registry
+from app.utils.metrics import CONTENT_TYPE_LATEST
+from app.services.payment_service import close_gateway_client
+from app.services import outbox_service, product_service
+from app.db import base as _models # noqa: F401 - Tüm modellerin mapper'ları (ilişkiler) çözülebilsin diye
+
+# Veritabanı şeması Alembic migration'ları ile yönetilir (`alembic upgrade head`); uygulama import edilirken
+# veya başlarken tablo oluşturulmaz/kontrol edilmez.
+
+
+def _build_search_index() -> None:
+    # Ürün arama indeksini bir kez kur; sonrasında bu süreçteki yazımlarla artımlı, diğer worker'ların
+    # yazımları için SEARCH_INDEX_REFRESH_SECONDS aralığıyla güncellenir
+    with SessionLocal() as db:
+        indexed = crud_product.rebuild_search_index(db)
+    print(f"Product search index built with {indexed} products.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Başlangıç ---
+    if settings.DB_POOL_WARMUP_CONNECTIONS > 0:
+        opened = await run_in_threadpool(warm_up_pools, settings.DB_POOL_WARMUP_CONNECTIONS)
+        print(f"Database pools warmed up with {opened} connections.")
+    await run_in_threadpool(_build_search_index)
+    if settings.SEARCH_INDEX_REFRESH_SECONDS > 0:
+        product_service.start_search_index_refresher()
+    if settings.OUTBOX_WORKER_ENABLED:
+        outbox_service.start_worker()
+    yield
+    # --- Kapanış ---
+    await product_service.stop_search_index_refresher()
+    await outbox_service.stop_worker()
+    shutdown_hash_pool()
+    await close_gateway_client() # Paylaşılan ödeme gateway bağlantı havuzunu kapat
 
 
 app = FastAPI(
     title="E-Ticaret Projesi API",
     description="İstanbul Sağlık ve Teknoloji Üniversitesi - Yazılım Mimarisi ve Tasarımı Dersi Projesi",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
+if settings.DEBUG or settings.SQL_REPEATED_QUERY_WARNING_THRESHOLD > 0:
+    # İstek başına SQL sorgu sayısı/süresi ve N+1 uyarıları
+    app.add_middleware(QueryStatsMiddleware)
+if settings.GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_COMPRESS_LEVEL)
+app.add_middleware(MetricsMiddleware) # En dışta: tüm istek süresini ölçer
+
 # CORS Middleware (Eğer frontend farklı bir domain/port üzerinde çalışacaksa)
 # app.add_middleware(
 #     CORSMiddleware,
@@ -39,6 +71,20 @@ app = FastAPI(
 #     allow_headers=["*"],
 # )
 
+@app.exception_handler(PasswordHashingBusyError)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusyError):
+    # Şifre hash havuzu doygun: isteği kuyrukta bekletmek yerine hızlıca reddet
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    # Prometheus metin formatı
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "E-Ticaret API'sine Hoş Geldiniz!"}
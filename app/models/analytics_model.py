@@ -0,0 +1,27 @@
+# app/models/analytics_model.py
+# Satış raporları için önceden toplanmış (rollup) tablolar.
+# Checkout ve sipariş durumu güncellemesi ile aynı transaction içinde artımlı olarak güncellenir;
+# böylece raporlar orders/order_items üzerinde GROUP BY taraması yapmadan okunabilir.
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, Enum as SQLAlchemyEnum
+
+from app.db.session import Base
+from app.models.order_model import OrderStatus
+
+class DailyProductSales(Base):
+    __tablename__ = "daily_product_sales"
+
+    day = Column(Date, primary_key=True) # Siparişin oluşturulduğu gün (UTC)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, index=True)
+    # Siparişin şu anki durumu: durum değişince satırlar taşınır, raporlar iptal/başarısız siparişleri dışarıda bırakabilir
+    status = Column(SQLAlchemyEnum(OrderStatus), primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0) # quantity * price_at_purchase toplamı
+    order_count = Column(Integer, nullable=False, default=0) # Bu ürünü içeren sipariş sayısı
+
+class DailyOrderStatusSales(Base):
+    __tablename__ = "daily_order_status_sales"
+
+    day = Column(Date, primary_key=True) # Siparişin oluşturulduğu gün (UTC)
+    status = Column(SQLAlchemyEnum(OrderStatus), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0) # O gün oluşturulup şu an bu durumda olan siparişler
+    revenue = Column(Float, nullable=False, default=0.0) # Bu siparişlerin total_amount toplamı
@@ -0,0 +1,33 @@
+# app/models/idempotency_model.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+
+from app.db.session import Base
+
+class IdempotencyKey(Base):
+    """
+    İstemcinin gönderdiği Idempotency-Key ile yapılan isteğin parmak izi ve nihai yanıtı.
+    Aynı anahtarla tekrar gelen istekler yeniden çalıştırılmaz, saklanan yanıt döndürülür.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"), # Anahtarlar kullanıcı bazında tekildir
+    )
+
+    IN_PROGRESS = "IN_PROGRESS"
+    COMPLETED = "COMPLETED"
+    # İşlemin yan etkisi (ör. ödeme zaman aşımı) gerçekleşmiş olabilir: kayıt silinmez, aynı anahtarla gelen
+    # yeniden deneme işlemi tekrar çalıştırır (aşağı akışa iletilen anahtar sayesinde yan etki tekrarlanmaz)
+    OUTCOME_UNKNOWN = "OUTCOME_UNKNOWN"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_fingerprint = Column(String(64), nullable=False) # İstek parametrelerinin SHA-256 özeti
+    status = Column(String(20), nullable=False, default=IN_PROGRESS)
+    response_status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True) # JSON
+    # IN_PROGRESS kaydının kilidi; süresi dolan kayıt (çöken/iptal edilen istek) yeniden denemeyle devralınır
+    locked_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
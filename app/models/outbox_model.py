@@ -0,0 +1,38 @@
+# app/models/outbox_model.py
+# Transactional outbox: checkout gibi işlemlerin yan etkileri (bildirim vb.) iş verisiyle aynı
+# transaction'da bu tabloya olay olarak yazılır ve arka plandaki worker tarafından işlenir.
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+
+from app.db.session import Base
+
+# Olay tipleri
+ORDER_PLACED = "order.placed"
+ORDER_STATUS_CHANGED = "order.status_changed"
+PAYMENT_CAPTURED = "payment.captured"
+PAYMENT_REFUND_REQUESTED = "payment.refund_requested" # Ödeme alındı ama sipariş oluşturulamadı
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Worker sorgusu: işlenmeyi bekleyen ve zamanı gelmiş olaylar, id sırasıyla
+        Index("ix_outbox_events_status_next_attempt_at_id", "status", "next_attempt_at", "id"),
+        # Aynı kaynağın (ör. sipariş) daha önceki bekleyen olayını bulmak için (sıralama garantisi)
+        Index("ix_outbox_events_status_aggregate_id", "status", "aggregate_type", "aggregate_id", "id"),
+    )
+
+    PENDING = "PENDING"
+    DELIVERED = "DELIVERED"
+    FAILED = "FAILED" # Deneme hakkı bitti (dead letter); elle incelenmeli
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(100), nullable=False) # ör. "order.placed"
+    aggregate_type = Column(String(50), nullable=False) # ör. "order"
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False) # JSON
+    status = Column(String(20), nullable=False, default=PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
@@ -1,11 +1,21 @@
 # app/models/product_model.py
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, Index, DateTime, func
 from sqlalchemy.orm import relationship # Eğer ürün ile başka tablolar arasında ilişki olacaksa
+from datetime import datetime
 
 from app.db.session import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Fiyat aralığı filtresi ve (price, id) sıralaması. Fiyat sıralamasında in_stock koşulu satıra gitmeden
+        # indeksteki stok sütunundan elenir. Fiyat aralığı + başka sıralamada yalnızca aralıktaki satırlar sıralanır.
+        Index("ix_products_price_id_stock_quantity", "price", "id", "stock_quantity"),
+        # in_stock=false (stock_quantity = 0): stokta olmayan satırlara doğrudan seek; ID sıralaması indeksten gelir.
+        # in_stock=true seçici olmadığından (çoğu ürün stokta) sıralama indeksi taranıp LIMIT dolunca durulur.
+        # Bkz. tests/test_crud/test_product_listing_plans.py
+        Index("ix_products_stock_quantity_id", "stock_quantity", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), index=True, nullable=False)
@@ -13,6 +23,12 @@ class Product(Base):
     price = Column(Float, nullable=False)
     stock_quantity = Column(Integer, nullable=False, default=0) # Stok miktarı
     image_url = Column(String(500), nullable=True) # Ürün görseli URL'i
+    # Satır sürümü: ürünü değiştiren her yazma (update_product, stok düşümü, upsert) bir artırır; ETag'ler buradan üretilir
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Aranan alanların (isim, açıklama) sürümü: yalnızca bu alanlar değişince artar (stok düşümü artırmaz).
+    # Arama indeksi diğer worker'ların yazımlarını bu sürümle fark eder
+    search_version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
     order_items = relationship("OrderItem", back_populates="product")
 
     # Örnek: Eğer bir kategoriye aitse
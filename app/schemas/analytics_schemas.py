@@ -0,0 +1,40 @@
+# app/schemas/analytics_schemas.py
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+from app.models.order_model import OrderStatus
+
+class DailyRevenue(BaseModel):
+    day: date
+    order_count: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+class DailyStatusSales(BaseModel):
+    day: date
+    status: OrderStatus
+    order_count: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+class TopProduct(BaseModel):
+    product_id: int
+    name: Optional[str] = None # Ürün silinmişse boş olabilir
+    units: int
+    revenue: float
+    order_count: int
+
+    class Config:
+        from_attributes = True
+
+class RollupRebuildResult(BaseModel):
+    daily_product_sales: int
+    daily_order_status_sales: int
+
+class RollupCheckResult(BaseModel):
+    consistent: bool
+    mismatches: List[str] = []
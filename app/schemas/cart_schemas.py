@@ -1,6 +1,7 @@
 # app/schemas/cart_schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional
+import enum
 from .product_schemas import Product # Sepetteki ürünleri göstermek için
 
 class CartItemBase(BaseModel):
@@ -32,4 +33,38 @@ class Cart(CartBase): # Kullanıcıya döndürülecek sepet şeması
     total_cart_price: float = 0.0 # Sepet toplamını da ekleyelim
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# PATCH /cart için toplu işlemler
+class CartOperationType(str, enum.Enum):
+    SET = "set"       # Miktarı verilen değere ayarla (0 = kaldır)
+    ADD = "add"       # Mevcut miktara ekle (sepette yoksa ekler)
+    REMOVE = "remove" # Ürünü sepetten kaldır (sepette yoksa etkisizdir)
+
+class CartOperation(BaseModel):
+    op: CartOperationType
+    product_id: int
+    quantity: Optional[int] = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def check_quantity(self) -> "CartOperation":
+        if self.op == CartOperationType.ADD and not self.quantity:
+            raise ValueError("'add' requires a positive quantity")
+        if self.op == CartOperationType.SET and self.quantity is None:
+            raise ValueError("'set' requires a quantity")
+        return self
+
+class CartBatchUpdate(BaseModel):
+    # İşlemler sırayla uygulanır; biri bile geçersizse hiçbiri uygulanmaz
+    operations: List[CartOperation] = Field(..., min_length=1, max_length=100)
+
+# Tek öğe yazımlarında (?return=...) yanıt biçimi
+class CartReturn(str, enum.Enum):
+    REPRESENTATION = "representation" # Sepetin tamamı (varsayılan)
+    MINIMAL = "minimal"               # Yalnızca değişen satır ve yeni toplamlar
+
+class CartMutationResult(BaseModel): # ?return=minimal yanıtı
+    cart_id: int
+    item: Optional[CartItem] = None # Değişen satır; satır silindiyse None
+    item_count: int
+    total_cart_price: float
@@ -2,6 +2,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
+import enum
 from .product_schemas import Product # OrderItem'da ürün detayları için
 from app.models.order_model import OrderStatus # Enum'u kullanmak için
 
@@ -41,4 +42,9 @@ class Order(OrderBase): # Veritabanından okunan veya kullanıcıya döndürüle
     items: List[OrderItem] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# GET /orders/admin/export için
+class OrderExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
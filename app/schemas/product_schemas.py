@@ -1,7 +1,9 @@
 # app/schemas/product_schemas.py
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import Optional, List
 from pydantic import Field
+from datetime import datetime
+import enum
 
 
 class ProductBase(BaseModel):
@@ -30,6 +32,11 @@ class ProductInDBBase(ProductBase):
 class Product(ProductInDBBase):
     pass
 
+class VersionedProduct(Product):
+    # Önbellekte tutulan ürün: ETag / Last-Modified için satır sürümünü taşır, yanıta yazılmaz
+    version: int = Field(..., exclude=True)
+    updated_at: datetime = Field(..., exclude=True)
+
 # Listeleme için daha basit bir şema da tanımlanabilir (opsiyonel)
 class ProductSimple(BaseModel):
     id: int
@@ -38,4 +45,29 @@ class ProductSimple(BaseModel):
     image_url: Optional[HttpUrl] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# GET /products için sunucu tarafı sıralama seçenekleri
+class ProductSort(str, enum.Enum):
+    PRICE = "price"          # Fiyata göre artan
+    PRICE_DESC = "-price"    # Fiyata göre azalan
+    NAME = "name"            # İsme göre
+    NEWEST = "newest"        # En yeni eklenen önce (ID'ye göre azalan)
+
+# POST /products/bulk için
+class ProductImportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class ProductImportRowError(BaseModel):
+    row: int # 1'den başlayan veri satırı numarası (CSV başlığı hariç)
+    errors: List[str]
+
+class ProductImportResult(BaseModel):
+    rows_received: int
+    rows_imported: int
+    rows_failed: int
+    errors: List[ProductImportRowError] = []
+    errors_truncated: bool = False # Hata raporu PRODUCT_IMPORT_MAX_ERRORS ile sınırlandırıldıysa True
+    elapsed_seconds: float
+    rows_per_second: float
@@ -5,9 +5,11 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 from app.crud import crud_user
 from app.models.user_model import User
+from app.schemas.user_schemas import User as UserSnapshot
 from app.schemas.token_schemas import TokenData
 from app.core.security import verify_password, create_access_token, ALGORITHM, SECRET_KEY
 from jose import JWTError, jwt
+import time
 from app.db.session import get_db
 
 # OAuth2 şeması, token'ı Authorization header'ından "Bearer <token>" olarak alır.
@@ -25,9 +27,14 @@ def authenticate_user(db: Session, email: str, password: str) -> User | None:
     return user
 
 # Token'dan geçerli kullanıcıyı almak için dependency
-async def get_current_user(
+# Not: Bu dependency'ler bilerek `async def` değil, `def` olarak tanımlıdır. İçlerinde senkron
+# (bloklayan) SQLAlchemy session'ı ile DB sorgusu yapıldığı için FastAPI bunları threadpool'da
+# çalıştırır; böylece event loop bloklanmaz ve diğer istekler beklemez.
+# Dönen nesne ORM User değil, önbellekten gelebilen hafif bir kullanıcı görüntüsüdür (id, email,
+# full_name, is_active, is_superuser); endpoint'ler yalnızca bu alanları kullanır.
+def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+) -> UserSnapshot:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -39,17 +46,20 @@ async def get_current_user(
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
+        expires_at = payload.get("exp")
     except JWTError:
         raise credentials_exception
-    
-    user = crud_user.get_user_by_email(db, email=token_data.email)
+
+    # Önbellek kaydı token'ın geçerlilik süresinden uzun yaşamaz
+    max_age = expires_at - time.time() if expires_at else None
+    user = crud_user.get_user_principal(db, email=token_data.email, max_age_seconds=max_age)
     if user is None:
         raise credentials_exception
     if not user.is_active: # Token geçerli olsa bile kullanıcı deaktive edilmiş olabilir
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     # Bu fonksiyon get_current_user'ı çağırır ve kullanıcının aktif olup olmadığını bir kez daha kontrol eder.
     # Aslında get_current_user içinde bu kontrol zaten var, ama bazen daha spesifik roller için
     # (örn: get_current_active_superuser) bu tür katmanlı dependency'ler kullanışlı olabilir.
@@ -58,7 +68,7 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
 
-async def get_current_active_superuser(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_superuser(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="The user doesn't have enough privileges"
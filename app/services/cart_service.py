@@ -1,118 +1,222 @@
 # app/services/cart_service.py
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from typing import Dict, Iterable, List, Optional, Union
 
 from app.crud import crud_cart, crud_product
-from app.schemas import cart_schemas
+from app.schemas import cart_schemas, product_schemas
+from app.models.cart_model import Cart, CartItem
 from app.models.user_model import User
 
-def get_user_cart_details(db: Session, current_user: User) -> cart_schemas.Cart:
-    cart_db = crud_cart.get_or_create_cart(db, user_id=current_user.id)
-    
+def _build_cart_response(cart_id: int, user_id: int, items: Iterable[CartItem]) -> cart_schemas.Cart:
     total_price = 0.0
     detailed_items = []
-    for item_db in cart_db.items:
-        product_db = crud_product.get_product(db, product_id=item_db.product_id)
+    for item_db in items:
+        product_db = item_db.product # Zaten yüklendi, ek sorgu yok
         if product_db: # Ürün hala mevcutsa
-            item_total = item_db.quantity * product_db.price
-            total_price += item_total
-            # product Pydantic şemasına dönüştürme (CartItem şeması bunu otomatik yapacak from_attributes ile)
-            detailed_items.append(cart_schemas.CartItem.from_orm(item_db)) # veya model_validate
-                                  # Pydantic v1: cart_schemas.CartItem.from_orm(item_db)
-                                  # Pydantic v2: cart_schemas.CartItem.model_validate(item_db)
+            total_price += item_db.quantity * product_db.price
+            detailed_items.append(cart_schemas.CartItem.model_validate(item_db))
 
     # Cart şemasını oluştururken total_cart_price'ı da ekleyelim
-    cart_response = cart_schemas.Cart(
-        id=cart_db.id,
-        user_id=cart_db.user_id,
+    return cart_schemas.Cart(
+        id=cart_id,
+        user_id=user_id,
         items=detailed_items,
         total_cart_price=round(total_price, 2)
     )
-    return cart_response
+
+def get_user_cart_details(db: Session, current_user: User) -> cart_schemas.Cart:
+    # Sepet, öğeleri ve ürünleri eager loading ile tek seferde yüklenir;
+    # sepetteki öğe sayısı ne olursa olsun sorgu sayısı sabittir.
+    cart_db = crud_cart.get_cart_with_items(db, user_id=current_user.id)
+    if not cart_db:
+        cart_db = crud_cart.create_cart(db, user_id=current_user.id)
+    return _build_cart_response(cart_db.id, cart_db.user_id, cart_db.items)
+
+
+CartWriteResult = Union[cart_schemas.Cart, cart_schemas.CartMutationResult]
+
+def _commit_cart_write(db: Session) -> None:
+    try:
+        db.commit()
+    except IntegrityError:
+        # Aynı kullanıcı için eşzamanlı bir istek sepeti bu arada oluşturdu
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Cart was modified concurrently; retry the request.")
+
+def _cart_write_result(
+    db: Session,
+    cart_id: int,
+    user_id: int,
+    minimal: bool,
+    product: Optional[product_schemas.Product] = None,
+) -> CartWriteResult:
+    """
+    Commit sonrası yanıt, yazılan satırları yeniden okumadan tek sorguyla üretilir:
+    tam sepet için öğeler ürünleriyle (cart_items JOIN products), minimal yanıt için yalnızca toplamlar
+    ve değişen ürünün satırı. Oturumdaki nesneler commit'te expire olduğu için kimlikler parametre olarak gelir.
+    """
+    if not minimal:
+        return _build_cart_response(cart_id, user_id, crud_cart.get_cart_items_with_products(db, cart_id=cart_id))
+    item_count, total_price, line_id, line_quantity = crud_cart.get_cart_summary(
+        db, cart_id=cart_id, product_id=product.id if product else None
+    )
+    item = None
+    if product is not None and line_id is not None:
+        item = cart_schemas.CartItem(id=line_id, product_id=product.id, quantity=line_quantity, product=product)
+    return cart_schemas.CartMutationResult(
+        cart_id=cart_id, item=item, item_count=item_count, total_cart_price=round(total_price, 2)
+    )
 
 
 def add_product_to_user_cart(
     db: Session, 
     current_user: User, 
-    item_in: cart_schemas.CartItemCreate
-) -> cart_schemas.Cart:
-    cart_db = crud_cart.get_or_create_cart(db, user_id=current_user.id)
-    product_db = crud_product.get_product(db, product_id=item_in.product_id)
-
-    if not product_db:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    
+    item_in: cart_schemas.CartItemCreate,
+    minimal: bool = False
+) -> CartWriteResult:
+    # Okumalar: sepet, ürün + sepetteki mevcut satırı (tek sorgu). Yazım: tek upsert, tek commit.
     if item_in.quantity <= 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Quantity must be positive")
 
-    # Stok kontrolü (CRUD'da da var, burada da yapılabilir)
-    # Sepetteki mevcut miktarı da hesaba katmak gerekebilir
-    existing_item = db.query(crud_cart.CartItem).filter(
-        crud_cart.CartItem.cart_id == cart_db.id,
-        crud_cart.CartItem.product_id == item_in.product_id
-    ).first()
-    
-    current_quantity_in_cart = existing_item.quantity if existing_item else 0
-    requested_total_quantity = current_quantity_in_cart + item_in.quantity # Eğer var olanı artırıyorsak
-    if not existing_item: # Yeni ekleniyorsa
-        requested_total_quantity = item_in.quantity
+    cart_db = crud_cart.get_or_add_cart(db, user_id=current_user.id)
+    cart_id, user_id = cart_db.id, cart_db.user_id
+    product_db, existing_item = crud_cart.get_product_with_cart_item(db, cart_id=cart_id, product_id=item_in.product_id)
+
+    if not product_db:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
 
+    # Stok kontrolü sepetteki mevcut miktarı da hesaba katar
+    requested_total_quantity = (existing_item.quantity if existing_item else 0) + item_in.quantity
     if requested_total_quantity > product_db.stock_quantity:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Not enough stock for product {product_db.name}. Available: {product_db.stock_quantity}, Requested: {requested_total_quantity}"
         )
-    
-    try:
-        crud_cart.add_item_to_cart(db, cart=cart_db, product=product_db, quantity=item_in.quantity)
-    except ValueError as e: # crud_cart.add_item_to_cart içindeki stok hatası
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-        
-    return get_user_cart_details(db, current_user)
+
+    product = product_schemas.Product.model_validate(product_db) if minimal else None
+    crud_cart.upsert_cart_item(db, cart_id=cart_id, product_id=product_db.id, quantity=item_in.quantity)
+    _commit_cart_write(db)
+    return _cart_write_result(db, cart_id, user_id, minimal, product=product)
 
 
 def update_user_cart_item(
     db: Session,
     current_user: User,
     cart_item_id: int,
-    item_update_in: cart_schemas.CartItemUpdate
-) -> cart_schemas.Cart:
-    cart_db = crud_cart.get_or_create_cart(db, user_id=current_user.id) # Kullanıcının sepetini al
-    
-    # cart_item_id'nin bu kullanıcının sepetine ait olduğunu kontrol et
-    cart_item_db = db.query(crud_cart.CartItem).filter(
-        crud_cart.CartItem.id == cart_item_id,
-        crud_cart.CartItem.cart_id == cart_db.id
-    ).first()
-
+    item_update_in: cart_schemas.CartItemUpdate,
+    minimal: bool = False
+) -> CartWriteResult:
+    # Öğe, sahipliği ve ürünü tek sorguda okunur; tek UPDATE (veya DELETE), tek commit.
+    cart_item_db = crud_cart.get_cart_item_with_product_for_user(db, user_id=current_user.id, cart_item_id=cart_item_id)
     if not cart_item_db:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart item not found in user's cart")
 
+    cart_id = cart_item_db.cart_id
+    product_db = cart_item_db.product
+    product = product_schemas.Product.model_validate(product_db) if minimal and product_db else None
     if item_update_in.quantity <= 0:
         # Eğer miktar 0 veya daha az ise ürünü sepetten kaldır
-        crud_cart.remove_item_from_cart(db, cart_item_id=cart_item_id, cart_id=cart_db.id)
+        db.delete(cart_item_db)
     else:
-        try:
-            crud_cart.update_cart_item_quantity(db, cart_item_id=cart_item_id, quantity=item_update_in.quantity, cart_id=cart_db.id)
-        except ValueError as e: # crud_cart.update_cart_item_quantity içindeki stok hatası
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-            
-    return get_user_cart_details(db, current_user)
+        if not product_db or item_update_in.quantity > product_db.stock_quantity:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not enough stock. Available: {product_db.stock_quantity if product_db else 0}, Requested: {item_update_in.quantity}"
+            )
+        cart_item_db.quantity = item_update_in.quantity
+    _commit_cart_write(db)
+    return _cart_write_result(db, cart_id, current_user.id, minimal, product=product)
 
 
 def remove_product_from_user_cart(
     db: Session,
     current_user: User,
-    cart_item_id: int
-) -> cart_schemas.Cart:
-    cart_db = crud_cart.get_or_create_cart(db, user_id=current_user.id)
-    
-    if not crud_cart.remove_item_from_cart(db, cart_item_id=cart_item_id, cart_id=cart_db.id):
+    cart_item_id: int,
+    minimal: bool = False
+) -> CartWriteResult:
+    # Öğe okunmadan tek DELETE ile silinir; etkilenen satır yoksa öğe bu kullanıcının sepetinde değildir
+    cart_db = crud_cart.get_cart_by_user_id(db, user_id=current_user.id)
+    if not cart_db or not crud_cart.remove_item_from_cart(db, cart_item_id=cart_item_id, cart_id=cart_db.id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart item not found in user's cart")
-        
-    return get_user_cart_details(db, current_user)
+
+    cart_id = cart_db.id
+    _commit_cart_write(db)
+    return _cart_write_result(db, cart_id, current_user.id, minimal)
 
 def clear_user_cart_service(db: Session, current_user: User) -> cart_schemas.Cart:
     cart_db = crud_cart.get_or_create_cart(db, user_id=current_user.id)
     crud_cart.clear_cart(db, cart_id=cart_db.id)
-    return get_user_cart_details(db, current_user) # Boş sepeti döndürür
\ No newline at end of file
+    return get_user_cart_details(db, current_user) # Boş sepeti döndürür
+
+
+def apply_cart_operations(
+    db: Session,
+    current_user: User,
+    operations: List[cart_schemas.CartOperation]
+) -> cart_schemas.Cart:
+    """
+    set/add/remove işlemlerini sırayla sepetin bellekteki kopyasına uygular, son miktarları tek bir IN
+    sorgusuyla stoğa karşı doğrular ve değişiklikleri tek transaction'da yazar. Herhangi bir işlem
+    geçersizse (ürün yok, stok yetersiz) hiçbir değişiklik yazılmaz. Sepet bir kez, yeniden okunmadan döner.
+    """
+    cart_db = crud_cart.get_cart_by_user_id(db, user_id=current_user.id)
+    if cart_db is None:
+        cart_db = Cart(user_id=current_user.id) # Değişikliklerle aynı flush'ta (aynı transaction'da) oluşturulur
+        db.add(cart_db)
+        items_by_product: Dict[int, CartItem] = {}
+    else:
+        items_by_product = {item.product_id: item for item in crud_cart.get_cart_items_with_products(db, cart_id=cart_db.id)}
+
+    quantities = {product_id: item.quantity for product_id, item in items_by_product.items()}
+    for operation in operations:
+        if operation.op == cart_schemas.CartOperationType.SET:
+            quantities[operation.product_id] = operation.quantity
+        elif operation.op == cart_schemas.CartOperationType.ADD:
+            quantities[operation.product_id] = quantities.get(operation.product_id, 0) + operation.quantity
+        else:
+            quantities[operation.product_id] = 0
+    touched_ids = list(dict.fromkeys(operation.product_id for operation in operations))
+
+    # Sepette olmayan ürünler tek bir IN sorgusuyla yüklenir; sepettekiler öğelerle birlikte zaten yüklendi
+    products = {item.product_id: item.product for item in items_by_product.values() if item.product is not None}
+    missing_ids = [pid for pid in touched_ids if pid not in products and quantities[pid] > 0]
+    for product in crud_product.get_products_by_ids(db, missing_ids):
+        products[product.id] = product
+
+    not_found = [pid for pid in touched_ids if quantities[pid] > 0 and pid not in products]
+    if not_found:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Products not found: {not_found}")
+    insufficient = [
+        f"Not enough stock for product {products[pid].name}. Available: {products[pid].stock_quantity}, Requested: {quantities[pid]}"
+        for pid in touched_ids if quantities[pid] > 0 and quantities[pid] > products[pid].stock_quantity
+    ]
+    if insufficient:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=insufficient)
+
+    for pid in touched_ids:
+        item = items_by_product.get(pid)
+        if quantities[pid] <= 0:
+            if item is not None:
+                db.delete(item)
+                del items_by_product[pid]
+        elif item is not None:
+            item.quantity = quantities[pid]
+        else:
+            items_by_product[pid] = CartItem(cart=cart_db, product_id=pid, quantity=quantities[pid], product=products[pid])
+            db.add(items_by_product[pid])
+
+    try:
+        db.flush() # Yeni öğelerin ID'leri yanıttan önce atanır
+        cart_response = _build_cart_response(cart_db.id, cart_db.user_id, items_by_product.values())
+        db.commit()
+    except IntegrityError:
+        # Aynı kullanıcı için eşzamanlı bir istek sepeti bu arada oluşturdu/değiştirdi
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Cart was modified concurrently; retry the request.")
+    return cart_response
@@ -0,0 +1,214 @@
+# app/services/idempotency_service.py
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_idempotency
+from app.db.session import SessionLocal
+from app.models.idempotency_model import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_POLL_INTERVAL_SECONDS = 0.1
+_PURGE_INTERVAL_SECONDS = 600
+
+# Aynı süreçteki eşzamanlı kopyalar DB'yi yoklamak yerine ilk isteğin bitmesini bu event'lerle bekler
+# (yalnızca event loop üzerinden erişilir, kilit gerekmez)
+_local_executions: Dict[Tuple[int, str], asyncio.Event] = {}
+_last_purge = 0.0
+
+
+class OutcomeUnknownError(HTTPException):
+    """
+    operation() yan etkisinin (ör. ödemenin) gerçekleşip gerçekleşmediği bilinmiyor. Anahtar kaydı silinmez;
+    aynı anahtarla gelen yeniden deneme operation()'ı tekrar çalıştırır. operation() yan etkiyi
+    downstream_key ile aşağı akışta tekilleştirmelidir.
+    """
+    pass
+
+
+def downstream_key(user_id: int, key: str) -> str:
+    """İstemcinin anahtarından türetilen, aşağı akış servislerine (ödeme gateway'i) iletilecek sabit anahtar."""
+    return hashlib.sha256(f"{user_id}:{key}".encode()).hexdigest()
+
+
+def request_fingerprint(method: str, path: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"method": method, "path": path, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(db_key: IdempotencyKey) -> JSONResponse:
+    return JSONResponse(
+        status_code=db_key.response_status_code,
+        content=json.loads(db_key.response_body),
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def _purge_expired_keys(db: Session, now: datetime) -> None:
+    # Süresi dolmuş kayıtlar süreç başına en fazla 10 dakikada bir topluca silinir
+    global _last_purge
+    if time.monotonic() - _last_purge < _PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    crud_idempotency.delete_expired_keys(db, now)
+
+
+def _lease_until(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+
+
+def _lock_expired(db_key: IdempotencyKey, now: datetime) -> bool:
+    return db_key.status == IdempotencyKey.IN_PROGRESS and (db_key.locked_until is None or db_key.locked_until <= now)
+
+
+def _reload_key(db: Session, user_id: int, key: str) -> Optional[IdempotencyKey]:
+    db.rollback() # Eski bir transaction görüntüsü (REPEATABLE READ) okunmasın
+    return crud_idempotency.get_key(db, user_id=user_id, key=key)
+
+
+async def _wait_for_completion(db: Session, user_id: int, key: str) -> Optional[IdempotencyKey]:
+    """
+    İlk istek bitene kadar bekler; bitmiş kaydı ya da (silindiyse, kilidi dolduysa veya zaman aşımında)
+    mevcut durumu döner.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS
+    local_event = _local_executions.get((user_id, key))
+    if local_event is not None:
+        try:
+            await asyncio.wait_for(local_event.wait(), timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    while True:
+        db_key = await run_in_threadpool(_reload_key, db, user_id, key)
+        if (
+            db_key is None or db_key.status != IdempotencyKey.IN_PROGRESS
+            or _lock_expired(db_key, datetime.utcnow()) or time.monotonic() >= deadline
+        ):
+            return db_key
+        await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+
+
+def _claim_key(
+    db: Session, user_id: int, key: str, fingerprint: str, now: datetime
+) -> Tuple[Optional[IdempotencyKey], Optional[IdempotencyKey]]:
+    """(yeni oluşturulan kayıt, mevcut kayıt) döner; süresi dolmuş mevcut kayıt silinir ve (None, None) döner."""
+    _purge_expired_keys(db, now)
+    db_key = crud_idempotency.try_create_in_progress(
+        db, user_id=user_id, key=key, request_fingerprint=fingerprint,
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS), locked_until=_lease_until(now)
+    )
+    if db_key is not None:
+        return db_key, None
+    existing = crud_idempotency.get_key(db, user_id=user_id, key=key)
+    if existing is not None and existing.expires_at <= now:
+        crud_idempotency.delete_key(db, existing.id) # Süresi dolmuş; anahtar yeniden kullanılabilir
+        return None, None
+    return None, existing
+
+
+def _mark_outcome_unknown(key_id: int) -> None:
+    # İptal edilen operation() istek session'ını başka bir thread'de hâlâ kullanıyor olabilir; ayrı session açılır
+    with SessionLocal() as session:
+        crud_idempotency.mark_outcome_unknown(session, key_id)
+
+
+def _store_response(db: Session, user_id: int, key: str, status_code: int, body: Any) -> None:
+    crud_idempotency.complete_key(db, crud_idempotency.get_key(db, user_id=user_id, key=key), status_code, json.dumps(body))
+
+
+async def execute_idempotent(
+    db: Session,
+    user_id: int,
+    key: str,
+    fingerprint: str,
+    operation: Callable[[], Awaitable[Any]],
+    success_status_code: int = status.HTTP_200_OK,
+) -> JSONResponse:
+    """
+    operation()'ı verilen Idempotency-Key için en fazla bir kez çalıştırır ve yanıtını saklar.
+    - Aynı anahtarla tamamlanmış istek: saklanan yanıt DB yazması/ödeme olmadan aynen döndürülür.
+    - Aynı anahtarla devam eden istek: ilki bitene kadar beklenir, sonra onun yanıtı döndürülür.
+    - Aynı anahtar farklı parametrelerle: 422.
+    5xx hatalarında kayıt silinir, böylece istemci aynı anahtarla yeniden deneyebilir. OutcomeUnknownError'da
+    ve istek iptal edildiğinde (istemci bağlantısı koptu) kayıt OUTCOME_UNKNOWN olur; aynı anahtarla yeniden
+    deneme operation()'ı (en fazla bir istek) tekrar çalıştırır. Süreç çökerse IN_PROGRESS kaydının kilidi
+    IDEMPOTENCY_LOCK_SECONDS sonra dolar ve yeniden deneme işi aynı şekilde devralır.
+    DB işleri threadpool'da çalışır; bekleme ve operation() worker thread tutmadan event loop'ta yürür.
+    """
+    now = datetime.utcnow()
+
+    for _attempt in range(3):
+        db_key, existing = await run_in_threadpool(_claim_key, db, user_id, key, fingerprint, now)
+        if db_key is not None:
+            break
+        if existing is None:
+            continue # Süresi dolmuş kayıt silindi; tekrar dene
+        if existing.request_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_KEY_HEADER} was already used with different request parameters."
+            )
+        if existing.status == IdempotencyKey.IN_PROGRESS:
+            existing = await _wait_for_completion(db, user_id=user_id, key=key)
+        if existing is None:
+            continue # İlk istek 5xx ile bitti ve kaydını sildi; bu istek yeniden deneyebilir
+        now = datetime.utcnow()
+        if existing.status == IdempotencyKey.OUTCOME_UNKNOWN or _lock_expired(existing, now):
+            if await run_in_threadpool(crud_idempotency.try_take_over, db, existing.id, now, _lease_until(now)):
+                db_key = existing
+                break
+            continue # Başka bir yeniden deneme sahiplendi; onun sonucu beklenir
+        if existing.status != IdempotencyKey.COMPLETED:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} is still being processed. Retry later."
+            )
+        return _replay(existing)
+    else:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Could not acquire {IDEMPOTENCY_KEY_HEADER}. Retry later.")
+
+    key_id = db_key.id
+    local_event = asyncio.Event()
+    _local_executions[(user_id, key)] = local_event
+    try:
+        try:
+            result = await operation()
+        except OutcomeUnknownError:
+            await run_in_threadpool(crud_idempotency.mark_outcome_unknown, db, key_id)
+            raise
+        except asyncio.CancelledError:
+            # Ödeme sürerken iptal: yan etki gerçekleşmiş olabilir. İptal edilmiş kapsamda da yazılabilsin diye korunur
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(_mark_outcome_unknown, key_id)
+            raise
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await run_in_threadpool(crud_idempotency.delete_key, db, key_id)
+            else:
+                # İstemci hataları da (ör. ödeme reddi) aynı anahtarla tekrar edildiğinde aynen döner
+                await run_in_threadpool(_store_response, db, user_id, key, e.status_code, {"detail": e.detail})
+            raise
+        except Exception:
+            await run_in_threadpool(crud_idempotency.delete_key, db, key_id)
+            raise
+
+        body = jsonable_encoder(result)
+        await run_in_threadpool(_store_response, db, user_id, key, success_status_code, body)
+        return JSONResponse(status_code=success_status_code, content=body)
+    finally:
+        _local_executions.pop((user_id, key), None)
+        local_event.set()
@@ -2,102 +2,156 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
-from app.crud import crud_order, crud_cart, crud_product
+from app.crud import crud_order, crud_cart, crud_product, crud_outbox
 from app.schemas import order_schemas, cart_schemas
 from app.models.user_model import User
 from app.models.order_model import OrderStatus
+from app.models import outbox_model
 from app.models.product_model import Product
-from .payment_service import PaymentProcessor # Ödeme servisimizi import ediyoruz
-from typing import Dict, Any
+from .payment_service import get_payment_processor # Ödeme servisimizi import ediyoruz
+from . import outbox_service
+from .idempotency_service import OutcomeUnknownError
+from app.core import metrics
+from typing import Dict, Any, Iterator, Optional
+from datetime import datetime
+import csv
+import io
+import json
+import uuid
 from fastapi import Depends
-from app.db.session import get_db
+from fastapi.concurrency import run_in_threadpool
+from app.db.session import get_db, get_read_session
 
 
 class OrderService:
     def __init__(self, db: Session):
         self.db = db
-        self.payment_processor = PaymentProcessor() # Her OrderService instance'ı kendi PaymentProcessor'ını alır
+        self.payment_processor = get_payment_processor() # Devre kesici ve eşzamanlılık sınırı tüm isteklerde ortak
 
     def _validate_cart_and_stock(self, cart: cart_schemas.Cart) -> bool:
         """Sepetteki ürünlerin stok durumunu kontrol eder."""
         if not cart.items:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cart is empty. Cannot create order.")
 
+        # Ürünler sepetle birlikte bu istekte DB'den eager loading ile yüklendi; ürün başına
+        # ayrı sorguya gerek yok. Nihai kontrol stok düşümündeki koşullu UPDATE'tir.
         for item in cart.items:
-            product_db = crud_product.get_product(self.db, product_id=item.product_id)
-            if not product_db:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {item.product_id} not found.")
-            if product_db.stock_quantity < item.quantity:
+            if item.product.stock_quantity < item.quantity:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Not enough stock for product '{product_db.name}'. Available: {product_db.stock_quantity}, Requested: {item.quantity}"
+                    detail=f"Not enough stock for product '{item.product.name}'. Available: {item.product.stock_quantity}, Requested: {item.quantity}"
                 )
         return True
 
-    def _process_payment(self, amount: float, payment_method: str, payment_details: Dict[str, Any]) -> Dict[str, Any]:
+    def _payment_method_label(self, payment_method: str) -> str:
+        # Metrik etiketi: bilinmeyen yöntemler tek etikette toplanır (sınırsız etiket kardinalitesi olmasın)
+        strategy_key = payment_method.lower().replace(" ", "_")
+        return strategy_key if self.payment_processor.supports(strategy_key) else "other"
+
+    async def _process_payment(
+        self, amount: float, payment_method: str, payment_details: Dict[str, Any], payment_idempotency_key: str
+    ) -> Dict[str, Any]:
         """Ödeme işlemini gerçekleştirir."""
         print(f"OrderService: Attempting payment of {amount} via {payment_method}")
-        payment_result = self.payment_processor.process_payment(
+        payment_result = await self.payment_processor.process_payment(
             amount=amount,
             payment_details=payment_details,
-            strategy_key=payment_method.lower().replace(" ", "_") # "Credit Card" -> "credit_card"
+            strategy_key=payment_method.lower().replace(" ", "_"), # "Credit Card" -> "credit_card"
+            idempotency_key=payment_idempotency_key
         )
         print(f"OrderService: Payment result: {payment_result}")
+        if payment_result.get("status") != "success":
+            metrics.orders_failed_total.inc(
+                self._payment_method_label(payment_method),
+                "payment_unavailable" if payment_result.get("status") == "unavailable" else "payment_declined"
+            )
+        if payment_result.get("outcome_unknown"):
+            # Zaman aşımı: ödeme çekilmiş olabilir. Idempotency-Key kaydı tutulur; aynı anahtarla yeniden deneme
+            # gateway'e aynı ödeme anahtarını iletir, böylece ödeme ikinci kez çekilmez
+            raise OutcomeUnknownError(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Payment outcome is unknown: {payment_result.get('message')} Retry with the same Idempotency-Key.",
+                headers={"Retry-After": "5"}
+            )
+        if payment_result.get("status") == "unavailable":
+            # Gateway yavaş/erişilemez ya da devre açık: istemci daha sonra tekrar denemeli
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Payment could not be processed: {payment_result.get('message')}",
+                headers={"Retry-After": "5"}
+            )
         if payment_result.get("status") != "success":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Payment failed: {payment_result.get('message', 'Unknown error')}")
         return payment_result
 
+    def _request_refund(self, user: User, payment_transaction_id: str, amount: float, reason: str) -> None:
+        try:
+            crud_outbox.add_event(
+                self.db, outbox_model.PAYMENT_REFUND_REQUESTED, "user", user.id,
+                {"transaction_id": payment_transaction_id, "amount": amount, "user_id": user.id, "reason": reason}
+            )
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print(f"CRITICAL ERROR: Refund request for payment {payment_transaction_id} (user {user.email}) could not be recorded: {e}")
+
     def _create_order_from_cart(self, user: User, cart: cart_schemas.Cart, payment_transaction_id: str) -> order_schemas.Order:
-        """Veritabanında siparişi ve sipariş kalemlerini oluşturur."""
-        # Siparişi oluştur
-        order_db = crud_order.create_order(
-            db=self.db,
-            user=user,
-            total_amount=cart.total_cart_price
-        )
-        
-        # Sipariş kalemlerini oluştur ve stokları güncelle
+        """
+        Veritabanında siparişi ve sipariş kalemlerini oluşturur.
+        Sipariş, kalemler, stok düşümü ve sepetin temizlenmesi tek transaction'da yapılır
+        ve tek bir commit ile kalıcı hale gelir; hata olursa hiçbiri yazılmaz.
+        """
+        quantities: Dict[int, int] = {}
         for cart_item_schema in cart.items:
-            crud_order.add_item_to_order(
+            quantities[cart_item_schema.product_id] = quantities.get(cart_item_schema.product_id, 0) + cart_item_schema.quantity
+
+        try:
+            # Ödeme başarılı olduğu için sipariş doğrudan PROCESSING durumunda oluşturulur
+            order_db = crud_order.create_order_with_items(
                 db=self.db,
-                order_id=order_db.id,
-                product_id=cart_item_schema.product_id,
-                quantity=cart_item_schema.quantity,
-                price_at_purchase=cart_item_schema.product.price # CartItem şemasındaki ürün fiyatını kullanıyoruz
+                user=user,
+                total_amount=cart.total_cart_price,
+                items_data=[
+                    {
+                        "product_id": cart_item_schema.product_id,
+                        "quantity": cart_item_schema.quantity,
+                        "price_at_purchase": cart_item_schema.product.price # CartItem şemasındaki ürün fiyatını kullanıyoruz
+                    }
+                    for cart_item_schema in cart.items
+                ],
+                status=OrderStatus.PROCESSING
             )
-            # Stok güncelleme
-            product_db = crud_product.get_product(self.db, product_id=cart_item_schema.product_id)
-            if product_db: # Ekstra kontrol
-                product_db.stock_quantity -= cart_item_schema.quantity
-                self.db.add(product_db) # Değişikliği session'a ekle
-        
-        # Sipariş durumunu güncelle (Ödeme başarılı olduğu için)
-        crud_order.update_order_status(self.db, order_id=order_db.id, status=OrderStatus.PROCESSING)
-        
-        self.db.commit() # Tüm stok güncellemelerini ve sipariş kalemlerini commit et
-        self.db.refresh(order_db) # İlişkili item'ları da yüklemek için
-
-        # Sepeti temizle
-        user_cart_db = crud_cart.get_cart_by_user_id(self.db, user_id=user.id)
-        if user_cart_db:
-            crud_cart.clear_cart(self.db, cart_id=user_cart_db.id)
-
-        # Pydantic şemasına dönüştür (Order CRUD'da daha detaylı item'larla dönebiliriz)
-        # Veya order_db'yi doğrudan döndürebiliriz, schema bunu halleder.
-        # Şimdilik crud_order'dan gelen order_db'yi döndürelim, CartService'teki gibi detaylı şema oluşturmaya gerek yok
-        # çünkü order_db zaten ilişkili item'ları içerecek (eager loading veya refresh sonrası).
-        
+            crud_product.decrement_stock(self.db, quantities)
+            crud_cart.clear_cart_items(self.db, cart_id=cart.id)
+            crud_outbox.add_event(
+                self.db, outbox_model.PAYMENT_CAPTURED, "order", order_db.id,
+                {"order_id": order_db.id, "transaction_id": payment_transaction_id, "amount": cart.total_cart_price}
+            )
+            self.db.commit()
+            crud_product.invalidate_product_cache(quantities.keys())
+        except crud_product.InsufficientStockError as e:
+            # Doğrulamadan sonra başka bir sipariş stoğu tüketmiş; hiçbir şey yazılmadı.
+            # Ödeme alındığı için iade talebi kendi transaction'ında outbox'a yazılır ve worker tarafından işlenir.
+            self.db.rollback()
+            metrics.stock_conflicts_total.inc()
+            print(f"OrderService: Stock conflict after payment (txn: {payment_transaction_id}) for user {user.email}. {str(e)}")
+            self._request_refund(user, payment_transaction_id, cart.total_cart_price, reason=str(e))
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except Exception:
+            self.db.rollback()
+            raise
+
         # Order'ı tam detaylarıyla (items ve product detayları) almak için yeniden sorgula
         final_order_db = crud_order.get_order_by_id(self.db, order_id=order_db.id)
-        return order_schemas.Order.from_orm(final_order_db) # Pydantic v1
-        # return order_schemas.Order.model_validate(final_order_db) # Pydantic v2
+        return order_schemas.Order.model_validate(final_order_db)
 
 
-    def place_order_facade(
+    async def place_order_facade(
         self,
         current_user: User,
         payment_method: str, # örn: "credit_card", "paypal"
-        payment_details: Dict[str, Any] # örn: {"card_number": "...", "paypal_email": "..."}
+        payment_details: Dict[str, Any], # örn: {"card_number": "...", "paypal_email": "..."}
+        payment_idempotency_key: Optional[str] = None # Gateway'e iletilir; verilmezse bu checkout için üretilir
     ) -> order_schemas.Order:
         """
         Sipariş verme sürecini yöneten Facade metodu.
@@ -107,39 +161,54 @@ class OrderService:
         3. Ödemeyi işle.
         4. Siparişi oluştur ve kaydet.
         5. Sepeti temizle.
+        Senkron DB adımları threadpool'da çalışır; ödeme beklenirken hiçbir worker thread tutulmaz.
         """
         # 1. Kullanıcının sepetini al (CartService'i burada kullanmak yerine doğrudan CRUD kullanabiliriz veya CartService'ten sepet detaylarını alabiliriz)
         from app.services.cart_service import get_user_cart_details # Döngüsel importu önlemek için fonksiyon içinde import
         
-        user_cart_details = get_user_cart_details(self.db, current_user)
+        method_label = self._payment_method_label(payment_method)
+        user_cart_details = await run_in_threadpool(get_user_cart_details, self.db, current_user)
         if not user_cart_details.items:
+             metrics.orders_failed_total.inc(method_label, "invalid_cart")
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot place order with an empty cart.")
 
         # 2. Sepeti ve stokları doğrula
-        self._validate_cart_and_stock(user_cart_details)
+        try:
+            self._validate_cart_and_stock(user_cart_details)
+        except HTTPException:
+            metrics.orders_failed_total.inc(method_label, "invalid_cart")
+            raise
         
         # 3. Ödemeyi işle
-        payment_result = self._process_payment(
+        payment_result = await self._process_payment(
             amount=user_cart_details.total_cart_price,
             payment_method=payment_method,
-            payment_details=payment_details
+            payment_details=payment_details,
+            payment_idempotency_key=payment_idempotency_key or uuid.uuid4().hex
         )
         payment_transaction_id = payment_result.get("transaction_id", "N/A_MOCK_ID")
 
         # 4. Siparişi oluştur, kaydet ve stokları güncelle
         # 5. Sepeti temizle (bu adım _create_order_from_cart içinde yapılıyor)
         try:
-            created_order = self._create_order_from_cart(
+            created_order = await run_in_threadpool(
+                self._create_order_from_cart,
                 user=current_user,
                 cart=user_cart_details,
                 payment_transaction_id=payment_transaction_id
             )
-            # Burada başarılı sipariş için bir bildirim (email vb.) tetiklenebilir.
+            # Bildirimler (email vb.) siparişle aynı transaction'da outbox'a yazıldı; worker arka planda işler
+            outbox_service.wake_worker()
+            metrics.orders_placed_total.inc(method_label)
             print(f"OrderService: Order {created_order.id} placed successfully for user {current_user.email}.")
             return created_order
         except HTTPException as e: # Ödeme veya stoktan gelen HTTP hatalarını tekrar yükselt
+            if e.status_code == status.HTTP_409_CONFLICT:
+                outbox_service.wake_worker() # İade talebi outbox'a yazıldı
+            metrics.orders_failed_total.inc(method_label, "stock_conflict" if e.status_code == status.HTTP_409_CONFLICT else "error")
             raise e
         except Exception as e:
+            metrics.orders_failed_total.inc(method_label, "error")
             # Ödeme başarılı oldu ama sipariş oluşturmada/stok güncellemede sorun çıktıysa ne yapmalı?
             # İdealde ödemeyi geri alma (refund) işlemi tetiklenmeli. Bu karmaşık bir senaryo.
             # Şimdilik basit bir hata loglayıp genel bir hata döndürelim.
@@ -150,4 +219,91 @@ class OrderService:
 
 # Dependency olarak OrderService'i sağlamak için
 def get_order_service(db: Session = Depends(get_db)):
-    return OrderService(db=db)
\ No newline at end of file
+    return OrderService(db=db)
+
+
+# --- Sipariş dışa aktarımı (admin) ---
+EXPORT_CSV_COLUMNS = [
+    "order_id", "user_id", "created_at", "status", "total_amount",
+    "product_id", "product_name", "quantity", "price_at_purchase"
+]
+_EXPORT_FLUSH_LINES = 500 # Bu kadar satır biriktiğinde istemciye gönderilir
+
+def iter_order_export(
+    export_format: order_schemas.OrderExportFormat,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None
+) -> Iterator[str]:
+    """
+    Siparişleri NDJSON (sipariş başına bir satır, kalemler iç içe) veya CSV (kalem başına bir satır)
+    olarak üretir. StreamingResponse tüketirken çalıştığı için kendi session'ını açar
+    (get_db dependency'si yanıt gönderilmeden kapanır). Okuma replikası varsa oradan okur.
+    """
+    db = get_read_session()
+    try:
+        rows = crud_order.iter_order_export_rows(db, created_from=created_from, created_to=created_to, status=status)
+        if export_format == order_schemas.OrderExportFormat.CSV:
+            yield from _iter_csv_lines(rows)
+        else:
+            yield from _iter_ndjson_lines(rows)
+    finally:
+        db.close()
+
+def _batched(lines: Iterator[str]) -> Iterator[str]:
+    # İlk satır hemen gönderilir (ilk byte gecikmesi düşük kalsın), sonrası gruplanarak
+    buffer = []
+    first = True
+    for line in lines:
+        buffer.append(line)
+        if first or len(buffer) >= _EXPORT_FLUSH_LINES:
+            yield "".join(buffer)
+            buffer.clear()
+            first = False
+    if buffer:
+        yield "".join(buffer)
+
+def _iter_csv_lines(rows) -> Iterator[str]:
+    def lines() -> Iterator[str]:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_CSV_COLUMNS)
+        yield out.getvalue() # Başlık, ilk sipariş beklenmeden gönderilir
+        out.seek(0)
+        out.truncate(0)
+        for row in rows:
+            writer.writerow([
+                row.order_id, row.user_id, row.created_at.isoformat() if row.created_at else "",
+                row.status.value, row.total_amount, row.product_id, row.product_name,
+                row.quantity, row.price_at_purchase
+            ])
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+    yield from _batched(lines())
+
+def _iter_ndjson_lines(rows) -> Iterator[str]:
+    def lines() -> Iterator[str]:
+        current: Optional[Dict[str, Any]] = None
+        for row in rows:
+            if current is None or current["id"] != row.order_id:
+                if current is not None:
+                    yield json.dumps(current) + "\n"
+                current = {
+                    "id": row.order_id,
+                    "user_id": row.user_id,
+                    "created_at": row.created_at.isoformat() if row.created_at else None,
+                    "status": row.status.value,
+                    "total_amount": row.total_amount,
+                    "items": [],
+                }
+            if row.product_id is not None:
+                current["items"].append({
+                    "product_id": row.product_id,
+                    "product_name": row.product_name,
+                    "quantity": row.quantity,
+                    "price_at_purchase": row.price_at_purchase,
+                })
+        if current is not None:
+            yield json.dumps(current) + "\n"
+    yield from _batched(lines())
@@ -0,0 +1,159 @@
+# app/services/outbox_service.py
+# Outbox olaylarını işleyen worker. Olaylar en az bir kez (at-least-once) teslim edilir:
+# handler'lar aynı olayı birden fazla kez alabilir ve idempotent yazılmalıdır.
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_outbox
+from app.db.session import SessionLocal
+from app.models import outbox_model
+from app.models.outbox_model import OutboxEvent
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+_handlers: Dict[str, List[EventHandler]] = {}
+_PURGE_INTERVAL_SECONDS = 3600
+_last_purge = 0.0
+
+
+def register_handler(event_type: str) -> Callable[[EventHandler], EventHandler]:
+    """Olay tipi için handler kaydeden dekoratör. Handler payload sözlüğünü alır; hata yükseltirse olay yeniden denenir."""
+    def decorator(handler: EventHandler) -> EventHandler:
+        _handlers.setdefault(event_type, []).append(handler)
+        return handler
+    return decorator
+
+
+# --- Varsayılan handler'lar (şimdilik bildirimler loglanıyor) ---
+@register_handler(outbox_model.ORDER_PLACED)
+def send_order_confirmation(payload: Dict[str, Any]) -> None:
+    print(f"Outbox: Sending order confirmation for order {payload['order_id']} to user {payload['user_id']} (mock).")
+
+@register_handler(outbox_model.ORDER_STATUS_CHANGED)
+def send_order_status_notification(payload: Dict[str, Any]) -> None:
+    print(f"Outbox: Order {payload['order_id']} status changed {payload['old_status']} -> {payload['new_status']}; notifying user {payload['user_id']} (mock).")
+
+@register_handler(outbox_model.PAYMENT_CAPTURED)
+def record_payment_capture(payload: Dict[str, Any]) -> None:
+    print(f"Outbox: Payment {payload['transaction_id']} of {payload['amount']} captured for order {payload['order_id']} (mock ledger).")
+
+@register_handler(outbox_model.PAYMENT_REFUND_REQUESTED)
+def request_payment_refund(payload: Dict[str, Any]) -> None:
+    # Gerçek gateway'de iade, transaction_id ile idempotent istenir (aynı olay iki kez gelse de tek iade)
+    print(f"Outbox: Refunding payment {payload['transaction_id']} of {payload['amount']} for user {payload['user_id']}: {payload['reason']} (mock).")
+
+
+def _retry_delay_seconds(attempts: int) -> float:
+    # Üstel geri çekilme (exponential backoff) + jitter; aynı anda başarısız olan olaylar aynı anda denenmesin
+    delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), settings.OUTBOX_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _dispatch(event: OutboxEvent) -> None:
+    payload = json.loads(event.payload)
+    for handler in _handlers.get(event.event_type, []):
+        handler(payload)
+
+
+def process_due_events(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Zamanı gelmiş olaylardan bir parti alır (claim ayrı transaction'da commit edilir, satır kilitleri handler'lar
+    çalışırken tutulmaz), handler'ları çalıştırır ve her olayın sonucunu kendi kısa transaction'ında yazar;
+    işlenen olay sayısını döner. Sonuç yazılmadan süreç çökerse olay OUTBOX_LEASE_SECONDS sonra yeniden işlenir
+    (at-least-once). Aynı kaynağın olayları id sırasıyla işlenir; bir olay başarısız olursa sonrakiler o olay
+    teslim edilene (ya da deneme hakkı bitip FAILED olana) kadar bekler.
+    """
+    now = datetime.utcnow()
+    events = crud_outbox.claim_due_events(
+        db, now, lease_until=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS), limit=limit or settings.OUTBOX_BATCH_SIZE
+    )
+    for event in events:
+        try:
+            _dispatch(event)
+        except Exception as e:
+            attempts = event.attempts + 1
+            give_up = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+            crud_outbox.mark_attempt_failed(
+                db, event, error=f"{e.__class__.__name__}: {e}",
+                next_attempt_at=datetime.utcnow() + timedelta(seconds=_retry_delay_seconds(attempts)), give_up=give_up
+            )
+            print(f"Outbox: Event {event.id} ({event.event_type}) failed on attempt {attempts}{' - giving up' if give_up else ''}: {e}")
+        else:
+            crud_outbox.mark_delivered(db, event, datetime.utcnow())
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return len(events)
+
+
+def _purge_delivered_events(db: Session) -> None:
+    # Teslim edilmiş eski olaylar süreç başına en fazla saatte bir silinir
+    global _last_purge
+    if time.monotonic() - _last_purge < _PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    crud_outbox.delete_delivered_before(db, datetime.utcnow() - timedelta(days=settings.OUTBOX_RETENTION_DAYS))
+
+
+def run_once() -> int:
+    with SessionLocal() as db:
+        _purge_delivered_events(db)
+        return process_due_events(db)
+
+
+# --- Uygulama içinde çalışan worker ---
+_worker_task: Optional[asyncio.Task] = None
+_wake_event: Optional[asyncio.Event] = None
+
+
+def wake_worker() -> None:
+    """Yeni olay yazıldığında (event loop'tan çağrılır) worker'ın beklemeden çalışmasını sağlar."""
+    if _wake_event is not None:
+        _wake_event.set()
+
+
+async def run_worker() -> None:
+    global _wake_event
+    _wake_event = asyncio.Event()
+    while True:
+        try:
+            processed = await run_in_threadpool(run_once)
+        except Exception as e:
+            print(f"Outbox: Worker iteration failed: {e}")
+            processed = 0
+        if processed >= settings.OUTBOX_BATCH_SIZE:
+            continue # Birikmiş olay var; beklemeden devam et
+        try:
+            await asyncio.wait_for(_wake_event.wait(), timeout=settings.OUTBOX_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wake_event.clear()
+
+
+def start_worker() -> None:
+    global _worker_task
+    if _worker_task is None:
+        _worker_task = asyncio.get_running_loop().create_task(run_worker())
+
+
+async def stop_worker() -> None:
+    global _worker_task, _wake_event
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    try:
+        await _worker_task
+    except asyncio.CancelledError:
+        pass
+    _worker_task = None
+    _wake_event = None
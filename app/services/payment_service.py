@@ -1,50 +1,143 @@
 # app/services/payment_service.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
+import asyncio
 import random # Simülasyon için
+import time
+
+from app.core.config import settings
+from app.core import metrics
+from app.utils.circuit_breaker import CircuitBreaker
+
+if TYPE_CHECKING:
+    import httpx
+
+# --- Paylaşılan gateway HTTP istemcisi ---
+# Tüm ödemeler tek bir bağlantı havuzunu kullanır (her istekte yeni TCP/TLS bağlantısı açılmaz)
+# httpx yalnızca gateway kullanılıyorsa (ilk ödemede) import edilir; mock modda uygulama başlangıcını yavaşlatmaz
+_gateway_client: Optional["httpx.AsyncClient"] = None
+
+def get_gateway_client() -> Optional["httpx.AsyncClient"]:
+    """PAYMENT_GATEWAY_URL tanımlıysa paylaşılan istemciyi (ilk çağrıda) oluşturur; yoksa None (mock mod)."""
+    global _gateway_client
+    if not settings.PAYMENT_GATEWAY_URL:
+        return None
+    if _gateway_client is None:
+        import httpx
+        _gateway_client = httpx.AsyncClient(
+            base_url=settings.PAYMENT_GATEWAY_URL,
+            limits=httpx.Limits(
+                max_connections=settings.PAYMENT_MAX_CONCURRENCY,
+                max_keepalive_connections=settings.PAYMENT_MAX_CONCURRENCY,
+            ),
+            # Asıl süre sınırı PaymentProcessor'daki strateji timeout'udur; bu yalnızca üst sınırdır
+            timeout=httpx.Timeout(settings.PAYMENT_TIMEOUT_SECONDS),
+        )
+    return _gateway_client
+
+async def close_gateway_client() -> None:
+    global _gateway_client
+    if _gateway_client is not None:
+        await _gateway_client.aclose()
+        _gateway_client = None
+
+
+# Gateway'e ödeme başına gönderilen tekillik anahtarı başlığı
+GATEWAY_IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class PaymentGatewayError(Exception):
+    """Gateway'e ulaşılamadı veya 5xx döndü (ödeme reddinden farklıdır; devre kesiciye hata sayılır)."""
+    pass
 
 # --- Strategy Arayüzü ---
 class PaymentStrategy(ABC):
+    # Bu stratejinin tek bir ödeme için bekleyebileceği en uzun süre (saniye)
+    timeout_seconds: float = settings.PAYMENT_TIMEOUT_SECONDS
+
     @abstractmethod
-    def pay(self, amount: float, payment_details: Dict[str, Any]) -> Dict[str, Any]:
+    async def pay(self, amount: float, payment_details: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Ödeme işlemini gerçekleştirir.
         Başarılı olursa ödeme ID'si ve durumu, başarısız olursa hata mesajı döner.
         payment_details: Kredi kartı bilgileri, PayPal hesabı vb. içerebilir.
+        idempotency_key: Gateway'e iletilir; aynı anahtarla tekrarlanan ödeme ikinci kez çekilmez.
+        Gateway'e ulaşılamazsa PaymentGatewayError yükseltir.
         """
         pass
 
+class GatewayPaymentStrategy(PaymentStrategy):
+    """
+    PAYMENT_GATEWAY_URL tanımlıysa ödemeyi gateway'e POST /charges ile gönderir,
+    tanımlı değilse süreç içinde mock (rastgele sonuç) olarak simüle eder.
+    """
+    method: str = ""
+    mock_success_rate: float = 1.0
+
+    async def _charge(self, amount: float, payment_details: Dict[str, Any], idempotency_key: Optional[str]) -> Dict[str, Any]:
+        client = get_gateway_client()
+        if client is None:
+            return self._mock_charge(amount)
+        import httpx # get_gateway_client tarafından zaten yüklendi
+        headers = {GATEWAY_IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else None
+        try:
+            response = await client.post(
+                "/charges", json={"method": self.method, "amount": amount, "details": payment_details}, headers=headers
+            )
+        except httpx.HTTPError as e:
+            raise PaymentGatewayError(f"Payment gateway request failed: {e.__class__.__name__}") from e
+        if response.status_code >= 500:
+            raise PaymentGatewayError(f"Payment gateway returned {response.status_code}")
+        try:
+            return response.json()
+        except ValueError as e:
+            raise PaymentGatewayError("Payment gateway returned an invalid response") from e
+
+    def _mock_charge(self, amount: float) -> Dict[str, Any]:
+        if random.random() < self.mock_success_rate:
+            return {"status": "success", "transaction_id": f"{self.method}_txn_{random.randint(10000, 99999)}"}
+        return {"status": "failed"}
+
 # --- Concrete Stratejiler ---
-class CreditCardPaymentStrategy(PaymentStrategy):
-    def pay(self, amount: float, payment_details: Dict[str, Any]) -> Dict[str, Any]:
+class CreditCardPaymentStrategy(GatewayPaymentStrategy):
+    method = "credit_card"
+    mock_success_rate = 0.9 # Basit simülasyon: %90 başarılı, %10 başarısız
+
+    async def pay(self, amount: float, payment_details: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         print(f"Processing credit card payment of {amount:.2f}...")
         print(f"Card Details (Mock): {payment_details.get('card_number', 'N/A')[-4:]}") # Sadece son 4 haneyi gösterelim (simülasyon)
-        
-        # Basit simülasyon: %90 başarılı, %10 başarısız
-        if random.random() < 0.9:
-            payment_id = f"cc_txn_{random.randint(10000, 99999)}"
-            print(f"Credit card payment successful. Transaction ID: {payment_id}")
-            return {"status": "success", "transaction_id": payment_id, "message": "Payment successful"}
+
+        result = await self._charge(amount, payment_details, idempotency_key)
+        if result.get("status") == "success":
+            print(f"Credit card payment successful. Transaction ID: {result.get('transaction_id')}")
+            return {"status": "success", "transaction_id": result.get("transaction_id"), "message": "Payment successful"}
         else:
-            print("Credit card payment failed (mock).")
-            return {"status": "failed", "message": "Credit card processing failed (mock)."}
+            print("Credit card payment failed.")
+            return {"status": "failed", "message": result.get("message") or "Credit card processing failed."}
+
+class PayPalPaymentStrategy(GatewayPaymentStrategy):
+    method = "paypal"
+    mock_success_rate = 0.95 # Basit simülasyon: %95 başarılı
 
-class PayPalPaymentStrategy(PaymentStrategy):
-    def pay(self, amount: float, payment_details: Dict[str, Any]) -> Dict[str, Any]:
+    async def pay(self, amount: float, payment_details: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         print(f"Redirecting to PayPal for payment of {amount:.2f}...")
         print(f"PayPal Account (Mock): {payment_details.get('paypal_email', 'N/A')}")
-        
-        # Basit simülasyon: %95 başarılı
-        if random.random() < 0.95:
-            payment_id = f"pp_txn_{random.randint(10000, 99999)}"
-            print(f"PayPal payment successful. Transaction ID: {payment_id}")
-            return {"status": "success", "transaction_id": payment_id, "message": "PayPal payment successful"}
+
+        result = await self._charge(amount, payment_details, idempotency_key)
+        if result.get("status") == "success":
+            print(f"PayPal payment successful. Transaction ID: {result.get('transaction_id')}")
+            return {"status": "success", "transaction_id": result.get("transaction_id"), "message": "PayPal payment successful"}
         else:
-            print("PayPal payment failed (mock).")
-            return {"status": "failed", "message": "PayPal processing failed (mock)."}
+            print("PayPal payment failed.")
+            return {"status": "failed", "message": result.get("message") or "PayPal processing failed."}
 
 # --- Context Sınıfı (PaymentProcessor) ---
 class PaymentProcessor:
+    """
+    Ödemeleri seçilen stratejiye yönlendirir. Aynı anda en fazla PAYMENT_MAX_CONCURRENCY ödeme
+    gateway'e gider; her strateji kendi timeout'u ve devre kesicisiyle korunur. Gateway sorunlarında
+    "unavailable" durumu döner (ödeme reddi "failed" durumundan ayrı tutulur).
+    """
     def __init__(self):
         self._strategies: Dict[str, PaymentStrategy] = {
             "credit_card": CreditCardPaymentStrategy(),
@@ -52,29 +145,82 @@ class PaymentProcessor:
             # Gelecekte yeni ödeme yöntemleri eklenebilir
         }
         self._default_strategy_key = "credit_card" # Varsayılan strateji
+        self._breakers: Dict[str, CircuitBreaker] = {
+            key: CircuitBreaker(
+                failure_threshold=settings.PAYMENT_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout_seconds=settings.PAYMENT_CIRCUIT_RESET_SECONDS,
+            )
+            for key in self._strategies
+        }
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def supports(self, strategy_key: str) -> bool:
+        return strategy_key in self._strategies
 
-    def set_strategy_by_key(self, strategy_key: str):
-        if strategy_key not in self._strategies:
+    def _resolve_strategy_key(self, strategy_key: Optional[str]) -> str:
+        # Paylaşılan instance'ta eşzamanlı istekler birbirinin seçimini ezmesin diye seçim durumu tutulmaz
+        if strategy_key and strategy_key not in self._strategies:
             print(f"Warning: Payment strategy '{strategy_key}' not found. Using default.")
-            self._current_strategy_key = self._default_strategy_key
-        else:
-            self._current_strategy_key = strategy_key
-        print(f"Payment strategy set to: {self._current_strategy_key}")
+            return self._default_strategy_key
+        return strategy_key or self._default_strategy_key
+
+    async def process_payment(
+        self, amount: float, payment_details: Dict[str, Any], strategy_key: Optional[str] = None, idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        idempotency_key gateway'e iletilir. Zaman aşımında sonuç {"status": "unavailable", "outcome_unknown": True}
+        olur: ödeme gateway tarafında gerçekleşmiş olabilir, aynı anahtarla yeniden denenmelidir.
+        """
+        strategy_key = self._resolve_strategy_key(strategy_key)
+        started = time.perf_counter()
+        result = await self._process_with_strategy(strategy_key, amount, payment_details, idempotency_key)
+        metrics.payment_duration_seconds.observe(time.perf_counter() - started, strategy_key, result.get("status", "error"))
+        return result
+
+    async def _process_with_strategy(
+        self, strategy_key: str, amount: float, payment_details: Dict[str, Any], idempotency_key: Optional[str]
+    ) -> Dict[str, Any]:
+        strategy_to_use = self._strategies[strategy_key]
+        breaker = self._breakers[strategy_key]
+
+        if not breaker.allow_request():
+            return {"status": "unavailable", "message": "Payment gateway is temporarily unavailable."}
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.PAYMENT_MAX_CONCURRENCY)
 
+        async def pay_with_slot() -> Dict[str, Any]:
+            async with self._semaphore:
+                return await strategy_to_use.pay(amount, payment_details, idempotency_key)
 
-    def process_payment(self, amount: float, payment_details: Dict[str, Any], strategy_key: Optional[str] = None) -> Dict[str, Any]:
-        if strategy_key:
-            self.set_strategy_by_key(strategy_key)
-        elif not hasattr(self, '_current_strategy_key') or not self._current_strategy_key:
-             self.set_strategy_by_key(self._default_strategy_key) # Eğer hiç ayarlanmadıysa varsayılanı kullan
+        try:
+            # Kuyrukta bekleme de aynı süre sınırına dahildir; gateway yavaşsa istekler birikmez
+            result = await asyncio.wait_for(pay_with_slot(), timeout=strategy_to_use.timeout_seconds)
+        except asyncio.TimeoutError:
+            # Zaman aşımında ödemenin gateway tarafında gerçekleşip gerçekleşmediği bilinmez
+            breaker.record_failure()
+            print(f"Payment via {strategy_key} timed out after {strategy_to_use.timeout_seconds}s (key: {idempotency_key}).")
+            return {"status": "unavailable", "outcome_unknown": True, "message": "Payment gateway timed out."}
+        except PaymentGatewayError as e:
+            breaker.record_failure()
+            print(f"Payment via {strategy_key} failed at gateway: {e}")
+            return {"status": "unavailable", "message": "Payment gateway is temporarily unavailable."}
+        except Exception:
+            breaker.record_failure() # Yarı açık devredeki deneme hakkı askıda kalmasın
+            raise
+        except BaseException:
+            # İstek iptal edildi (asyncio.CancelledError, ör. istemci bağlantıyı kapattı): gateway'in sağlığı
+            # hakkında bilgi yok, ama deneme hakkı serbest bırakılmazsa yarı açık devre hiç kapanmaz
+            breaker.release_trial()
+            raise
 
-        strategy_to_use = self._strategies.get(self._current_strategy_key)
-        if not strategy_to_use: # Ekstra güvenlik
-            return {"status": "error", "message": "No valid payment strategy selected."}
+        breaker.record_success() # Ödeme reddi de gateway'in sağlıklı yanıt verdiği anlamına gelir
+        return result
 
-        return strategy_to_use.pay(amount, payment_details)
+# Singleton: Devre kesici durumu ve eşzamanlılık sınırı tüm istekler arasında paylaşılmalı
+_payment_processor: Optional[PaymentProcessor] = None
 
-# Singleton deseni ile tek bir PaymentProcessor örneği de kullanılabilir,
-# ancak FastAPI'nin dependency injection sistemi ile her istekte yeni bir instance
-# oluşturmak veya bir factory kullanmak daha yaygındır. Şimdilik basit tutalım.
-# Örnek: payment_processor_instance = PaymentProcessor()
\ No newline at end of file
+def get_payment_processor() -> PaymentProcessor:
+    global _payment_processor
+    if _payment_processor is None:
+        _payment_processor = PaymentProcessor()
+    return _payment_processor
@@ -0,0 +1,229 @@
+# app/services/product_service.py
+import asyncio
+import csv
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_product
+from app.db.session import SessionLocal
+from app.schemas import product_schemas
+
+
+async def _iter_lines(byte_stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[str]]:
+    """
+    İstek gövdesini parça parça okuyup satırlara böler; bellekte en fazla bir parça + yarım satır tutulur.
+    max_line_bytes'ı aşan satır biriktirilmez: yerine bir kez None verilir ve satırın kalanı atlanır.
+    """
+    buffer = b""
+    first = True
+    skipping = False # Uzun satırın sonraki satır sonuna kadarki kısmı atılıyor
+    async for chunk in byte_stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > max_line_bytes:
+                yield None
+                continue
+            text = line.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+            first = False
+            yield text
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield None
+                skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield buffer.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+
+
+def _format_validation_errors(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in error.errors()]
+
+
+def _validate_row(raw: Any, upsert: bool) -> Dict[str, Any]:
+    """Satırı ProductCreate ile doğrular ve DB'ye yazılacak sözlüğe çevirir. Hatalıysa ValueError/ValidationError."""
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    # CSV'de boş hücreler opsiyonel alanlar için None kabul edilir
+    raw = {key: (None if value == "" else value) for key, value in raw.items() if key}
+    row = product_schemas.ProductCreate.model_validate(raw).model_dump(mode="json")
+    if upsert and raw.get("id") is not None:
+        row["id"] = int(raw["id"])
+    return row
+
+
+async def import_products(
+    db: Session,
+    byte_stream: AsyncIterator[bytes],
+    import_format: product_schemas.ProductImportFormat,
+    upsert: bool = False,
+) -> product_schemas.ProductImportResult:
+    """
+    CSV (ilk satır başlık) veya NDJSON gövdesini akış halinde okur, satırları parça parça doğrular
+    ve PRODUCT_IMPORT_BATCH_SIZE büyüklüğündeki transaction'larla toplu olarak yazar. Veritabanının reddettiği
+    parça, hatalı satırlar ayrılana kadar yarılanarak yeniden yazılır.
+    Her kayıt tek satırda olmalıdır (CSV'de tırnak içinde satır sonu desteklenmez); PRODUCT_IMPORT_MAX_LINE_BYTES'ı
+    aşan satırlar hatalı sayılır.
+    """
+    started = time.perf_counter()
+    batch_size = max(settings.PRODUCT_IMPORT_BATCH_SIZE, 1)
+    max_errors = settings.PRODUCT_IMPORT_MAX_ERRORS
+    max_line_bytes = settings.PRODUCT_IMPORT_MAX_LINE_BYTES
+
+    rows_received = 0
+    rows_imported = 0
+    rows_failed = 0
+    errors: List[product_schemas.ProductImportRowError] = []
+    errors_truncated = False
+    batch: List[Dict[str, Any]] = []
+    batch_row_numbers: List[int] = []
+    csv_header: Optional[List[str]] = None
+
+    def record_error(row_number: int, messages: List[str]) -> None:
+        nonlocal rows_failed, errors_truncated
+        rows_failed += 1
+        if len(errors) < max_errors:
+            errors.append(product_schemas.ProductImportRowError(row=row_number, errors=messages))
+        else:
+            errors_truncated = True
+
+    async def write(rows: List[Dict[str, Any]], row_numbers: List[int]) -> None:
+        nonlocal rows_imported
+        try:
+            # Senkron DB işi event loop'u bloklamasın diye threadpool'da çalışır
+            rows_imported += await run_in_threadpool(crud_product.bulk_write_products, db, rows, upsert)
+        except Exception as e:
+            if len(rows) == 1:
+                record_error(row_numbers[0], [f"rejected by database: {e.__class__.__name__}"])
+                return
+            # Parça geri alındı; yarılara bölünerek yeniden denenir, böylece yalnızca sorunlu satırlar raporlanır
+            middle = len(rows) // 2
+            await write(rows[:middle], row_numbers[:middle])
+            await write(rows[middle:], row_numbers[middle:])
+
+    async def flush() -> None:
+        if not batch:
+            return
+        await write(list(batch), list(batch_row_numbers))
+        batch.clear()
+        batch_row_numbers.clear()
+
+    async for line in _iter_lines(byte_stream, max_line_bytes):
+        if line is None:
+            if import_format == product_schemas.ProductImportFormat.CSV and csv_header is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"CSV header line exceeds {max_line_bytes} bytes.",
+                )
+            rows_received += 1
+            record_error(rows_received, [f"line exceeds {max_line_bytes} bytes"])
+            continue
+        if not line.strip():
+            continue
+        if import_format == product_schemas.ProductImportFormat.CSV and csv_header is None:
+            csv_header = [column.strip() for column in next(csv.reader([line]))]
+            continue
+
+        rows_received += 1
+        try:
+            if import_format == product_schemas.ProductImportFormat.CSV:
+                values = next(csv.reader([line]))
+                if len(values) != len(csv_header):
+                    raise ValueError(f"expected {len(csv_header)} columns, got {len(values)}")
+                raw = dict(zip(csv_header, values))
+            else:
+                raw = json.loads(line)
+            batch.append(_validate_row(raw, upsert))
+            batch_row_numbers.append(rows_received)
+        except ValidationError as e:
+            record_error(rows_received, _format_validation_errors(e))
+            continue
+        except ValueError as e: # json.JSONDecodeError dahil
+            record_error(rows_received, [str(e)])
+            continue
+
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    if rows_imported:
+        # Toplu yazımda ID'ler tek tek bilinmediği için önbellek toptan temizlenir; arama indeksine yalnızca
+        # eklenen ve isim/açıklaması değişen ürünler uygulanır
+        crud_product.product_cache.clear()
+        await run_in_threadpool(crud_product.refresh_search_index_if_stale, db)
+
+    elapsed = time.perf_counter() - started
+    return product_schemas.ProductImportResult(
+        rows_received=rows_received,
+        rows_imported=rows_imported,
+        rows_failed=rows_failed,
+        errors=errors,
+        errors_truncated=errors_truncated,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(rows_imported / elapsed, 1) if elapsed > 0 else 0.0,
+    )
+
+
+def resolve_import_format(
+    import_format: Optional[product_schemas.ProductImportFormat], content_type: Optional[str]
+) -> product_schemas.ProductImportFormat:
+    if import_format:
+        return import_format
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return product_schemas.ProductImportFormat.CSV
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return product_schemas.ProductImportFormat.NDJSON
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send text/csv or application/x-ndjson, or pass the 'format' query parameter.",
+    )
+
+
+# --- Arama indeksi tazeleyici ---
+# İndeks süreç içidir ve yalnızca bu worker'daki yazımlarla güncellenir. Diğer worker'ların (veya ayrı süreçteki
+# içe aktarmanın) değişiklikleri, ürün tablosu imzası periyodik kontrol edilerek en geç bir aralık sonra fark olarak uygulanır.
+_search_refresh_task: Optional[asyncio.Task] = None
+
+
+def _refresh_search_index() -> bool:
+    with SessionLocal() as db:
+        return crud_product.refresh_search_index_if_stale(db)
+
+
+async def run_search_index_refresher() -> None:
+    while True:
+        await asyncio.sleep(settings.SEARCH_INDEX_REFRESH_SECONDS)
+        try:
+            if await run_in_threadpool(_refresh_search_index):
+                print(f"Product search index refreshed; {len(crud_product.product_search_index)} products indexed.")
+        except Exception as e:
+            print(f"Search index refresh failed: {e}")
+
+
+def start_search_index_refresher() -> None:
+    global _search_refresh_task
+    if _search_refresh_task is None:
+        _search_refresh_task = asyncio.get_running_loop().create_task(run_search_index_refresher())
+
+
+async def stop_search_index_refresher() -> None:
+    global _search_refresh_task
+    if _search_refresh_task is None:
+        return
+    _search_refresh_task.cancel()
+    try:
+        await _search_refresh_task
+    except asyncio.CancelledError:
+        pass
+    _search_refresh_task = None
@@ -0,0 +1,127 @@
+# app/utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class _InflightLoad:
+    # Aynı anahtar için devam eden tek bir yükleme; bekleyenler sonucu buradan alır
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    Süreç içi (in-process), boyutu sınırlı, LRU + TTL önbellek.
+    Thread-safe'dir; isabet (hit) / ıskalama (miss) sayaçlarını tutar.
+    Not: Her uvicorn worker'ının kendi önbelleği vardır, invalidation sadece o worker'ı etkiler.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _InflightLoad] = {}
+        self._invalidations = 0 # Yükleme sürerken yapılan invalidation'ları fark etmek için
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key] # Süresi dolmuş
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]) -> None:
+        # Çağıran tarafın self._lock'u tutması gerekir
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False) # En eski (en az kullanılan) kaydı at
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl_seconds: Optional[float] = None) -> Any:
+        """
+        Read-through erişim. Önbellekte yoksa loader() çağrılır ve sonuç saklanır (None saklanmaz).
+        Aynı anahtar için eşzamanlı ıskalamalar tek bir yüklemede birleştirilir (single-flight).
+        ttl_seconds verilirse kayıt en fazla bu kadar yaşar (varsayılan TTL'i aşamaz).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            load = self._inflight.get(key)
+            is_leader = load is None
+            if is_leader:
+                load = _InflightLoad()
+                self._inflight[key] = load
+            invalidations_at_start = self._invalidations
+
+        if not is_leader:
+            load.event.wait()
+            if load.error is not None:
+                raise load.error
+            return load.value
+
+        try:
+            load.value = loader()
+            if load.value is not None and self.enabled:
+                with self._lock:
+                    # Yükleme sırasında invalidation olduysa okunan değer eski olabilir, saklama
+                    if self._invalidations == invalidations_at_start:
+                        self._store(key, load.value, ttl_seconds)
+            return load.value
+        except BaseException as e:
+            load.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            load.event.set()
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
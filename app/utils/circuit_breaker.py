@@ -0,0 +1,56 @@
+# app/utils/circuit_breaker.py
+import time
+
+
+class CircuitBreaker:
+    """
+    Basit devre kesici (circuit breaker).
+    - CLOSED: istekler geçer; art arda failure_threshold hata olursa OPEN'a geçer.
+    - OPEN: istekler hemen reddedilir; reset_timeout_seconds sonra HALF_OPEN'a geçer.
+    - HALF_OPEN: tek bir deneme isteğine izin verilir; başarılıysa CLOSED, başarısızsa tekrar OPEN.
+    Event loop üzerinde (tek thread) kullanılmak üzere tasarlanmıştır, kilit kullanmaz.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+            return self.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Sonucu bilinmeyen (ör. iptal edilen) çağrıdan sonra: sağlık bilgisi yok, yalnızca deneme hakkı geri verilir."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
@@ -0,0 +1,80 @@
+# app/utils/http_cache.py
+# Koşullu GET (RFC 9110): ETag / Last-Modified doğrulayıcıları ve If-None-Match / If-Modified-Since ile 304.
+# Doğrulayıcılar satır sürümlerinden üretilir; eşleşmede yanıt gövdesi hiç serileştirilmez.
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+# İstemci ve CDN yanıtı saklayabilir ama her kullanımda doğrulamalıdır (değişmediyse 304 döner)
+CACHE_CONTROL = "no-cache"
+
+
+def entity_etag(kind: str, entity_id: int, version: int) -> str:
+    """Tek bir satırın güçlü (strong) ETag'i; satır sürümü her değişiklikte arttığı için içerikle birlikte değişir."""
+    return f'"{kind}-{entity_id}-v{version}"'
+
+
+def list_etag(kind: str, query: str, rows: Iterable[Tuple[int, int]]) -> str:
+    """
+    Liste sayfası için toplu doğrulayıcı: sorgu parametreleri ve sayfadaki (id, sürüm) çiftlerinin sırasıyla özeti.
+    Sayfaya satır girip çıkması, sıranın değişmesi veya bir satırın güncellenmesi ETag'i değiştirir.
+    """
+    digest = hashlib.blake2b(query.encode(), digest_size=16)
+    for entity_id, version in rows:
+        digest.update(b"%d:%d," % (entity_id, version))
+    return f'"{kind}-{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    # Veritabanındaki zamanlar UTC ve timezone'suz tutulur
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match zayıf karşılaştırma kullanır: W/"x" ile "x" eşleşir
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False # Geçersiz tarih yok sayılır
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    etag: str,
+    render: Callable[[dict], Response],
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """
+    Doğrulayıcı istemcinin elindekiyle eşleşiyorsa gövdesiz 304 döner; aksi halde render(headers) çağrılır.
+    If-None-Match varsa If-Modified-Since değerlendirilmez.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return render(headers)
@@ -0,0 +1,26 @@
+# app/utils/pagination.py
+# Keyset (cursor) sayfalama için opak cursor yardımcıları.
+# Cursor, son satırın sıralama anahtarlarını taşıyan base64url kodlu bir JSON'dur;
+# istemci içeriğine güvenmemeli/çözmemelidir.
+import base64
+import json
+from typing import Any, Dict
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Geçersiz cursor için ValueError fırlatır."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,183 @@
+# app/utils/search.py
+# Süreç içi (in-memory) ters indeks (inverted index) ile BM25 sıralamalı tam metin arama.
+# Veritabanında LIKE '%...%' taraması yapmadan ürün adı/açıklaması üzerinde arama yapmak için kullanılır.
+import bisect
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class SearchIndex:
+    """
+    Alan ağırlıklı (örn. isim > açıklama) BM25 sıralaması yapan, artımlı güncellenebilen ters indeks.
+    Sorgudaki her kelime ya birebir ya da önek (prefix) olarak eşleşmelidir (AND semantiği).
+    Dokümanlar isteğe bağlı bir sürümle eklenebilir; versions() kaynaktaki sürümlerle karşılaştırılarak
+    yalnızca değişen dokümanlar yeniden indekslenir. Thread-safe'dir.
+    """
+
+    def __init__(
+        self,
+        field_weights: Dict[str, float],
+        k1: float = 1.2,
+        b: float = 0.75,
+        prefix_weight: float = 0.5,
+        max_prefix_expansions: int = 50,
+    ):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight # Önek eşleşmeleri birebir eşleşmelerden daha düşük puan alır
+        self.max_prefix_expansions = max_prefix_expansions
+        self._postings: Dict[str, Dict[int, float]] = {} # terim -> {doc_id: ağırlıklı terim frekansı}
+        self._doc_terms: Dict[int, Dict[str, float]] = {} # doc_id -> {terim: tf} (silme için)
+        self._doc_lengths: Dict[int, float] = {}
+        self._doc_versions: Dict[int, Optional[int]] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = [] # Önek araması için sıralı terim listesi
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def _term_freqs(self, fields: Dict[str, Optional[str]]) -> Counter:
+        term_freqs: Counter = Counter()
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for token in tokenize(text):
+                term_freqs[token] += weight
+        return term_freqs
+
+    def versions(self) -> Dict[int, Optional[int]]:
+        """İndeksteki dokümanların {doc_id: sürüm} kopyası."""
+        with self._lock:
+            return dict(self._doc_versions)
+
+    def add(self, doc_id: int, *, version: Optional[int] = None, **fields: Optional[str]) -> None:
+        """Dokümanı ekler; zaten varsa eski hali silinip yeniden indekslenir."""
+        term_freqs = self._term_freqs(fields)
+
+        with self._lock:
+            self._remove_locked(doc_id)
+            for term, tf in term_freqs.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._vocabulary, term)
+                postings[doc_id] = tf
+            doc_length = sum(term_freqs.values())
+            self._doc_terms[doc_id] = dict(term_freqs)
+            self._doc_lengths[doc_id] = doc_length
+            self._doc_versions[doc_id] = version
+            self._total_length += doc_length
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def replace(self, documents: Iterable[Tuple[int, Optional[int], Dict[str, Optional[str]]]]) -> None:
+        """
+        İndeksi (doc_id, sürüm, alanlar) dokümanlarıyla baştan kurar. Yeni yapı kilit dışında hazırlanır ve tek adımda
+        yerine konur; kurulum sürerken aramalar eski indeksi görür (clear + add'deki yarım indeks görülmez).
+        """
+        postings: Dict[str, Dict[int, float]] = {}
+        doc_terms: Dict[int, Dict[str, float]] = {}
+        doc_lengths: Dict[int, float] = {}
+        doc_versions: Dict[int, Optional[int]] = {}
+        total_length = 0.0
+        for doc_id, version, fields in documents:
+            term_freqs = self._term_freqs(fields)
+            for term, tf in term_freqs.items():
+                postings.setdefault(term, {})[doc_id] = tf
+            doc_terms[doc_id] = dict(term_freqs)
+            doc_lengths[doc_id] = sum(term_freqs.values())
+            doc_versions[doc_id] = version
+            total_length += doc_lengths[doc_id]
+        vocabulary = sorted(postings) # Terim başına insort yerine bir kez sıralanır
+
+        with self._lock:
+            self._postings = postings
+            self._doc_terms = doc_terms
+            self._doc_lengths = doc_lengths
+            self._doc_versions = doc_versions
+            self._total_length = total_length
+            self._vocabulary = vocabulary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._doc_versions.clear()
+            self._total_length = 0.0
+            self._vocabulary.clear()
+
+    def _remove_locked(self, doc_id: int) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                index = bisect.bisect_left(self._vocabulary, term)
+                if index < len(self._vocabulary) and self._vocabulary[index] == term:
+                    del self._vocabulary[index]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        self._doc_versions.pop(doc_id, None)
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        # Birebir terim + bu önekle başlayan terimler (sözlük sıralı listede ikili arama ile)
+        expansions: List[Tuple[str, float]] = []
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:start + self.max_prefix_expansions + 1]:
+            if not term.startswith(token):
+                break
+            expansions.append((term, 1.0 if term == token else self.prefix_weight))
+        return expansions
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """(doc_id, skor) listesini skora göre azalan sırada döndürür."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+
+            scores: Optional[Dict[int, float]] = None
+            for token in tokens:
+                token_scores: Dict[int, float] = {}
+                for term, term_weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                        score = term_weight * idf * tf * (self.k1 + 1) / (tf + norm)
+                        # Bir kelimenin birden fazla açılımı aynı dokümanda geçiyorsa en iyisi sayılır
+                        if score > token_scores.get(doc_id, 0.0):
+                            token_scores[doc_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items() if doc_id in token_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
@@ -0,0 +1,46 @@
+# app/utils/serialization.py
+# Sıcak endpoint'ler için hızlı yanıt serileştirme.
+# FastAPI'nin varsayılan yolu (response_model) dönen değeri doğrular, dump_python(mode="json") ile sözlüğe
+# çevirir ve stdlib json ile kodlar. Burada yanıt tipi için TypeAdapter modül yüklenirken bir kez derlenir;
+# değer tek geçişte doğrulanır (ORM nesnelerinden from_attributes ile, hazır şema nesneleri yeniden
+# doğrulanmadan geçer) ve pydantic-core'un Rust JSON kodlayıcısıyla doğrudan byte'a yazılır.
+# Çıktı varsayılan yol (JSONResponse) ile byte düzeyinde aynıdır (bkz. tests/test_utils/test_serialization.py).
+import json
+import re
+from typing import Any, Generic, Mapping, Optional, Type, TypeVar
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+JSON_MEDIA_TYPE = "application/json"
+
+# pydantic-core bazı float'ları stdlib json'dan farklı yazar: üslü gösterim (1e16 / 1e+16, 1.5e-6 / 1.5e-06)
+# ve 1e-6 <= |x| < 1e-4 aralığı (0.00001 / 1e-05). Çıktıda bunlardan biri olabilecekse varsayılan yolun
+# kodlamasına düşülür. Metin alanlarındaki eşleşmeler yalnızca yavaş yolu seçtirir, sonuç yine doğrudur.
+_DIVERGENT_FLOAT_RE = re.compile(rb"\de|0\.0000")
+
+
+class ResponseSerializer(Generic[T]):
+    """
+    Bir yanıt tipi (ör. List[Product]) için önceden derlenmiş serileştirici.
+    Endpoint Response döndürdüğünde FastAPI response_model doğrulamasını atlar; response_model yine
+    OpenAPI dokümantasyonu için kalmalıdır.
+    """
+
+    def __init__(self, response_type: Type[T]):
+        self.adapter: TypeAdapter[T] = TypeAdapter(response_type)
+
+    def to_json(self, content: Any) -> bytes:
+        value = self.adapter.validate_python(content, from_attributes=True)
+        body = self.adapter.dump_json(value)
+        if _DIVERGENT_FLOAT_RE.search(body) is None:
+            return body
+        # Starlette JSONResponse.render ile aynı ayarlar
+        return json.dumps(
+            self.adapter.dump_python(value, mode="json"), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    def response(self, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(self.to_json(content), status_code=status_code, headers=headers, media_type=JSON_MEDIA_TYPE)
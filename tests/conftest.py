@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Testler her zaman geçici bir SQLite dosyasında çalışır (.env'deki DATABASE_URL kullanılmaz).
+# Ayarlar app modülleri ilk import edildiğinde okunduğu için ortam değişkenleri app import'larından önce ayarlanır.
+_TEST_DIR = tempfile.mkdtemp(prefix="ecommerce-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["DATABASE_READ_URLS"] = ""
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["OUTBOX_WORKER_ENABLED"] = "false" # Outbox olayları testlerde process_due_events ile elle işlenir
+
+TEST_PASSWORD = "test-password"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _database():
+    # Şema migration'lar yerine doğrudan modellerden oluşturulur (benchmark ile aynı)
+    from app.db.base import Base
+    from app.db.session import get_engine
+
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _clean_state(_database):
+    # Her test boş tablolar ve boş süreç içi önbelleklerle başlar
+    yield
+    from app.db.base import Base
+    from app.crud import crud_product, crud_user
+
+    with _database.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    crud_product.product_cache.clear()
+    crud_product.product_search_index.clear()
+    crud_user.principal_cache.clear()
+
+
+@pytest.fixture
+def db():
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def _password_hash():
+    # bcrypt bilerek yavaştır; test kullanıcıları için bir kez hesaplanır
+    from app.core.security import pwd_context
+    return pwd_context.hash(TEST_PASSWORD)
+
+
+@pytest.fixture
+def create_user(db, _password_hash):
+    """`create_user(email, is_superuser=False)` -> (User, Authorization başlıkları). Login isteği yapılmadan token üretilir."""
+    from app.core.security import create_access_token
+    from app.models.user_model import User
+
+    def factory(email: str = "user@example.com", is_superuser: bool = False):
+        user = User(email=email, hashed_password=_password_hash, full_name="Test User", is_active=True, is_superuser=is_superuser)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user, {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+    return factory
+
+
+@pytest.fixture
+def auth_headers(create_user):
+    return create_user("user@example.com")[1]
+
+
+@pytest.fixture
+def admin_headers(create_user):
+    return create_user("admin@example.com", is_superuser=True)[1]
+
+
+@pytest.fixture
+def create_product(db):
+    """`create_product(**alanlar)` -> Product. Varsayılanlar: fiyat 10, stok 100."""
+    from app.models.product_model import Product
+
+    counter = iter(range(1, 1_000_000))
+
+    def factory(**fields):
+        number = next(counter)
+        values = {"name": f"Test product {number}", "description": None, "price": 10.0, "stock_quantity": 100, **fields}
+        product = Product(**values)
+        db.add(product)
+        db.commit()
+        db.refresh(product)
+        return product
+    return factory
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Endpoint başına sorgu üst sınırı için: `with assert_max_queries(3): client.get(...)`.
+    Sınır aşılırsa en sık çalışan sorgularla birlikte AssertionError yükseltilir.
+    """
+    from app.db.session import assert_max_queries as helper # Ayarlar (DATABASE_URL) yalnızca kullanıldığında yüklensin
+    return helper
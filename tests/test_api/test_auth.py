@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.crud import crud_user
+from app.main import app
+
+SLOW_QUERY_SECONDS = 0.5 # Her SQL ifadesine eklenen yapay gecikme (yavaş veritabanı)
+CONCURRENT_REQUESTS = 20
+TICK_SECONDS = 0.005
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_do_not_block_event_loop(create_user, monkeypatch):
+    _, headers = create_user("lag@example.com")
+    # Önbellek kapalı: her istek kullanıcıyı (bloklayan) DB sorgusuyla yükler
+    monkeypatch.setattr(crud_user.principal_cache, "max_size", 0)
+
+    def slow_database(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(SLOW_QUERY_SECONDS)
+
+    loop = asyncio.get_running_loop()
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        # Zamanlanan uyanma ile gerçek uyanma arasındaki fark = event loop gecikmesi
+        while not stop.is_set():
+            scheduled = loop.time() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(loop.time() - scheduled)
+
+    event.listen(Engine, "before_cursor_execute", slow_database)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/api/v1/auth/me", headers=headers) # Isınma (ilk istekteki tek seferlik kurulumlar ölçüme girmesin)
+            ticker_task = asyncio.create_task(ticker())
+            responses = await asyncio.gather(
+                *(client.get("/api/v1/auth/me", headers=headers) for _ in range(CONCURRENT_REQUESTS))
+            )
+            stop.set()
+            await ticker_task
+    finally:
+        event.remove(Engine, "before_cursor_execute", slow_database)
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_REQUESTS
+    print(f"event loop lag under {CONCURRENT_REQUESTS} authenticated requests: max {max(lags) * 1000:.1f} ms over {len(lags)} ticks")
+    # Bağımlılıklar event loop'ta çalışsaydı her sorgu döngüyü en az SLOW_QUERY_SECONDS kadar durdururdu.
+    # Threadpool'da kalan gecikme veritabanı süresinden bağımsızdır: worker thread'lerin CPU işi sırasında
+    # GIL için bekleme (eşzamanlı 20 istekte yerelde ~100-150 ms)
+    assert max(lags) < SLOW_QUERY_SECONDS / 2
@@ -0,0 +1,63 @@
+import pytest
+
+# Tek öğe yazımlarında çalışan SQL ifadesi üst sınırları (istek kimliği önbellekten gelir, bkz. _warm_up)
+MAX_ADD_STATEMENTS = 4
+MAX_UPDATE_STATEMENTS = 3
+MAX_REMOVE_STATEMENTS = 3
+RETURN_MODES = {"representation": "", "minimal": "?return=minimal"}
+
+
+def _warm_up(client, headers):
+    # Kullanıcı kimliği önbelleğe alınır ve sepet oluşturulur; sayımlar yalnızca yazma yolunu ölçer
+    assert client.get("/api/v1/cart/", headers=headers).status_code == 200
+
+
+def _add(client, headers, product_id, quantity, query=""):
+    return client.post(f"/api/v1/cart/items{query}", json={"product_id": product_id, "quantity": quantity}, headers=headers)
+
+
+@pytest.mark.parametrize("mode", list(RETURN_MODES))
+def test_cart_writes_stay_within_statement_budget(client, auth_headers, create_product, assert_max_queries, mode):
+    query = RETURN_MODES[mode]
+    product = create_product(price=12.5)
+    _warm_up(client, auth_headers)
+
+    with assert_max_queries(MAX_ADD_STATEMENTS):
+        added = _add(client, auth_headers, product.id, 2, query)
+    assert added.status_code == 200
+    item_id = (added.json()["item"] if mode == "minimal" else added.json()["items"][0])["id"]
+
+    with assert_max_queries(MAX_UPDATE_STATEMENTS):
+        updated = client.put(f"/api/v1/cart/items/{item_id}{query}", json={"quantity": 5}, headers=auth_headers)
+    assert updated.status_code == 200
+
+    with assert_max_queries(MAX_REMOVE_STATEMENTS):
+        removed = client.delete(f"/api/v1/cart/items/{item_id}{query}", headers=auth_headers)
+    assert removed.status_code == 200
+
+
+def test_adding_existing_product_increments_the_line(client, auth_headers, create_product):
+    product = create_product(price=10.0)
+    _add(client, auth_headers, product.id, 2)
+    cart = _add(client, auth_headers, product.id, 3).json()
+
+    assert [(item["product_id"], item["quantity"]) for item in cart["items"]] == [(product.id, 5)]
+    assert cart["total_cart_price"] == 50.0
+
+
+def test_minimal_responses_return_changed_line_and_totals(client, auth_headers, create_product):
+    first = create_product(price=10.0)
+    second = create_product(price=2.5)
+    _add(client, auth_headers, first.id, 1)
+
+    added = _add(client, auth_headers, second.id, 4, "?return=minimal").json()
+    assert set(added) == {"cart_id", "item", "item_count", "total_cart_price"}
+    assert (added["item"]["product_id"], added["item"]["quantity"]) == (second.id, 4)
+    assert added["item"]["product"]["price"] == 2.5
+    assert (added["item_count"], added["total_cart_price"]) == (2, 20.0)
+
+    updated = client.put(f"/api/v1/cart/items/{added['item']['id']}?return=minimal", json={"quantity": 2}, headers=auth_headers).json()
+    assert (updated["item"]["quantity"], updated["item_count"], updated["total_cart_price"]) == (2, 2, 15.0)
+
+    removed = client.delete(f"/api/v1/cart/items/{added['item']['id']}?return=minimal", headers=auth_headers).json()
+    assert removed == {"cart_id": added["cart_id"], "item": None, "item_count": 1, "total_cart_price": 10.0}
@@ -0,0 +1,48 @@
+import re
+
+# Exposition format 0.0.4 örnek satırı: isim{etiketler} değer
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_]\w*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+PRODUCT_ROUTE_LABELS = '{method="GET",route="/api/v1/products/{product_id}",status="200"'
+
+
+def _scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    samples, types = {}, {}
+    for line in response.text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, type_name = line.split(" ")
+            types[name] = type_name
+        elif not line.startswith("# HELP "):
+            match = SAMPLE_LINE.match(line)
+            assert match, f"not a valid sample line: {line!r}"
+            samples[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    return samples, types
+
+
+def test_metrics_exposition_tracks_requests(client, create_product):
+    product = create_product()
+    before, _ = _scrape(client)
+    assert client.get(f"/api/v1/products/{product.id}").status_code == 200
+    after, types = _scrape(client)
+
+    assert types["http_requests_total"] == "counter"
+    assert types["http_request_duration_seconds"] == "histogram"
+    assert types["http_requests_in_progress"] == "gauge"
+
+    def delta(key):
+        return after.get(key, 0.0) - before.get(key, 0.0)
+
+    # Ham path değil route şablonu etiketlenir
+    assert delta("http_requests_total" + PRODUCT_ROUTE_LABELS + "}") == 1
+    assert delta("http_request_duration_seconds_count" + PRODUCT_ROUTE_LABELS + "}") == 1
+    assert delta("http_request_duration_seconds_bucket" + PRODUCT_ROUTE_LABELS + ',le="+Inf"}') == 1
+    assert delta("http_request_duration_seconds_sum" + PRODUCT_ROUTE_LABELS + "}") > 0
+
+    # Kovalar kümülatiftir: üst sınır arttıkça sayı azalmaz
+    buckets = [
+        value for key, value in after.items()
+        if key.startswith("http_request_duration_seconds_bucket" + PRODUCT_ROUTE_LABELS)
+    ]
+    assert len(buckets) == 15 and buckets == sorted(buckets)
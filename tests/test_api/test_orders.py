@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.crud import crud_idempotency
+from app.main import app
+from app.models import outbox_model
+from app.models.idempotency_model import IdempotencyKey
+from app.models.product_model import Product
+from app.services import idempotency_service, outbox_service, payment_service
+
+ORDER_URL = "/api/v1/orders/?payment_method=credit_card"
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def _fill_cart(client, headers, create_product):
+    product = create_product(price=25.0)
+    assert client.post("/api/v1/cart/items", json={"product_id": product.id, "quantity": 2}, headers=headers).status_code < 300
+    return product
+
+
+def _stub_gateway(monkeypatch, delay=0.0):
+    # Kredi kartı stratejisinin gateway çağrısı sahte bir ödemeyle değiştirilir; iletilen anahtarlar kaydedilir
+    monkeypatch.setattr(payment_service, "_payment_processor", payment_service.PaymentProcessor())
+    strategy = payment_service.get_payment_processor()._strategies["credit_card"]
+    gateway_keys = []
+
+    async def gateway_pay(amount, payment_details, idempotency_key=None):
+        gateway_keys.append(idempotency_key)
+        await asyncio.sleep(delay)
+        return {"status": "success", "transaction_id": f"txn-{len(gateway_keys)}", "message": "Payment successful"}
+
+    monkeypatch.setattr(strategy, "pay", gateway_pay)
+    return gateway_keys
+
+
+def test_payment_timeout_keeps_idempotency_key_and_retry_reuses_gateway_key(
+    client, db, create_user, create_product, monkeypatch
+):
+    user, headers = create_user()
+    product = create_product(price=25.0)
+    assert client.post("/api/v1/cart/items", json={"product_id": product.id, "quantity": 2}, headers=headers).status_code < 300
+
+    monkeypatch.setattr(payment_service, "_payment_processor", payment_service.PaymentProcessor())
+    strategy = payment_service.get_payment_processor()._strategies["credit_card"]
+    monkeypatch.setattr(strategy, "timeout_seconds", 0.05)
+    gateway_keys = []
+
+    async def gateway_pay(amount, payment_details, idempotency_key=None):
+        gateway_keys.append(idempotency_key)
+        if len(gateway_keys) == 1:
+            await asyncio.sleep(1) # İlk deneme zaman aşımına uğrar (gateway'de çekilmiş olabilir)
+        return {"status": "success", "transaction_id": "txn-1", "message": "Payment successful"}
+
+    monkeypatch.setattr(strategy, "pay", gateway_pay)
+    order_headers = {**headers, "Idempotency-Key": "checkout-1"}
+
+    timed_out = client.post("/api/v1/orders/?payment_method=credit_card", headers=order_headers)
+    assert timed_out.status_code == 503
+    assert crud_idempotency.get_key(db, user.id, "checkout-1").status == IdempotencyKey.OUTCOME_UNKNOWN
+
+    retried = client.post("/api/v1/orders/?payment_method=credit_card", headers=order_headers)
+    assert retried.status_code == 201
+    assert len(gateway_keys) == 2 and gateway_keys[0] == gateway_keys[1] is not None
+
+    replayed = client.post("/api/v1/orders/?payment_method=credit_card", headers=order_headers)
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json()["id"] == retried.json()["id"]
+    assert len(gateway_keys) == 2
+
+
+def test_stock_conflict_after_payment_requests_a_refund(client, db, create_user, create_product, monkeypatch):
+    _, headers = create_user()
+    product = create_product(price=25.0, stock_quantity=5)
+    assert client.post("/api/v1/cart/items", json={"product_id": product.id, "quantity": 2}, headers=headers).status_code < 300
+
+    monkeypatch.setattr(payment_service, "_payment_processor", payment_service.PaymentProcessor())
+    strategy = payment_service.get_payment_processor()._strategies["credit_card"]
+
+    async def pay_while_stock_sells_out(amount, payment_details, idempotency_key=None):
+        # Ödeme sürerken başka bir sipariş stoğu tüketir
+        db.execute(update(Product).where(Product.id == product.id).values(stock_quantity=1))
+        db.commit()
+        return {"status": "success", "transaction_id": "txn-refund", "message": "Payment successful"}
+
+    monkeypatch.setattr(strategy, "pay", pay_while_stock_sells_out)
+    refunds = []
+    monkeypatch.setitem(outbox_service._handlers, outbox_model.PAYMENT_REFUND_REQUESTED, [refunds.append])
+
+    response = client.post("/api/v1/orders/?payment_method=credit_card", headers=headers)
+    assert response.status_code == 409
+
+    assert outbox_service.process_due_events(db) == 1
+    assert [(refund["transaction_id"], refund["amount"]) for refund in refunds] == [("txn-refund", 50.0)]
+
+
+def test_replayed_order_does_not_write_or_charge_again(client, db, create_user, create_product, monkeypatch, assert_max_queries):
+    _, headers = create_user()
+    _fill_cart(client, headers, create_product)
+    gateway_keys = _stub_gateway(monkeypatch)
+    order_headers = {**headers, "Idempotency-Key": "checkout-replay"}
+
+    created = client.post(ORDER_URL, headers=order_headers)
+    assert created.status_code == 201 and len(gateway_keys) == 1
+
+    with assert_max_queries(5) as stats:
+        replayed = client.post(ORDER_URL, headers=order_headers)
+    assert replayed.status_code == 201
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == created.json()
+    assert [statement for statement in stats.statements if statement.lstrip().upper().startswith(WRITE_STATEMENTS)] == []
+    assert len(gateway_keys) == 1
+
+
+def test_idempotency_key_reused_with_different_parameters_is_rejected(client, create_user, create_product, monkeypatch):
+    _, headers = create_user()
+    _fill_cart(client, headers, create_product)
+    gateway_keys = _stub_gateway(monkeypatch)
+    order_headers = {**headers, "Idempotency-Key": "checkout-mismatch"}
+
+    assert client.post(ORDER_URL, headers=order_headers).status_code == 201
+    mismatched = client.post("/api/v1/orders/?payment_method=paypal", headers=order_headers)
+    assert mismatched.status_code == 422
+    assert len(gateway_keys) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_for_the_first_execution(client, create_user, create_product, monkeypatch):
+    _, headers = create_user()
+    _fill_cart(client, headers, create_product)
+    gateway_keys = _stub_gateway(monkeypatch, delay=0.3) # İkinci istek ödeme sürerken gelir
+    order_headers = {**headers, "Idempotency-Key": "checkout-concurrent"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+        first, second = await asyncio.gather(
+            async_client.post(ORDER_URL, headers=order_headers),
+            async_client.post(ORDER_URL, headers=order_headers),
+        )
+
+    assert (first.status_code, second.status_code) == (201, 201)
+    assert first.json()["id"] == second.json()["id"]
+    assert sorted(response.headers.get("Idempotent-Replayed", "false") for response in (first, second)) == ["false", "true"]
+    assert len(gateway_keys) == 1
+
+
+def test_abandoned_in_progress_key_is_taken_over_after_its_lock_expires(client, db, create_user, create_product, monkeypatch):
+    user, headers = create_user()
+    _fill_cart(client, headers, create_product)
+    gateway_keys = _stub_gateway(monkeypatch)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_TIMEOUT_SECONDS", 0.2)
+    # Ödeme sırasında çöken bir worker'ın bıraktığı kayıt
+    now = datetime.utcnow()
+    fingerprint = idempotency_service.request_fingerprint("POST", "/api/v1/orders/", {"payment_method": "credit_card"})
+    crud_idempotency.try_create_in_progress(
+        db, user_id=user.id, key="checkout-crashed", request_fingerprint=fingerprint,
+        expires_at=now + timedelta(days=1), locked_until=now + timedelta(minutes=1)
+    )
+    order_headers = {**headers, "Idempotency-Key": "checkout-crashed"}
+
+    assert client.post(ORDER_URL, headers=order_headers).status_code == 409 # Kilit hâlâ geçerli
+    assert gateway_keys == []
+
+    db.execute(update(IdempotencyKey).values(locked_until=now - timedelta(seconds=1)))
+    db.commit()
+    taken_over = client.post(ORDER_URL, headers=order_headers)
+    assert taken_over.status_code == 201
+    assert gateway_keys == [idempotency_service.downstream_key(user.id, "checkout-crashed")]
+    assert client.post(ORDER_URL, headers=order_headers).json()["id"] == taken_over.json()["id"]
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.crud import crud_product
+from app.db.session import get_engine
+from app.models.product_model import Product
+
+CSV_HEADERS = {"Content-Type": "text/csv"}
+NDJSON_HEADERS = {"Content-Type": "application/x-ndjson"}
+
+
+def _import(client, headers, body, query=""):
+    response = client.post(f"/api/v1/products/bulk{query}", content=body, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _ndjson(rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n"
+
+
+def _products(db):
+    return {product.name: product for product in db.query(Product).order_by(Product.id)}
+
+
+@pytest.fixture
+def reject_named_rows():
+    # Veritabanı düzeyinde bir kısıt ihlalinin yerine geçer: bu isimle yapılan eklemeler reddedilir
+    with get_engine().begin() as connection:
+        connection.execute(text(
+            "CREATE TRIGGER reject_named_rows BEFORE INSERT ON products WHEN NEW.name LIKE 'Rejected%' "
+            "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        ))
+    yield
+    with get_engine().begin() as connection:
+        connection.execute(text("DROP TRIGGER reject_named_rows"))
+
+
+def test_bulk_import_csv(client, db, admin_headers):
+    body = "\ufeffname,description,price,stock_quantity,image_url\r\nDesk lamp,,19.5,3,\r\nOffice chair,Mesh back,120,0,\r\n"
+    result = _import(client, {**admin_headers, **CSV_HEADERS}, body)
+
+    assert (result["rows_received"], result["rows_imported"], result["rows_failed"]) == (2, 2, 0)
+    products = _products(db)
+    assert products["Desk lamp"].description is None and products["Desk lamp"].price == 19.5
+    assert products["Office chair"].description == "Mesh back" and products["Office chair"].stock_quantity == 0
+    assert [product.name for product in crud_product.search_products(db, "chair")] == ["Office chair"]
+
+
+def test_bulk_import_ndjson(client, db, admin_headers):
+    rows = [{"name": "Tea cup", "price": 4.0, "stock_quantity": 10}, {"name": "Tea pot", "price": 22.0, "stock_quantity": 2}]
+    result = _import(client, {**admin_headers, **NDJSON_HEADERS}, _ndjson(rows))
+
+    assert (result["rows_received"], result["rows_imported"], result["rows_failed"]) == (2, 2, 0)
+    assert set(_products(db)) == {"Tea cup", "Tea pot"}
+
+
+def test_bulk_import_reports_only_the_invalid_rows(client, db, admin_headers, monkeypatch, reject_named_rows):
+    monkeypatch.setattr(settings, "PRODUCT_IMPORT_BATCH_SIZE", 4)
+    rows = [
+        {"name": "Valid 1", "price": 1.0, "stock_quantity": 1},
+        {"name": "Valid 2", "price": 1.0, "stock_quantity": 1},
+        {"name": "Rejected A", "price": 1.0, "stock_quantity": 1}, # Veritabanı reddeder
+        {"name": "Valid 3", "price": 1.0, "stock_quantity": 1},
+        "{not json",
+        {"name": "Valid 4", "price": -5, "stock_quantity": 1}, # Doğrulama hatası
+        {"name": "Valid 5", "price": 1.0, "stock_quantity": 1},
+        {"name": "Rejected B", "price": 1.0, "stock_quantity": 1},
+        {"name": "Valid 6", "price": 1.0, "stock_quantity": 1},
+    ]
+    result = _import(client, {**admin_headers, **NDJSON_HEADERS}, _ndjson(rows))
+
+    assert (result["rows_received"], result["rows_imported"], result["rows_failed"]) == (9, 5, 4)
+    errors = {error["row"]: error["errors"] for error in result["errors"]}
+    assert sorted(errors) == [3, 5, 6, 8]
+    assert errors[3] == errors[8] == ["rejected by database: IntegrityError"]
+    assert errors[6] == ["price: Input should be greater than 0"]
+    assert set(_products(db)) == {"Valid 1", "Valid 2", "Valid 3", "Valid 5", "Valid 6"}
+
+
+def test_bulk_import_upsert_updates_rows_with_ids(client, db, admin_headers, create_product):
+    existing = create_product(name="Old name", price=10.0, stock_quantity=5)
+    existing_id, existing_version = existing.id, existing.version
+    body = f"id,name,price,stock_quantity\n{existing_id},New name,12.5,7\n,Brand new,3,1\n"
+    result = _import(client, {**admin_headers, **CSV_HEADERS}, body, "?upsert=true")
+
+    assert (result["rows_imported"], result["rows_failed"]) == (2, 0)
+    db.expire_all()
+    updated = db.get(Product, existing_id)
+    assert (updated.name, updated.price, updated.stock_quantity, updated.version) == ("New name", 12.5, 7, existing_version + 1)
+    assert set(_products(db)) == {"New name", "Brand new"}
+    assert crud_product.search_products(db, "old") == []
+
+
+def test_bulk_import_rejects_overlong_lines_without_buffering_them(client, db, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "PRODUCT_IMPORT_MAX_LINE_BYTES", 100)
+
+    def body():
+        # Uzun satır birçok parçaya yayılır; satır sonu gelene kadar biriktirilmemelidir
+        yield json.dumps({"name": "Before", "price": 1.0, "stock_quantity": 1}).encode() + b"\n"
+        yield b'{"name": "' + b"x" * 60
+        for _ in range(50):
+            yield b"x" * 60
+        yield b'", "price": 1.0, "stock_quantity": 1}\n'
+        yield json.dumps({"name": "After", "price": 1.0, "stock_quantity": 1}).encode() + b"\n"
+
+    result = _import(client, {**admin_headers, **NDJSON_HEADERS}, body())
+
+    assert (result["rows_received"], result["rows_imported"], result["rows_failed"]) == (3, 2, 1)
+    assert result["errors"] == [{"row": 2, "errors": ["line exceeds 100 bytes"]}]
+    assert set(_products(db)) == {"Before", "After"}
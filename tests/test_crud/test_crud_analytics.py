@@ -0,0 +1,37 @@
+from app.crud import crud_analytics, crud_order
+from app.models.order_model import OrderStatus
+
+
+def _place_order(db, user, product, quantity=1):
+    order = crud_order.create_order_with_items(
+        db, user=user, total_amount=quantity * product.price,
+        items_data=[{"product_id": product.id, "quantity": quantity, "price_at_purchase": product.price}],
+    )
+    db.commit()
+    return order
+
+
+def test_cancelled_order_leaves_revenue_and_top_products(db, create_user, create_product):
+    user, _ = create_user()
+    product = create_product(price=49.0)
+    order = _place_order(db, user, product)
+    assert [(row.product_id, row.revenue) for row in crud_analytics.get_top_products(db)] == [(product.id, 49.0)]
+
+    crud_order.update_order_status(db, order.id, OrderStatus.CANCELLED)
+
+    assert [row.revenue for row in crud_analytics.get_daily_revenue(db)] == [0.0]
+    assert crud_analytics.get_top_products(db) == []
+    assert crud_analytics.check_rollups(db) == []
+
+
+def test_status_change_moves_product_sales_between_statuses(db, create_user, create_product):
+    user, _ = create_user()
+    product = create_product(price=10.0)
+    shipped = _place_order(db, user, product, quantity=2)
+    cancelled = _place_order(db, user, product, quantity=3)
+    crud_order.update_order_status(db, shipped.id, OrderStatus.SHIPPED)
+    crud_order.update_order_status(db, cancelled.id, OrderStatus.CANCELLED)
+
+    [top] = crud_analytics.get_top_products(db)
+    assert (top.units, top.revenue, top.order_count) == (2, 20.0, 1)
+    assert crud_analytics.check_rollups(db) == []
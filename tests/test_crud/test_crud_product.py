@@ -0,0 +1,111 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from app.crud import crud_product
+from app.db.base import Base
+from app.db.session import SessionLocal
+from app.models.product_model import Product
+from app.schemas.product_schemas import ProductUpdate
+
+
+def test_decrement_stock_under_contention_never_oversells(create_product):
+    # Küçük bir stok için 200 eşzamanlı düşüm: her biri kendi session'ı ve transaction'ıyla
+    initial_stock, workers = 50, 200
+    product = create_product(stock_quantity=initial_stock)
+    outcomes = []
+    outcomes_lock = threading.Lock()
+    start = threading.Barrier(workers)
+
+    def buy_one():
+        start.wait()
+        with SessionLocal() as session:
+            try:
+                crud_product.decrement_stock(session, {product.id: 1})
+                session.commit()
+                outcome = "ok"
+            except crud_product.InsufficientStockError:
+                session.rollback()
+                outcome = "rejected"
+            except Exception as e: # Kilit zaman aşımı vb. testin başarısız olmasına yol açmalı
+                session.rollback()
+                outcome = repr(e)
+        with outcomes_lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=buy_one) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with SessionLocal() as session:
+        final_stock = crud_product.get_product(session, product.id).stock_quantity
+    print(f"decrement_stock: {outcomes.count('ok')} ok / {outcomes.count('rejected')} rejected in {elapsed:.3f}s ({workers / elapsed:.0f} attempts/s)")
+
+    assert final_stock == 0
+    assert outcomes.count("ok") == initial_stock
+    assert outcomes.count("rejected") == workers - initial_stock
+
+
+def test_search_index_picks_up_writes_from_other_workers(db, create_product, monkeypatch):
+    create_product(name="Red kettle")
+    removed = create_product(name="Old toaster")
+    crud_product.rebuild_search_index(db)
+    assert not crud_product.refresh_search_index_if_stale(db)
+
+    # Başka bir worker'ın yazımları: bu süreçteki indeks artımlı güncellenmez
+    other = create_product(name="Blue teapot")
+    db.execute(update(Product).where(Product.name == "Red kettle").values(
+        name="Green kettle", version=Product.version + 1, search_version=Product.search_version + 1
+    ))
+    db.delete(removed)
+    db.commit()
+    assert crud_product.search_products(db, "teapot") == []
+
+    # Yalnızca farklar uygulanır; indeks baştan kurulmaz
+    monkeypatch.setattr(crud_product.product_search_index, "replace", None)
+    assert crud_product.refresh_search_index_if_stale(db)
+    assert crud_product.search_products(db, "toaster") == []
+    assert [product.id for product in crud_product.search_products(db, "teapot")] == [other.id]
+    assert [product.name for product in crud_product.search_products(db, "kettle")] == ["Green kettle"]
+    assert crud_product.search_products(db, "red") == []
+    assert not crud_product.refresh_search_index_if_stale(db)
+
+
+def test_stock_and_price_changes_do_not_refresh_the_search_index(db, create_product):
+    product = create_product(name="Steel kettle", stock_quantity=5)
+    crud_product.rebuild_search_index(db)
+
+    crud_product.decrement_stock(db, {product.id: 2})
+    db.commit()
+    crud_product.update_product(db, crud_product.get_product(db, product.id), ProductUpdate(price=12.0, name="Steel kettle"))
+    assert not crud_product.refresh_search_index_if_stale(db)
+
+    # Toplu upsert de yalnızca isim/açıklama değişirse arama sürümünü artırır
+    row = {"id": product.id, "name": "Steel kettle", "description": None, "price": 13.0, "stock_quantity": 3, "image_url": None}
+    crud_product.bulk_write_products(db, [row], upsert=True)
+    assert not crud_product.refresh_search_index_if_stale(db)
+    crud_product.bulk_write_products(db, [{**row, "name": "Copper kettle"}], upsert=True)
+    assert crud_product.refresh_search_index_if_stale(db)
+    assert [found.name for found in crud_product.search_products(db, "copper")] == ["Copper kettle"]
+
+
+def test_product_cache_misses_are_loaded_from_the_primary(db, create_product, tmp_path):
+    product = create_product(name="Fresh name")
+    # Geride kalan replika: aynı ürünün eski hali
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica_engine)
+    with Session(replica_engine) as replica:
+        replica.add(Product(id=product.id, name="Stale name", price=product.price, stock_quantity=product.stock_quantity))
+        replica.commit()
+
+        cached = crud_product.get_product_cached(replica, product.id)
+    replica_engine.dispose()
+
+    assert cached.name == "Fresh name"
+    assert crud_product.product_cache.get(product.id).name == "Fresh name"
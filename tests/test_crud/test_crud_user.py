@@ -0,0 +1,33 @@
+from app.crud import crud_user
+from app.db.session import SessionLocal
+from app.schemas.user_schemas import UserUpdate
+
+
+def test_principal_loaded_during_deactivation_is_not_cached(db, create_user, monkeypatch):
+    user, _ = create_user("race@example.com")
+    original_lookup = crud_user.get_user_by_email
+
+    def lookup_racing_with_update(session, email):
+        # Yükleme eski satırı okuduktan hemen sonra kullanıcı başka bir istekte deaktive edilir
+        stale_user = original_lookup(session, email=email)
+        snapshot = crud_user.UserSnapshot.model_validate(stale_user)
+        monkeypatch.setattr(crud_user, "get_user_by_email", original_lookup)
+        crud_user.update_user(db, db_user=crud_user.get_user(db, user.id), user_in=UserUpdate(email=email, is_active=False))
+        return snapshot
+
+    monkeypatch.setattr(crud_user, "get_user_by_email", lookup_racing_with_update)
+    with SessionLocal() as other_session:
+        principal = crud_user.get_user_principal(other_session, "race@example.com", max_age_seconds=60)
+    assert principal.is_active # Bu istek yükleme anındaki görüntüyü görür...
+
+    with SessionLocal() as other_session:
+        assert crud_user.get_user_principal(other_session, "race@example.com").is_active is False # ...ama önbelleğe yazılmaz
+
+
+def test_principal_cache_entry_does_not_outlive_token(db, create_user):
+    create_user("short@example.com")
+    crud_user.get_user_principal(db, "short@example.com", max_age_seconds=0)
+    # Token'ın kalan süresi 0 ise kayıt saklanmaz; bir sonraki çağrı yine veritabanına gider
+    misses = crud_user.principal_cache.misses
+    crud_user.get_user_principal(db, "short@example.com", max_age_seconds=60)
+    assert crud_user.principal_cache.misses == misses + 1
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import event
+
+from app.crud import crud_product
+from app.db.session import get_engine
+from app.schemas.product_schemas import ProductSort
+
+PRICE_INDEX = "ix_products_price_id_stock_quantity"
+STOCK_INDEX = "ix_products_stock_quantity_id"
+NAME_INDEX = "ix_products_name"
+ROWID = None # Birincil anahtar (rowid) sırasıyla tarama
+
+FILTERS = {
+    "none": {},
+    "price_range": {"min_price": 5.0, "max_price": 50.0},
+    "in_stock": {"in_stock": True},
+    "out_of_stock": {"in_stock": False},
+}
+
+# (filtre, sıralama) -> (kullanılan indeks, geçici B-tree ile sıralama var mı)
+EXPECTED_PLANS = {
+    ("none", None): (ROWID, False),
+    ("none", ProductSort.PRICE): (PRICE_INDEX, False),
+    ("none", ProductSort.PRICE_DESC): (PRICE_INDEX, False),
+    ("none", ProductSort.NAME): (NAME_INDEX, False),
+    ("none", ProductSort.NEWEST): (ROWID, False),
+    # Aralık seek'i; farklı bir sıralamada yalnızca aralıktaki satırlar sıralanır
+    ("price_range", None): (PRICE_INDEX, True),
+    ("price_range", ProductSort.PRICE): (PRICE_INDEX, False),
+    ("price_range", ProductSort.PRICE_DESC): (PRICE_INDEX, False),
+    ("price_range", ProductSort.NAME): (PRICE_INDEX, True),
+    ("price_range", ProductSort.NEWEST): (PRICE_INDEX, True),
+    # stock_quantity > 0 seçici değil: sıralama sırasıyla taranır, koşul elenir, LIMIT dolunca durulur
+    ("in_stock", None): (ROWID, False),
+    ("in_stock", ProductSort.PRICE): (PRICE_INDEX, False),
+    ("in_stock", ProductSort.PRICE_DESC): (PRICE_INDEX, False),
+    ("in_stock", ProductSort.NAME): (NAME_INDEX, False),
+    ("in_stock", ProductSort.NEWEST): (ROWID, False),
+    # stock_quantity = 0 seek'i; ID dışı sıralamada yalnızca stokta olmayan satırlar sıralanır
+    ("out_of_stock", None): (STOCK_INDEX, False),
+    ("out_of_stock", ProductSort.PRICE): (STOCK_INDEX, True),
+    ("out_of_stock", ProductSort.PRICE_DESC): (STOCK_INDEX, True),
+    ("out_of_stock", ProductSort.NAME): (STOCK_INDEX, True),
+    ("out_of_stock", ProductSort.NEWEST): (STOCK_INDEX, False),
+}
+
+
+def _listing_plan(db, **filters):
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        crud_product.get_products(db, limit=20, **filters)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = executed[-1]
+    return [row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def test_every_filter_sort_pair_has_an_expected_plan():
+    assert set(EXPECTED_PLANS) == {(name, sort) for name in FILTERS for sort in [None, *ProductSort]}
+
+
+@pytest.mark.parametrize(("filter_name", "sort"), list(EXPECTED_PLANS), ids=lambda value: getattr(value, "value", value))
+def test_product_listing_query_plan(db, filter_name, sort):
+    index, sorts_in_temp_btree = EXPECTED_PLANS[(filter_name, sort)]
+    plan = _listing_plan(db, sort=sort, **FILTERS[filter_name])
+
+    access = plan[0]
+    if index is ROWID:
+        assert access == "SCAN products", plan
+    else:
+        assert f"USING INDEX {index}" in access, plan
+        # Filtre varsa indeks üzerinde seek yapılır; yoksa indeks sıralama için taranır
+        seeks = filter_name in ("price_range", "out_of_stock")
+        assert access.startswith("SEARCH" if seeks else "SCAN"), plan
+    assert any("TEMP B-TREE" in step for step in plan) == sorts_in_temp_btree, plan
@@ -0,0 +1,56 @@
+import asyncio
+
+import anyio
+import pytest
+
+from app.crud import crud_idempotency
+from app.models.idempotency_model import IdempotencyKey
+from app.services import idempotency_service
+
+
+async def _cancel_task(operation_started, run):
+    task = asyncio.ensure_future(run())
+    await operation_started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def _cancel_scope(operation_started, run):
+    # Starlette/anyio iptali: iptal edilen kapsamdaki her await yeniden iptal edilir
+    async with anyio.create_task_group() as task_group:
+        async def cancel_when_started():
+            await operation_started.wait()
+            task_group.cancel_scope.cancel()
+        task_group.start_soon(cancel_when_started)
+        await run()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cancel", [_cancel_task, _cancel_scope], ids=["task", "cancel_scope"])
+async def test_cancelled_execution_marks_key_outcome_unknown(db, create_user, cancel):
+    user, _ = create_user()
+    operation_started = asyncio.Event()
+    calls = []
+
+    async def pay_slowly():
+        calls.append("slow")
+        operation_started.set()
+        await asyncio.sleep(10) # İstemci bağlantısı ödeme sürerken kopar
+        return {"paid": True}
+
+    async def pay():
+        calls.append("retry")
+        return {"paid": True}
+
+    def run(operation):
+        return idempotency_service.execute_idempotent(db, user.id, "cancelled", "fingerprint", operation, success_status_code=201)
+
+    await cancel(operation_started, lambda: run(pay_slowly))
+    db.rollback()
+    assert crud_idempotency.get_key(db, user.id, "cancelled").status == IdempotencyKey.OUTCOME_UNKNOWN
+
+    # Aynı anahtarla yeniden deneme beklemeden işi devralır
+    response = await run(pay)
+    assert response.status_code == 201
+    assert calls == ["slow", "retry"]
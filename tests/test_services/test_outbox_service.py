@@ -0,0 +1,57 @@
+from app.core.config import settings
+from app.crud import crud_outbox
+from app.models.outbox_model import OutboxEvent
+from app.services import outbox_service
+
+TEST_EVENT = "test.event"
+
+
+def _add_events(db, *events):
+    for aggregate_id, name in events:
+        crud_outbox.add_event(db, TEST_EVENT, "order", aggregate_id, {"name": name})
+    db.commit()
+
+
+def test_failed_event_holds_back_its_aggregate_until_retried(db, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 0.0) # Başarısız olay hemen yeniden denenebilir
+    delivered, failures = [], {"first"}
+
+    def fail_once(payload):
+        if payload["name"] in failures:
+            failures.discard(payload["name"])
+            raise RuntimeError("handler unavailable")
+        delivered.append(payload["name"])
+
+    monkeypatch.setitem(outbox_service._handlers, TEST_EVENT, [fail_once])
+    _add_events(db, (1, "first"), (1, "second"), (2, "other"))
+
+    assert outbox_service.process_due_events(db) == 2 # "second", "first" teslim edilmeden alınmaz
+    assert delivered == ["other"]
+
+    assert outbox_service.process_due_events(db) == 1
+    assert delivered == ["other", "first"]
+
+    assert outbox_service.process_due_events(db) == 1
+    assert delivered == ["other", "first", "second"]
+    assert outbox_service.process_due_events(db) == 0
+
+    first = db.query(OutboxEvent).order_by(OutboxEvent.id).first()
+    assert (first.status, first.attempts) == (OutboxEvent.DELIVERED, 2)
+
+
+def test_claimed_events_are_leased_and_committed_before_handlers_run(db, monkeypatch):
+    from app.db.session import SessionLocal
+
+    seen_by_other_worker = []
+
+    def handler(payload):
+        # Handler çalışırken claim commit edilmiş olmalı: başka bir worker aynı olayı almaz
+        with SessionLocal() as other:
+            seen_by_other_worker.append(outbox_service.process_due_events(other))
+
+    monkeypatch.setitem(outbox_service._handlers, TEST_EVENT, [handler])
+    _add_events(db, (1, "only"))
+
+    assert outbox_service.process_due_events(db) == 1
+    assert seen_by_other_worker == [0]
+    assert db.query(OutboxEvent).one().status == OutboxEvent.DELIVERED
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.commands.fake_payment_gateway import create_app
+from app.core.config import settings
+from app.services import payment_service
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_is_released(monkeypatch):
+    processor = payment_service.PaymentProcessor()
+    breaker = processor._breakers["credit_card"]
+    breaker.reset_timeout_seconds = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    async def hanging_pay(amount, payment_details, idempotency_key=None):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(processor._strategies["credit_card"], "pay", hanging_pay)
+    trial = asyncio.create_task(processor.process_payment(10.0, {}, "credit_card"))
+    await asyncio.sleep(0.01) # Deneme hakkı alındı, ödeme bekliyor
+    assert not breaker.allow_request()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert breaker.allow_request() # İptal edilen deneme hakkı askıda kalmaz
+
+
+@pytest.mark.asyncio
+async def test_gateway_charge_is_deduplicated_by_idempotency_key(monkeypatch):
+    gateway = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(latency_ms=0)), base_url="http://gateway")
+    monkeypatch.setattr(settings, "PAYMENT_GATEWAY_URL", "http://gateway")
+    monkeypatch.setattr(payment_service, "_gateway_client", gateway)
+    processor = payment_service.PaymentProcessor()
+    try:
+        first = await processor.process_payment(10.0, {"card_number": "4242"}, "credit_card", idempotency_key="checkout-1")
+        retry = await processor.process_payment(10.0, {"card_number": "4242"}, "credit_card", idempotency_key="checkout-1")
+        other = await processor.process_payment(10.0, {"card_number": "4242"}, "credit_card", idempotency_key="checkout-2")
+    finally:
+        await gateway.aclose()
+
+    assert first["status"] == retry["status"] == other["status"] == "success"
+    assert retry["transaction_id"] == first["transaction_id"]
+    assert other["transaction_id"] != first["transaction_id"]
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models.order_model import Order, OrderItem, OrderStatus
+from app.models.product_model import Product
+from app.schemas import cart_schemas, order_schemas, product_schemas
+from app.utils.serialization import ResponseSerializer
+
+# Üslü gösterim, 1e-4 altı, çok büyük/küçük ve kısa gösterimi uzun float'lar (fiyatlar > 0)
+EDGE_FLOATS = [0.1, 19.99, 1e16, 1.5e-6, 0.00001, 0.0001, 1e-7, 1.7976931348623157e308, 5e-324, 123456789.12345679, 1e15]
+TEXTS = [
+    "İstanbul çay bardağı – ürün", "日本語の説明", "emoji 🛒🎉", 'tırnak " ters bölü \\ </script>',
+    "kontrol\n\t\x01\x1f karakterleri", " satır ayırıcı", "model 1e5 0.00001 metinde",
+]
+
+
+def _products():
+    return [
+        Product(
+            id=i, name=TEXTS[i % len(TEXTS)], description=TEXTS[(i + 1) % len(TEXTS)] if i % 3 else None,
+            price=price, stock_quantity=i, image_url=None,
+        )
+        for i, price in enumerate(EDGE_FLOATS, start=1)
+    ]
+
+
+def _order(total_amount=1e16):
+    products = _products()
+    return Order(
+        id=7, user_id=3, created_at=datetime(2024, 5, 17, 12, 30, 45, 123456), total_amount=total_amount, status=OrderStatus.PROCESSING,
+        items=[
+            OrderItem(id=i, product_id=product.id, quantity=i, price_at_purchase=product.price, product=product)
+            for i, product in enumerate(products, start=1)
+        ],
+    )
+
+
+def _cart():
+    products = _products()
+    return cart_schemas.Cart(
+        id=5, user_id=3, total_cart_price=0.00001,
+        items=[cart_schemas.CartItem(id=i, product_id=product.id, quantity=1, product=product) for i, product in enumerate(products, start=1)],
+    )
+
+
+CASES = {
+    "product": (product_schemas.Product, lambda: _products()[0]),
+    "product_list": (List[product_schemas.Product], _products),
+    "cart": (cart_schemas.Cart, _cart),
+    "cart_minimal": (cart_schemas.CartMutationResult, lambda: {"cart_id": 5, "item": _cart().items[1], "item_count": 12, "total_cart_price": 1e-7}),
+    "order": (order_schemas.Order, _order),
+    "order_list": (List[order_schemas.Order], lambda: [_order(), _order(total_amount=-0.0)]),
+}
+CASES.update({
+    f"product_price_{price!r}": (product_schemas.Product, lambda price=price: Product(id=1, name="ürün", price=price, stock_quantity=0))
+    for price in EDGE_FLOATS
+})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("case", list(CASES))
+async def test_fast_serializer_matches_default_response_bytes(case):
+    response_type, build = CASES[case]
+    field = create_model_field(name="Response", type_=response_type, mode="serialization")
+
+    default_body = JSONResponse(await serialize_response(field=field, response_content=build())).body
+    assert ResponseSerializer(response_type).to_json(build()) == default_body